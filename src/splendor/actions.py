@@ -0,0 +1,74 @@
+from .player import Action, PlayerAction
+from .ruleset import Ruleset
+from .tokens import DISTINCT_GEM_PICKS, DOUBLE_GEM_PICKS, TOKEN_DISCARDS, Tokens
+
+
+class ActionSpace:
+    # fixed integer numbering of every action a ruleset can produce, token picks come first,
+    # followed by the shop reservations, the shop purchases, the reserved card purchases and the
+    # discards of a single token of every kind
+    token_picks: list[tuple[int, ...]]
+    card_placements: list[tuple[int, int]]
+    reserved_indices: list[int]
+    token_discards: list[tuple[int, ...]]
+
+    def __init__(self, ruleset: Ruleset):
+        self.token_picks = [pick for picks in reversed(DISTINCT_GEM_PICKS) for pick in picks] + DOUBLE_GEM_PICKS
+        self.card_placements = [
+            (tier, column)
+            for tier in range(1, ruleset.SHOP_TIER_COUNT + 1)
+            for column in range(ruleset.SHOP_TIER_CARDS_COUNT)
+        ]
+        self.reserved_indices = list(range(ruleset.MAX_PLAYER_RESERVED_CARDS))
+        self.reservation_offset = len(self.token_picks)
+        self.purchase_offset = self.reservation_offset + len(self.card_placements)
+        self.reserved_purchase_offset = self.purchase_offset + len(self.card_placements)
+        self.token_discards = TOKEN_DISCARDS
+        self.discard_offset = self.reserved_purchase_offset + len(self.reserved_indices)
+        self.size = self.discard_offset + len(self.token_discards)
+
+        self._token_pick_ids = {pick: i for i, pick in enumerate(self.token_picks)}
+        self._card_placement_ids = {
+            placement: self.reservation_offset + i
+            for i, placement in enumerate(self.card_placements)
+        }
+        self._token_discard_ids = {discard: self.discard_offset + i for i, discard in enumerate(self.token_discards)}
+
+    def __len__(self):
+        return self.size
+
+    def encode(self, action: Action) -> int:
+        turn_action, params = action
+        if turn_action is PlayerAction.SELECT_TOKENS:
+            tokens = params['tokens']
+            if tokens.__class__ is not Tokens:
+                tokens = Tokens() + tokens
+            return self._token_pick_ids[tokens.values()]
+        if turn_action is PlayerAction.RESERVE_CARD:
+            return self._card_placement_ids[tuple(params['card_placement'])]
+        if turn_action is PlayerAction.BUY_CARD:
+            if params.get('card_placement') is not None:
+                return self._card_placement_ids[tuple(params['card_placement'])] + len(self.card_placements)
+            if params['reserved_index'] not in self.reserved_indices:
+                raise KeyError(params['reserved_index'])
+            return self.reserved_purchase_offset + params['reserved_index']
+        if turn_action is PlayerAction.DISCARD_TOKENS:
+            tokens = params['tokens']
+            if tokens.__class__ is not Tokens:
+                tokens = Tokens() + tokens
+            return self._token_discard_ids[tokens.values()]
+        raise KeyError(turn_action)
+
+    def decode(self, index: int) -> Action:
+        if index < 0 or index >= self.size:
+            raise KeyError(index)
+        if index < self.reservation_offset:
+            return PlayerAction.SELECT_TOKENS, {'tokens': Tokens.from_values(self.token_picks[index])}
+        if index < self.purchase_offset:
+            return PlayerAction.RESERVE_CARD, {'card_placement': self.card_placements[index - self.reservation_offset]}
+        if index < self.reserved_purchase_offset:
+            return PlayerAction.BUY_CARD, {'card_placement': self.card_placements[index - self.purchase_offset]}
+        if index < self.discard_offset:
+            return PlayerAction.BUY_CARD, {'reserved_index': index - self.reserved_purchase_offset}
+        discard = self.token_discards[index - self.discard_offset]
+        return PlayerAction.DISCARD_TOKENS, {'tokens': Tokens.from_values(discard)}
@@ -0,0 +1,19 @@
+import importlib
+from random import Random
+from typing import Callable
+
+from .game import GameState
+from .player import Action
+
+# picks the action to play among the legal ones, drawing from the given generator only
+Agent = Callable[[GameState, list[Action], Random], Action]
+
+
+def random_agent(game: GameState, actions: list[Action], rng: Random) -> Action:
+    return rng.choice(actions)
+
+
+def load_agent(path: str) -> Agent:
+    # resolves `package.module:attribute` agent references given on the command line
+    module, _, attribute = path.partition(':')
+    return getattr(importlib.import_module(module), attribute)
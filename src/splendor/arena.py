@@ -0,0 +1,343 @@
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional, Self
+
+from .cards import EMPTY_CARD_ID, CardSet, DevelopmentCards
+from .encoding import TOKEN_SLOTS, GameStateCodec
+from .exceptions import ConcurrentSlotUpdate, InvalidTokenValueError
+from .game import GameState
+from .nobles import Noble
+from .ruleset import Ruleset
+from .tokens import Gems, Tokens
+from .zobrist import ZobristKeys
+
+# every slot starts with its version and the zobrist hash of the game it holds, followed by the
+# game in the `GameStateCodec` layout; slots are padded to keep the header 8-byte aligned
+SLOT_HEADER = struct.Struct('<QQ')
+VERSION = struct.Struct('<Q')
+# `SharedMemory(track=...)` appeared in python 3.13
+SHARED_MEMORY_TRACK = sys.version_info >= (3, 13)
+
+
+class GameArena:
+    # fixed-size games living in a `multiprocessing.shared_memory` block, so processes hand
+    # positions over by slot number instead of pickling them
+    #
+    # every slot is a seqlock: its version is odd while a write is in progress and grows by two
+    # with every write, readers retry until they copied the slot without the version changing;
+    # a version of zero marks an empty slot
+    #
+    # a slot must only have one writer at a time, which callers have to ensure, e.g. by giving
+    # every process its own slots; version updates are not atomic, so a second writer is only
+    # detected on a best-effort basis
+    ruleset: Ruleset
+    slots: int
+    slot_size: int
+
+    def __init__(self, ruleset: Ruleset, slots: int, name: Optional[str] = None, create: bool = True):
+        self.ruleset = ruleset = ruleset.compile()
+        self.slots = slots
+        self.codec = GameStateCodec.for_ruleset(ruleset)
+        self.zobrist_keys = ZobristKeys.for_ruleset(ruleset)
+        self.slot_size = (SLOT_HEADER.size + self.codec.size + 7) // 8 * 8
+        self._owner = create
+        # the resource tracker unlinks every block a process registered once it exits, only the
+        # creating process may remove the block, so attaching ones keep it out of their tracker
+        options = {'track': False} if not create and SHARED_MEMORY_TRACK else {}
+        self._memory = SharedMemory(name, create=create, size=slots * self.slot_size, **options)
+        if not create and not SHARED_MEMORY_TRACK:
+            resource_tracker.unregister(self._memory._name, 'shared_memory')
+        self.buffer = self._memory.buf
+
+    @classmethod
+    def attach(cls, name: str, ruleset: Ruleset, slots: int) -> Self:
+        return cls(ruleset, slots, name=name, create=False)
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    def __reduce__(self):
+        # other processes attach to the same block
+        return self.attach, (self.name, self.ruleset, self.slots)
+
+    def __len__(self):
+        return self.slots
+
+    def _get_offset(self, slot: int) -> int:
+        if not 0 <= slot < self.slots:
+            raise IndexError(slot)
+        return slot * self.slot_size
+
+    def get_version(self, slot: int) -> int:
+        return VERSION.unpack_from(self.buffer, self._get_offset(slot))[0]
+
+    def begin_write(self, slot: int) -> int:
+        # marks the slot as being written, returns the version the write started from; raises
+        # `ConcurrentSlotUpdate` when the slot is already marked, but two writers starting at
+        # the same time may both get through
+        offset = self._get_offset(slot)
+        version = VERSION.unpack_from(self.buffer, offset)[0]
+        if version & 1:
+            raise ConcurrentSlotUpdate(f'slot {slot} is already being written')
+        VERSION.pack_into(self.buffer, offset, version + 1)
+        return version
+
+    def end_write(self, slot: int, version: int, zobrist_hash: int) -> int:
+        # publishes the write started at `version`, returns the new version
+        version += 2
+        SLOT_HEADER.pack_into(self.buffer, self._get_offset(slot), version, zobrist_hash)
+        return version
+
+    def store(self, slot: int, game: GameState) -> int:
+        version = self.begin_write(slot)
+        try:
+            self.codec.encode_into(game, self.buffer, self._get_offset(slot) + SLOT_HEADER.size)
+        finally:
+            version = self.end_write(slot, version, game.zobrist_hash)
+        return version
+
+    def read(self, slot: int, timeout: float = 1.0) -> tuple[int, bytes]:
+        # consistent copy of a slot, as its version and the encoded game; gives up once writes
+        # kept interfering for `timeout` seconds
+        offset = self._get_offset(slot)
+        start, stop = offset + SLOT_HEADER.size, offset + SLOT_HEADER.size + self.codec.size
+        buffer = self.buffer
+        deadline = None
+        while True:
+            version = VERSION.unpack_from(buffer, offset)[0]
+            if not version & 1:
+                data = bytes(buffer[start:stop])
+                if VERSION.unpack_from(buffer, offset)[0] == version:
+                    return version, data
+
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + timeout
+            elif now > deadline:
+                raise ConcurrentSlotUpdate(f'slot {slot} kept changing while being read')
+            # lets the writer finish
+            time.sleep(0)
+
+    def load(self, slot: int) -> GameState:
+        version, data = self.read(slot)
+        if not version:
+            raise KeyError(slot)
+        return self.codec.decode(data)
+
+    def view(self, slot: int) -> 'GameView':
+        self._get_offset(slot)
+        return GameView(self, slot)
+
+    def close(self) -> None:
+        # views and memoryviews of the buffer must be released first
+        self.buffer = None
+        self._memory.close()
+        if self._owner:
+            if not SHARED_MEMORY_TRACK:
+                # processes started by `multiprocessing` share this tracker, so attaching may have
+                # dropped the registration `unlink` removes
+                resource_tracker.register(self._memory._name, 'shared_memory')
+            self._memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GameView:
+    # reads and writes single fields of one arena slot in place; it stands in for a `GameState`
+    # wherever only the position is looked at: `player_turn`, `community_tokens`, `players` with
+    # their tokens, cards, nobles, bonuses and prestige, and the end of game queries, which is
+    # what evaluators and loggers use; the rules, i.e. `legal_actions` and `apply`, need the
+    # whole game, which `read` decodes, and only turns and tokens are written in place, as any
+    # other change moves cards between fields that have to stay consistent
+    #
+    # single reads are not synchronized, so a reader combining several of them checks
+    # `is_current` with the version it started from; writes keep the slot's zobrist hash up to
+    # date and are only allowed into slots holding a game
+    __slots__ = ('arena', 'slot', '_offset')
+
+    # these only read the attributes mirrored here
+    is_over = GameState.is_over
+    get_standings = GameState.get_standings
+    get_winners = GameState.get_winners
+
+    def __init__(self, arena: GameArena, slot: int):
+        self.arena = arena
+        self.slot = slot
+        self._offset = slot * arena.slot_size + SLOT_HEADER.size
+
+    @property
+    def ruleset(self) -> Ruleset:
+        return self.arena.ruleset
+
+    @property
+    def version(self) -> int:
+        return self.arena.get_version(self.slot)
+
+    def is_current(self, version: int) -> bool:
+        # no write started or finished since `version` was read
+        return not version & 1 and self.version == version
+
+    @property
+    def zobrist_hash(self) -> int:
+        return SLOT_HEADER.unpack_from(self.arena.buffer, self._offset - SLOT_HEADER.size)[1]
+
+    @property
+    def player_turn(self) -> int:
+        return self.arena.buffer[self._offset + 3]
+
+    @player_turn.setter
+    def player_turn(self, player_turn: int) -> None:
+        keys = self.arena.zobrist_keys
+        if not 0 <= player_turn < len(keys.player_turn):
+            raise IndexError(player_turn)
+        with _SlotWrite(self) as write:
+            position = self._offset + 3
+            write.zobrist_hash ^= keys.player_turn[self.arena.buffer[position]] ^ keys.player_turn[player_turn]
+            self.arena.buffer[position] = player_turn
+
+    @property
+    def community_tokens(self) -> Tokens:
+        position = self._offset + self.arena.codec.community_tokens_offset
+        return Tokens.from_values(self.arena.buffer[position:position + TOKEN_SLOTS])
+
+    @community_tokens.setter
+    def community_tokens(self, tokens: Tokens) -> None:
+        position = self._offset + self.arena.codec.community_tokens_offset
+        self._set_tokens(position, tokens, self.arena.zobrist_keys.community_tokens)
+
+    @property
+    def players(self) -> list['PlayerView']:
+        return [PlayerView(self, player) for player in range(self.arena.ruleset.PLAYER_COUNT)]
+
+    def get_player(self, player: int) -> 'PlayerView':
+        if not 0 <= player < self.arena.ruleset.PLAYER_COUNT:
+            raise IndexError(player)
+        return PlayerView(self, player)
+
+    def get_current_player(self) -> 'PlayerView':
+        return PlayerView(self, self.player_turn)
+
+    def get_player_tokens(self, player: int) -> Tokens:
+        position = self._offset + self.arena.codec.get_player_offset(player)
+        return Tokens.from_values(self.arena.buffer[position:position + TOKEN_SLOTS])
+
+    def set_player_tokens(self, player: int, tokens: Tokens) -> None:
+        position = self._offset + self.arena.codec.get_player_offset(player)
+        self._set_tokens(position, tokens, self.arena.zobrist_keys.player_tokens[player])
+
+    def get_development_cards(self, player: int) -> CardSet:
+        codec = self.arena.codec
+        position = self._offset + codec.get_player_offset(player) + TOKEN_SLOTS
+        bitmap = self.arena.buffer[position:position + codec.card_bitmap_size]
+        return CardSet.from_mask(int.from_bytes(bitmap, 'little'))
+
+    def get_reserved_card_ids(self, player: int) -> bytes:
+        codec = self.arena.codec
+        position = self._offset + codec.get_player_offset(player) + TOKEN_SLOTS + codec.card_bitmap_size
+        reserved = self.arena.buffer[position:position + codec.reserved_size]
+        return bytes(card_id for card_id in reserved if card_id != EMPTY_CARD_ID)
+
+    def get_nobles(self, player: int) -> list[Noble]:
+        # in noble id order, the order of visits is not kept
+        codec = self.arena.codec
+        position = self._offset + codec.get_player_offset(player) + codec.player_size - codec.noble_bitmap_size
+        bitmap = int.from_bytes(self.arena.buffer[position:position + codec.noble_bitmap_size], 'little')
+        return [noble for noble in self.arena.ruleset.NOBLE_CATALOG.nobles if bitmap >> noble.id & 1]
+
+    def get_shop_card_ids(self, tier: int) -> bytes:
+        position = self._offset + self.arena.codec.get_shop_tier_offset(tier)
+        return bytes(self.arena.buffer[position:position + self.arena.codec.tier_size])
+
+    def get_restock_count(self, tier: int) -> int:
+        codec = self.arena.codec
+        return self.arena.buffer[self._offset + codec.get_shop_tier_offset(tier) + codec.tier_size]
+
+    def read(self) -> GameState:
+        return self.arena.load(self.slot)
+
+    def write(self, game: GameState) -> int:
+        return self.arena.store(self.slot, game)
+
+    def _set_tokens(self, position: int, tokens: Tokens, keys: list[list[int]]) -> None:
+        values = (tokens if tokens.__class__ is Tokens else Tokens() + tokens).values()
+        for token, value, token_keys in zip(Tokens.TOKEN_TYPES, values, keys):
+            if not 0 <= value < len(token_keys):
+                raise InvalidTokenValueError(f'{value} {token} tokens do not fit the slot')
+        buffer = self.arena.buffer
+        with _SlotWrite(self) as write:
+            for i, (old, new) in enumerate(zip(buffer[position:position + TOKEN_SLOTS], values)):
+                if old != new:
+                    write.zobrist_hash ^= keys[i][old] ^ keys[i][new]
+            buffer[position:position + TOKEN_SLOTS] = bytes(values)
+
+
+class PlayerView:
+    # one seat of a `GameView`, read like a `Player`; assigning `tokens` writes them in place
+    __slots__ = ('view', 'player')
+
+    def __init__(self, view: GameView, player: int):
+        self.view = view
+        self.player = player
+
+    @property
+    def tokens(self) -> Tokens:
+        return self.view.get_player_tokens(self.player)
+
+    @tokens.setter
+    def tokens(self, tokens: Tokens) -> None:
+        self.view.set_player_tokens(self.player, tokens)
+
+    @property
+    def development_cards(self) -> CardSet:
+        return self.view.get_development_cards(self.player)
+
+    @property
+    def reserved_cards(self) -> DevelopmentCards:
+        return DevelopmentCards.from_ids(self.view.get_reserved_card_ids(self.player))
+
+    @property
+    def nobles(self) -> list[Noble]:
+        return self.view.get_nobles(self.player)
+
+    @property
+    def bonuses(self) -> Gems:
+        return self.development_cards.get_gem_counts()
+
+    @property
+    def prestige(self) -> int:
+        return self.development_cards.get_prestige() + sum(noble.prestige for noble in self.nobles)
+
+    def get_development_cards_gem_value(self) -> Gems:
+        return self.bonuses
+
+    def get_prestige(self) -> int:
+        return self.prestige
+
+
+class _SlotWrite:
+    # in-place write of a view's slot, bumping the version around it; a write that fails leaves
+    # the game unchanged and publishes the hash it started with
+    __slots__ = ('view', 'version', 'zobrist_hash', 'original_hash')
+
+    def __init__(self, view: GameView):
+        self.view = view
+
+    def __enter__(self):
+        if not self.view.version:
+            # an empty slot holds no game to change
+            raise KeyError(self.view.slot)
+        self.zobrist_hash = self.original_hash = self.view.zobrist_hash
+        self.version = self.view.arena.begin_write(self.view.slot)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        zobrist_hash = self.zobrist_hash if exc_type is None else self.original_hash
+        self.view.arena.end_write(self.view.slot, self.version, zobrist_hash)
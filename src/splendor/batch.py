@@ -0,0 +1,376 @@
+from typing import Optional, Self
+
+import numpy as np
+
+from .actions import ActionSpace
+from .cards import CARD_CATALOG, EMPTY_CARD_ID, CardCatalog, CardSet, DevelopmentCards
+from .exceptions import InvalidGameConfiguration
+from .game import GameState
+from .nobles import Noble
+from .player import Player
+from .ruleset import Ruleset
+from .shop import Shop, ShopTier
+from .tokens import Gems, Token, Tokens
+
+EMPTY_SLOT = EMPTY_CARD_ID
+GOLD_SLOT = Tokens.TOKEN_TYPES.index(Token.GOLD.value)
+GEM_SLOTS = [Tokens.TOKEN_TYPES.index(gem) for gem in Gems.TOKEN_TYPES]
+
+
+class BatchGameState:
+    # struct-of-arrays counterpart of `GameState`, every array is indexed by game first;
+    # cards are referred to by their catalog id, empty slots hold `EMPTY_SLOT`
+    ruleset: Ruleset
+    action_space: ActionSpace
+    n_games: int
+    n_players: int
+    catalog: CardCatalog
+
+    player_turn: np.ndarray  # (games,)
+    community_tokens: np.ndarray  # (games, token types)
+    player_tokens: np.ndarray  # (games, players, token types)
+    player_bonuses: np.ndarray  # (games, players, gem types)
+    player_prestige: np.ndarray  # (games, players)
+    development_cards: np.ndarray  # (games, players, cards), ownership flags
+    reserved_cards: np.ndarray  # (games, players, reserved slots)
+    reserved_counts: np.ndarray  # (games, players)
+    player_nobles: np.ndarray  # (games, players, nobles), visit flags
+    shop_nobles: np.ndarray  # (games, nobles), flags of the nobles still to visit
+    shop_cards: np.ndarray  # (games, tiers, columns)
+    restock_piles: np.ndarray  # (games, tiers, pile size), drawn from the top of the count
+    restock_counts: np.ndarray  # (games, tiers)
+
+    def __init__(self, ruleset: Ruleset, n_games: int):
+        self.ruleset = ruleset
+        self.action_space = ActionSpace(ruleset)
+        self.n_games = n_games
+        self.n_players = ruleset.PLAYER_COUNT
+
+        # card attribute tables have a row for every byte value, so they can be indexed by card id
+        # arrays directly; the rows past the catalog, `EMPTY_SLOT` included, cost and give nothing
+        catalog = self.catalog = CARD_CATALOG
+        self.card_costs = np.zeros((EMPTY_SLOT + 1, len(Gems.TOKEN_TYPES)), dtype=np.int16)
+        self.card_costs[:len(catalog)] = np.frombuffer(catalog.costs, dtype=np.uint8).reshape(len(catalog), -1)
+        self.card_gems = np.zeros(EMPTY_SLOT + 1, dtype=np.uint8)
+        self.card_gems[:len(catalog)] = np.frombuffer(catalog.gems, dtype=np.uint8)
+        self.card_prestige = np.zeros(EMPTY_SLOT + 1, dtype=np.int16)
+        self.card_prestige[:len(catalog)] = np.frombuffer(catalog.prestige, dtype=np.uint8)
+        pile_size = max(len(catalog.get_tier_ids(tier)) for tier in range(1, ruleset.SHOP_TIER_COUNT + 1))
+        noble_catalog = self.noble_catalog = ruleset.NOBLE_CATALOG
+        self.noble_requirements = np.array([noble.cost.values() for noble in noble_catalog.nobles], dtype=np.int16)
+        self.noble_prestige = np.array([noble.prestige for noble in noble_catalog.nobles], dtype=np.int16)
+
+        picks = np.array(self.action_space.token_picks, dtype=np.int16)
+        self._pick_values = picks
+        self._pick_sizes = picks.sum(axis=1)
+        self._pick_is_distinct = picks.max(axis=1) <= 1
+        # a pick of two same gems requires a pile of at least four
+        self._pick_requirements = np.where(picks > 1, 4, picks)
+
+        games, players = n_games, ruleset.PLAYER_COUNT
+        tiers, columns = ruleset.SHOP_TIER_COUNT, ruleset.SHOP_TIER_CARDS_COUNT
+        self.player_turn = np.zeros(games, dtype=np.int8)
+        self.community_tokens = np.zeros((games, len(Tokens.TOKEN_TYPES)), dtype=np.int16)
+        self.player_tokens = np.zeros((games, players, len(Tokens.TOKEN_TYPES)), dtype=np.int16)
+        self.player_bonuses = np.zeros((games, players, len(Gems.TOKEN_TYPES)), dtype=np.int16)
+        self.player_prestige = np.zeros((games, players), dtype=np.int16)
+        self.development_cards = np.zeros((games, players, len(catalog)), dtype=bool)
+        self.reserved_cards = np.full((games, players, ruleset.MAX_PLAYER_RESERVED_CARDS), EMPTY_SLOT, dtype=np.uint8)
+        self.reserved_counts = np.zeros((games, players), dtype=np.int8)
+        self.player_nobles = np.zeros((games, players, len(noble_catalog)), dtype=bool)
+        self.shop_nobles = np.zeros((games, len(noble_catalog)), dtype=bool)
+        self.shop_cards = np.full((games, tiers, columns), EMPTY_SLOT, dtype=np.uint8)
+        self.restock_piles = np.full((games, tiers, pile_size), EMPTY_SLOT, dtype=np.uint8)
+        self.restock_counts = np.zeros((games, tiers), dtype=np.int16)
+
+    @classmethod
+    def from_ruleset(cls, ruleset: Ruleset, n_games: int, seed: Optional[int] = None) -> Self:
+        # game `i` is dealt exactly like `GameState.from_ruleset(ruleset, seed + i)`
+        return cls.from_game_states([
+            GameState.from_ruleset(ruleset, None if seed is None else seed + i)
+            for i in range(n_games)
+        ])
+
+    @classmethod
+    def from_game_states(cls, games: list[GameState]) -> Self:
+        batch = cls(games[0].ruleset, len(games))
+        batch.load_game_states(games)
+        return batch
+
+    def load_game_state(self, index: int, game: GameState) -> None:
+        self.load_packed(index, [self.pack_game_state(game)])
+
+    def load_game_states(self, games: list[GameState], start: int = 0) -> None:
+        self.load_packed(start, [self.pack_game_state(game) for game in games])
+
+    def pack_game_state(self, game: GameState) -> tuple:
+        # snapshot of a game as plain values, converted by `load_packed` together with many others,
+        # as numpy calls are far more expensive than the values they move
+        if len(game.players) != self.n_players:
+            raise InvalidGameConfiguration
+
+        players, tiers = game.players, game.shop.tiers
+        reserved_slots, pile_size = self.reserved_cards.shape[2], self.restock_piles.shape[2]
+        empty = bytes((EMPTY_SLOT,))
+        return (
+            game.player_turn,
+            game.community_tokens.values(),
+            [
+                (player.tokens if player.tokens.__class__ is Tokens else Tokens() + player.tokens).values()
+                for player in players
+            ],
+            [player.bonuses.values() for player in players],
+            [player.get_prestige() for player in players],
+            [player.development_cards.mask for player in players],
+            b''.join(
+                player.reserved_cards.ids.tobytes() + empty * (reserved_slots - len(player.reserved_cards.ids))
+                for player in players
+            ),
+            [len(player.reserved_cards.ids) for player in players],
+            [sum(1 << noble.id for noble in player.nobles) for player in players],
+            sum(1 << noble.id for noble in game.shop.nobles),
+            b''.join(tier.card_ids.tobytes() for tier in tiers),
+            b''.join(
+                tier.restock_pile.ids.tobytes() + empty * (pile_size - len(tier.restock_pile.ids))
+                for tier in tiers
+            ),
+            [len(tier.restock_pile.ids) for tier in tiers],
+        )
+
+    def load_packed(self, start: int, packed: list[tuple]) -> None:
+        # stores games packed by `pack_game_state` from game `start` on, one numpy call per array
+        (
+            turns, community, tokens, bonuses, prestige, development_cards, reserved_cards, reserved_counts,
+            player_nobles, shop_nobles, shop_cards, restock_piles, restock_counts,
+        ) = zip(*packed)
+        games = slice(start, start + len(packed))
+        self.player_turn[games] = turns
+        self.community_tokens[games] = community
+        self.player_tokens[games] = tokens
+        self.player_bonuses[games] = bonuses
+        self.player_prestige[games] = prestige
+        self.development_cards[games] = self._get_flags(development_cards, len(self.catalog))
+        self.reserved_cards[games] = self._get_ids(reserved_cards, self.reserved_cards.shape)
+        self.reserved_counts[games] = reserved_counts
+        self.player_nobles[games] = self._get_flags(player_nobles, len(self.noble_catalog))
+        self.shop_nobles[games] = self._get_flags(shop_nobles, len(self.noble_catalog))
+        self.shop_cards[games] = self._get_ids(shop_cards, self.shop_cards.shape)
+        self.restock_piles[games] = self._get_ids(restock_piles, self.restock_piles.shape)
+        self.restock_counts[games] = restock_counts
+
+    @staticmethod
+    def _get_flags(masks: tuple, size: int) -> np.ndarray:
+        # (..., size) flags of the bits set in every mask, `masks` holding ints or lists of them
+        if isinstance(masks[0], list):
+            return BatchGameState._get_flags(tuple(mask for row in masks for mask in row), size).reshape(
+                len(masks), len(masks[0]), size,
+            )
+        width = (size + 7) // 8
+        flags = np.unpackbits(
+            np.frombuffer(b''.join(mask.to_bytes(width, 'little') for mask in masks), dtype=np.uint8),
+            bitorder='little',
+        )
+        return flags.reshape(len(masks), -1)[:, :size]
+
+    @staticmethod
+    def _get_ids(rows: tuple[bytes, ...], shape: tuple[int, ...]) -> np.ndarray:
+        return np.frombuffer(b''.join(rows), dtype=np.uint8).reshape(len(rows), *shape[1:])
+
+    def to_game_state(self, index: int) -> GameState:
+        ruleset = self.ruleset
+        players = [
+            Player(
+                ruleset,
+                reserved_cards=self._get_cards(self.reserved_cards[index, i, :self.reserved_counts[index, i]]),
+                development_cards=CardSet.from_ids(np.flatnonzero(self.development_cards[index, i]).tolist()),
+                nobles=self._get_nobles(self.player_nobles[index, i]),
+                tokens=Tokens.from_values(self.player_tokens[index, i].tolist()),
+            )
+            for i in range(self.n_players)
+        ]
+        shop = Shop(ruleset, nobles=self._get_nobles(self.shop_nobles[index]), tiers=[
+            ShopTier(
+                ruleset,
+                tier_numer=i + 1,
+                restock_pile=self._get_cards(self.restock_piles[index, i, :self.restock_counts[index, i]]),
+                available_cards=[self.catalog.get_card(card_id) for card_id in self.shop_cards[index, i].tolist()],
+            )
+            for i in range(ruleset.SHOP_TIER_COUNT)
+        ])
+
+        return GameState(
+            ruleset,
+            players,
+            shop,
+            Tokens.from_values(self.community_tokens[index].tolist()),
+            player_turn=int(self.player_turn[index]),
+        )
+
+    def to_game_states(self) -> list[GameState]:
+        return [self.to_game_state(index) for index in range(self.n_games)]
+
+    @staticmethod
+    def _get_cards(card_ids: np.ndarray) -> DevelopmentCards:
+        return DevelopmentCards.from_ids(card_ids.tolist())
+
+    def _get_nobles(self, flags: np.ndarray) -> list[Noble]:
+        # nobles come back ordered by id, whatever order they were dealt or visited in
+        return [self.noble_catalog.nobles[noble_id] for noble_id in np.flatnonzero(flags).tolist()]
+
+    def get_purchasable_cards(self) -> np.ndarray:
+        # (games, shop slots + reserved slots) card ids the current player could buy, in the
+        # order of the purchase actions: shop slots by tier and column, then the reserved cards
+        games = np.arange(self.n_games)
+        return np.concatenate(
+            [self.shop_cards.reshape(self.n_games, -1), self.reserved_cards[games, self.player_turn]], axis=1,
+        )
+
+    def get_payments(self) -> tuple[np.ndarray, np.ndarray]:
+        # batched counterpart of `Player.get_payments` for every purchasable card of every game;
+        # returns (games, slots, token types) payments and (games, slots) affordability flags
+        games = np.arange(self.n_games)
+        tokens = self.player_tokens[games, self.player_turn]
+        bonuses = self.player_bonuses[games, self.player_turn]
+        card_ids = self.get_purchasable_cards()
+
+        due = np.maximum(self.card_costs[card_ids] - bonuses[:, None], 0)
+        gems = np.minimum(due, tokens[:, None, GEM_SLOTS])
+        gold = (due - gems).sum(axis=2)
+
+        payments = np.zeros(card_ids.shape + (len(Tokens.TOKEN_TYPES),), dtype=np.int16)
+        payments[..., GEM_SLOTS] = gems
+        payments[..., GOLD_SLOT] = gold
+        affordable = (card_ids != EMPTY_SLOT) & (gold <= tokens[:, None, GOLD_SLOT])
+        return payments, affordable
+
+    def is_over(self) -> np.ndarray:
+        # (games,) flags, like `GameState.is_over`
+        return (self.player_turn == 0) & (self.player_prestige >= self.ruleset.WINNING_PRESTIGE).any(axis=1)
+
+    def get_legal_mask(self) -> np.ndarray:
+        # (games, actions) flags mirroring `Player.get_legal_actions`
+        return self._get_legal_mask(self.get_payments()[1])
+
+    def _get_legal_mask(self, affordable: np.ndarray) -> np.ndarray:
+        games = np.arange(self.n_games)
+        turn = self.player_turn
+        community = self.community_tokens
+
+        tokens = self.player_tokens[games, turn]
+        over_limit = tokens.sum(axis=1) > self.ruleset.MAX_PLAYER_TOKENS
+        playing = ~self.is_over()
+        pick_size = np.minimum(3, (community[:, GEM_SLOTS] > 0).sum(axis=1))
+        picks = (community[:, None, :] >= self._pick_requirements[None]).all(axis=2)
+        picks &= ~self._pick_is_distinct[None] | (self._pick_sizes[None] == pick_size[:, None])
+
+        can_reserve = self.reserved_counts[games, turn] < self.ruleset.MAX_PLAYER_RESERVED_CARDS
+        reservations = (self.shop_cards.reshape(self.n_games, -1) != EMPTY_SLOT) & can_reserve[:, None]
+
+        # a player over the token limit may only discard until they are back at it
+        moves = np.concatenate([picks, reservations, affordable], axis=1) & (playing & ~over_limit)[:, None]
+        discards = (tokens > 0) & (playing & over_limit)[:, None]
+        return np.concatenate([moves, discards], axis=1)
+
+    def sample_legal_actions(self, rng: np.random.Generator) -> np.ndarray:
+        # uniformly random legal action per game, -1 where no action is legal
+        mask = self.get_legal_mask()
+        scores = np.where(mask, rng.random(mask.shape), -1.0)
+        return np.where(mask.any(axis=1), scores.argmax(axis=1), -1)
+
+    def step(self, actions: np.ndarray) -> np.ndarray:
+        # applies one encoded action per game; games whose action is illegal are left
+        # untouched, like a rejected `GameState.perform_player_turn`, returns the applied flags
+        actions = np.asarray(actions)
+        games = np.arange(self.n_games)
+        turn = self.player_turn.astype(np.intp)
+
+        payments, affordable = self.get_payments()
+        in_range = (actions >= 0) & (actions < self.action_space.size)
+        applied = np.zeros(self.n_games, dtype=bool)
+        applied[in_range] = self._get_legal_mask(affordable)[games[in_range], actions[in_range]]
+
+        offset = self.action_space.reservation_offset
+        purchase_offset = self.action_space.purchase_offset
+        picks = applied & (actions < offset)
+        self._apply_token_picks(games[picks], turn[picks], actions[picks])
+
+        reservations = applied & (actions >= offset) & (actions < purchase_offset)
+        self._apply_reservations(games[reservations], turn[reservations], actions[reservations] - offset)
+
+        discard_offset = self.action_space.discard_offset
+        purchases = applied & (actions >= purchase_offset) & (actions < discard_offset)
+        slots = actions[purchases] - purchase_offset
+        self._apply_purchases(games[purchases], turn[purchases], slots, payments[games[purchases], slots])
+
+        discards = applied & (actions >= discard_offset)
+        self._apply_discards(games[discards], turn[discards], actions[discards] - discard_offset)
+
+        # players still over the token limit keep the turn to discard
+        ended = applied & (self.player_tokens[games, turn].sum(axis=1) <= self.ruleset.MAX_PLAYER_TOKENS)
+        self._resolve_noble_visits(games[ended], turn[ended])
+        self.player_turn[ended] = (turn[ended] + 1) % self.n_players
+        return applied
+
+    def _apply_token_picks(self, games, turn, picks):
+        values = self._pick_values[picks]
+        self.community_tokens[games] -= values
+        self.player_tokens[games, turn] += values
+
+    def _apply_reservations(self, games, turn, placements):
+        tiers, columns = np.divmod(placements, self.ruleset.SHOP_TIER_CARDS_COUNT)
+        self.reserved_cards[games, turn, self.reserved_counts[games, turn]] = self.shop_cards[games, tiers, columns]
+        self.reserved_counts[games, turn] += 1
+        self._refill_shop_slots(games, tiers, columns)
+
+        gold = self.community_tokens[games, GOLD_SLOT] > 0
+        self.community_tokens[games[gold], GOLD_SLOT] -= 1
+        self.player_tokens[games[gold], turn[gold], GOLD_SLOT] += 1
+
+    def _apply_purchases(self, games, turn, slots, payments):
+        card_ids = self.get_purchasable_cards()[games, slots]
+        self.player_tokens[games, turn] -= payments
+        self.community_tokens[games] += payments
+        self.development_cards[games, turn, card_ids] = True
+        self.player_bonuses[games, turn, self.card_gems[card_ids]] += 1
+        self.player_prestige[games, turn] += self.card_prestige[card_ids]
+
+        shop_slots = self.shop_cards.shape[1] * self.shop_cards.shape[2]
+        from_shop = slots < shop_slots
+        tiers, columns = np.divmod(slots[from_shop], self.ruleset.SHOP_TIER_CARDS_COUNT)
+        self._refill_shop_slots(games[from_shop], tiers, columns)
+
+        from_reserve = ~from_shop
+        games, turn = games[from_reserve], turn[from_reserve]
+        indices = slots[from_reserve] - shop_slots
+        # moves the bought card behind the others with a stable sort, keeping the order of the
+        # remaining reserved cards like `list.pop` does, then clears everything past the new count
+        reserved = self.reserved_cards[games, turn]
+        positions = np.arange(reserved.shape[1])
+        order = np.argsort(positions[None] == indices[:, None], axis=1, kind='stable')
+        reserved = np.take_along_axis(reserved, order, axis=1)
+        counts = self.reserved_counts[games, turn] - 1
+        reserved[positions[None] >= counts[:, None]] = EMPTY_SLOT
+        self.reserved_cards[games, turn] = reserved
+        self.reserved_counts[games, turn] = counts
+
+    def _apply_discards(self, games, turn, slots):
+        self.player_tokens[games, turn, slots] -= 1
+        self.community_tokens[games, slots] += 1
+
+    def _resolve_noble_visits(self, games, turn):
+        # like `GameState.resolve_noble_visit`, the lowest id noble the player qualifies for visits
+        bonuses = self.player_bonuses[games, turn]
+        eligible = (bonuses[:, None, :] >= self.noble_requirements[None]).all(axis=2) & self.shop_nobles[games]
+        visited = eligible.any(axis=1)
+        games, turn, nobles = games[visited], turn[visited], eligible[visited].argmax(axis=1)
+        self.shop_nobles[games, nobles] = False
+        self.player_nobles[games, turn, nobles] = True
+        self.player_prestige[games, turn] += self.noble_prestige[nobles]
+
+    def _refill_shop_slots(self, games, tiers, columns):
+        counts = self.restock_counts[games, tiers]
+        stocked = counts > 0
+        top = np.maximum(counts - 1, 0)
+        self.shop_cards[games, tiers, columns] = np.where(stocked, self.restock_piles[games, tiers, top], EMPTY_SLOT)
+        self.restock_piles[games, tiers, top] = EMPTY_SLOT
+        self.restock_counts[games, tiers] = counts - stocked
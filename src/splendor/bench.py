@@ -0,0 +1,291 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Optional, Sequence
+
+from .agents import random_agent
+from .features import FeatureEncoder
+from .game import GameFactory, GameState
+from .instrumentation import Instrumentation
+from .player import PlayerAction
+from .ruleset import ClassicRuleset
+from .selfplay import play_game
+from .shop import Shop
+from .tokens import Gems, Tokens
+
+BENCHMARKS: dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    # registers a setup function returning the operation to be measured
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@benchmark('tokens.add')
+def _tokens_add():
+    a, b = Tokens(gold=1, ruby=2, onyx=1), Tokens(ruby=1, emerald=1, diamond=1)
+    return lambda: a + b
+
+
+@benchmark('tokens.iadd')
+def _tokens_iadd():
+    a, b = Tokens(gold=1, ruby=2, onyx=1), Tokens(ruby=1, emerald=1, diamond=1)
+
+    def run():
+        nonlocal a
+        a += b
+        a -= b
+    return run
+
+
+@benchmark('tokens.sub_gems')
+def _tokens_sub_gems():
+    a, b = Tokens(gold=1, ruby=2, onyx=1), Gems(ruby=1, onyx=1)
+    return lambda: a - b
+
+
+@benchmark('tokens.pull')
+def _tokens_pull():
+    community, pick = Tokens(ruby=7, emerald=7, sapphire=7), Tokens(ruby=1, emerald=1, sapphire=1)
+
+    def run():
+        community.pull(pick)
+        community.__iadd__(pick)
+    return run
+
+
+@benchmark('tokens.pull_exact')
+def _tokens_pull_exact():
+    community, pick = Tokens(ruby=7, emerald=7, sapphire=7), Tokens(ruby=1, emerald=1, sapphire=1)
+
+    def run():
+        community.pull_exact(pick)
+        community.__iadd__(pick)
+    return run
+
+
+@benchmark('player.ensure_select_tokens_legal')
+def _ensure_select_tokens_legal():
+    game = GameState.from_ruleset(ClassicRuleset.from_players(4), 0)
+    player, tokens = game.get_current_player(), Tokens(ruby=1, emerald=1, onyx=1)
+    return lambda: player._ensure_player_select_tokens_legal(game, tokens)
+
+
+@benchmark('player.get_purchase_plans')
+def _get_purchase_plans():
+    game = GameState.from_ruleset(ClassicRuleset.from_players(4), 0)
+    player = game.get_current_player()
+    player.tokens = Tokens(gold=2, ruby=2, emerald=2, sapphire=2, diamond=2)
+    return lambda: player.get_purchase_plans(game)
+
+
+@benchmark('game.resolve_noble_visit')
+def _resolve_noble_visit():
+    # the bonuses meet the requirements of a noble on display, every run takes the visit back
+    game = GameState.from_ruleset(ClassicRuleset.from_players(4), 0)
+    player, nobles = game.get_current_player(), game.shop.nobles
+    player.bonuses = nobles[0].cost.copy()
+
+    def run():
+        game.resolve_noble_visit()
+        game.shop.nobles = nobles
+        player.truncate(len(player.reserved_cards), player.development_cards.mask, 0)
+    return run
+
+
+@benchmark('game.legal_actions')
+def _legal_actions():
+    game = GameState.from_ruleset(ClassicRuleset.from_players(4), 0)
+    return game.legal_actions
+
+
+@benchmark('game.check_actions')
+def _check_actions():
+    game = GameState.from_ruleset(ClassicRuleset.from_players(4), 0)
+    actions = game.legal_actions()
+    return lambda: game.check_actions(actions)
+
+
+@benchmark('features.encode_batch')
+def _encode_batch():
+    ruleset = ClassicRuleset.from_players(4)
+    encoder = FeatureEncoder(ruleset, batch_size=64)
+    games = [GameState.from_ruleset(ruleset, seed) for seed in range(64)]
+    features, masks = encoder.new_buffers()
+    return lambda: encoder.encode_batch(games, features, masks)
+
+
+@benchmark('shop_tier.pick_and_replace')
+def _pick_and_replace():
+    tier = GameState.from_ruleset(ClassicRuleset.from_players(4), 0).shop.get_tier(1)
+
+    def run():
+        card = tier.pick_and_replace(0)
+        tier.put_back(0, card.id)
+    return run
+
+
+@benchmark('shop.get_initial_shop_state')
+def _initial_shop_state():
+    ruleset = ClassicRuleset.from_players(4)
+    return lambda: Shop.get_initial_shop_state(ruleset)
+
+
+@benchmark('game.from_ruleset')
+def _from_ruleset():
+    ruleset = ClassicRuleset.from_players(4)
+    return lambda: GameState.from_ruleset(ruleset)
+
+
+@benchmark('game.factory_create')
+def _factory_create():
+    factory = GameFactory(ClassicRuleset.from_players(4))
+    return lambda: factory.release(factory.create())
+
+
+@benchmark('game.apply_undo')
+def _apply_undo():
+    game = GameState.from_ruleset(ClassicRuleset.from_players(4), 0)
+    action = (PlayerAction.SELECT_TOKENS, {'tokens': Tokens(ruby=1, emerald=1, onyx=1)})
+    return lambda: game.undo(game.apply(action))
+
+
+@benchmark('game.apply_undo_instrumented')
+def _apply_undo_instrumented():
+    game = GameState.from_ruleset(ClassicRuleset.from_players(4), 0)
+    game.instrumentation = Instrumentation()
+    action = (PlayerAction.SELECT_TOKENS, {'tokens': Tokens(ruby=1, emerald=1, onyx=1)})
+    return lambda: game.undo(game.apply(action))
+
+
+@benchmark('game.clone')
+def _clone():
+    return GameState.from_ruleset(ClassicRuleset.from_players(4), 0).clone
+
+
+def _random_playout(players: int):
+    def setup():
+        seeds = iter(range(sys.maxsize))
+        return lambda: play_game([random_agent] * players, next(seeds))
+    return setup
+
+
+for _players in (2, 3, 4):
+    benchmark(f'playout.random_{_players}p')(_random_playout(_players))
+
+
+def measure(operation: Callable[[], object], min_time: float, repeat: int) -> dict[str, float]:
+    # calibrates the amount of calls to last at least `min_time`, keeps the best of `repeat` runs
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            operation()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / 10:
+            break
+        loops *= 10
+    loops = max(1, int(loops * min_time / max(elapsed, 1e-9)))
+
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            operation()
+        best = min(best, (time.perf_counter() - started) / loops)
+
+    tracemalloc.start()
+    try:
+        # warm up caches first, so only the memory a steady-state call allocates is counted
+        operation()
+        tracemalloc.reset_peak()
+        baseline_bytes = tracemalloc.get_traced_memory()[0]
+        operation()
+        peak_bytes = tracemalloc.get_traced_memory()[1] - baseline_bytes
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'ops_per_sec': 1 / best,
+        'mean_us': best * 1e6,
+        'loops': loops,
+        'peak_alloc_bytes': peak_bytes,
+    }
+
+
+def run(names: Sequence[str], min_time: float = 0.2, repeat: int = 5) -> dict:
+    results = {}
+    for name in names:
+        results[name] = measure(BENCHMARKS[name](), min_time, repeat)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'timestamp': time.time(),
+        },
+        'results': results,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    # names of the benchmarks whose throughput dropped by more than `threshold` (a fraction)
+    regressions = []
+    for name, result in results['results'].items():
+        base = baseline['results'].get(name)
+        if base and result['ops_per_sec'] < base['ops_per_sec'] * (1 - threshold):
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m splendor.bench')
+    parser.add_argument('-k', '--filter', default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('-o', '--output', help='write the results as json to this file')
+    parser.add_argument('-b', '--baseline', help='json results of a previous run to compare against')
+    parser.add_argument('-t', '--threshold', type=float, default=0.1, help='tolerated slowdown, as a fraction')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds each measurement lasts')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--list', action='store_true')
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    if args.list:
+        print('\n'.join(names))
+        return 0
+
+    results = run(names, args.min_time, args.repeat)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    print(f'{"benchmark":40} {"ops/s":>14} {"us/op":>10} {"alloc B":>9} {"vs base":>8}')
+    for name, result in results['results'].items():
+        base = baseline and baseline['results'].get(name)
+        change = f'{result["ops_per_sec"] / base["ops_per_sec"] - 1:+.1%}' if base else ''
+        print(
+            f'{name:40} {result["ops_per_sec"]:14,.0f} {result["mean_us"]:10.2f} '
+            f'{result["peak_alloc_bytes"]:9} {change:>8}'
+        )
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'regressed beyond {args.threshold:.0%}: {", ".join(regressions)}', file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
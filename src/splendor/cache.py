@@ -0,0 +1,266 @@
+import os
+import pickle
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from .game import GameState
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS positions (
+    ruleset INTEGER NOT NULL,
+    players INTEGER NOT NULL,
+    hash INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    value BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (ruleset, players, hash)
+);
+CREATE INDEX IF NOT EXISTS positions_last_used ON positions (last_used);
+'''
+
+# a stored result only replaces one that was searched at most as deeply
+UPSERT = '''
+INSERT INTO positions (ruleset, players, hash, depth, value, last_used) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (ruleset, players, hash) DO UPDATE SET
+    depth = excluded.depth, value = excluded.value, last_used = excluded.last_used
+WHERE excluded.depth >= positions.depth
+'''
+
+CacheKey = tuple[int, int, int]  # ruleset id, player count, zobrist hash
+
+
+class CachedResult(NamedTuple):
+    depth: int
+    value: Any
+
+
+class PositionCache:
+    # two-level store of search results, evaluations or best moves keyed by the zobrist hash of a
+    # position: a bounded LRU in front of an optional sqlite file that outlives the process and is
+    # shared by every process opening the same path; the file runs in WAL mode, so readers never
+    # wait for a writer, and connections are reopened after a fork; memory hits refresh the
+    # file's `last_used` in batches of `evict_interval`, or when evicting or closing
+    path: Optional[str]
+    memory_size: int
+    disk_size: int
+
+    memory_hits: int
+    disk_hits: int
+    misses: int
+    stores: int
+    evictions: int
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        memory_size: int = 1 << 16,
+        disk_size: int = 1 << 22,
+        evict_interval: int = 1024,
+        timeout: float = 30.0,
+    ):
+        self.path = path
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.evict_interval = evict_interval  # stores between two checks of the file size
+        self.timeout = timeout
+        self._memory: OrderedDict[CacheKey, CachedResult] = OrderedDict()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._pending_stores = 0
+        self._touched: set[CacheKey] = set()  # memory hits whose `last_used` is not written yet
+        self.reset_stats()
+
+    @staticmethod
+    def get_key(game: 'GameState') -> CacheKey:
+        return game.ruleset.RULESET_ID, game.ruleset.PLAYER_COUNT, game.zobrist_hash
+
+    def probe(self, game: 'GameState', min_depth: int = 0) -> Optional[CachedResult]:
+        key = self.get_key(game)
+        result = self._memory.get(key)
+        if result is not None and result.depth >= min_depth:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            if self.path is not None:
+                self._touched.add(key)
+                if len(self._touched) >= self.evict_interval:
+                    self._flush_touched()
+            return result
+
+        if self.path is not None:
+            result = self._load(key)
+            if result is not None and result.depth >= min_depth:
+                self._remember(key, result)
+                self.disk_hits += 1
+                return result
+
+        self.misses += 1
+        return None
+
+    def get(self, game: 'GameState', default: Any = None, min_depth: int = 0) -> Any:
+        result = self.probe(game, min_depth)
+        return default if result is None else result.value
+
+    def store(self, game: 'GameState', value: Any, depth: int = 0) -> None:
+        key = self.get_key(game)
+        current = self._memory.get(key)
+        if current is None and self.path is not None:
+            # a deeper result may have left the memory but still be on disk
+            current = self._load(key)
+            if current is not None and current.depth > depth:
+                self._remember(key, current)
+        if current is not None and current.depth > depth:
+            return
+
+        result = CachedResult(depth, value)
+        self._remember(key, result)
+        self.stores += 1
+        if self.path is not None:
+            self._save(key, result)
+
+    def cached(self, function: Callable[['GameState'], Any], depth: int = 0) -> Callable[['GameState'], Any]:
+        # wraps a position evaluation, e.g. a `mcts.Evaluation`, to only compute unseen positions
+        def evaluate(game: 'GameState') -> Any:
+            result = self.probe(game, depth)
+            if result is not None:
+                return result.value
+            value = function(game)
+            self.store(game, value, depth)
+            return value
+        return evaluate
+
+    def _remember(self, key: CacheKey, result: CachedResult) -> None:
+        memory = self._memory
+        memory[key] = result
+        memory.move_to_end(key)
+        while len(memory) > self.memory_size:
+            memory.popitem(last=False)
+
+    def _get_connection(self) -> sqlite3.Connection:
+        # sqlite connections must not cross a fork, every process opens its own
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # losing the last few results on a power loss is fine for a cache
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    @staticmethod
+    def _to_row_key(key: CacheKey) -> tuple[int, int, int]:
+        # sqlite integers are signed 64-bit
+        ruleset, players, value = key
+        return ruleset, players, value - (1 << 64) if value >= 1 << 63 else value
+
+    def _load(self, key: CacheKey) -> Optional[CachedResult]:
+        connection = self._get_connection()
+        row_key = self._to_row_key(key)
+        row = connection.execute(
+            'SELECT depth, value FROM positions WHERE ruleset = ? AND players = ? AND hash = ?', row_key,
+        ).fetchone()
+        if row is None:
+            return None
+
+        connection.execute(
+            'UPDATE positions SET last_used = ? WHERE ruleset = ? AND players = ? AND hash = ?',
+            (time.time(), *row_key),
+        )
+        return CachedResult(row[0], pickle.loads(row[1]))
+
+    def _save(self, key: CacheKey, result: CachedResult) -> None:
+        connection = self._get_connection()
+        connection.execute(UPSERT, (
+            *self._to_row_key(key),
+            result.depth,
+            pickle.dumps(result.value, protocol=pickle.HIGHEST_PROTOCOL),
+            time.time(),
+        ))
+
+        self._pending_stores += 1
+        if self._pending_stores >= self.evict_interval:
+            self._pending_stores = 0
+            self.evict()
+
+    def _flush_touched(self) -> None:
+        keys, self._touched = self._touched, set()
+        if not keys:
+            return
+        now = time.time()
+        self._get_connection().executemany(
+            'UPDATE positions SET last_used = ? WHERE ruleset = ? AND players = ? AND hash = ?',
+            [(now, *self._to_row_key(key)) for key in keys],
+        )
+
+    def evict(self) -> int:
+        # drops the least recently used results past `disk_size`, returns how many were dropped
+        if self.path is None:
+            return 0
+
+        self._flush_touched()
+        connection = self._get_connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            excess = connection.execute('SELECT count(*) FROM positions').fetchone()[0] - self.disk_size
+            if excess <= 0:
+                return 0
+            connection.execute(
+                'DELETE FROM positions WHERE rowid IN (SELECT rowid FROM positions ORDER BY last_used LIMIT ?)',
+                (excess,),
+            )
+        self.evictions += excess
+        return excess
+
+    def reset_stats(self) -> None:
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        # plain, json-serializable copy of the counters
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'memory_entries': len(self._memory),
+        }
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self._touched.clear()
+        if self.path is not None:
+            self._get_connection().execute('DELETE FROM positions')
+        self.reset_stats()
+
+    def __len__(self):
+        if self.path is None:
+            return len(self._memory)
+        return self._get_connection().execute('SELECT count(*) FROM positions').fetchone()[0]
+
+    def close(self) -> None:
+        if self._connection is not None and self._pid == os.getpid():
+            self._flush_touched()
+            self._connection.close()
+        self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getstate__(self):
+        # worker processes get the configuration and open their own connection
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        state['_pid'] = None
+        state['_touched'] = set()
+        return state
@@ -1,20 +1,52 @@
-from random import shuffle
-from typing import MutableSequence, TypeVar
+import random
+from array import array
+from random import Random, shuffle
+from typing import Iterable, Iterator, MutableSequence, Optional, Self, Sequence, TypeVar
 
 from .tokens import Gem, Gems
 
+EMPTY_CARD_ID = 0xFF
+
 
 class DevelopmentCard:
+    # cards are shared flyweights handed out by `CARD_CATALOG`, which also assigns their `id`;
+    # their attributes cannot be reassigned, as every game holding the card would see the change
+    __slots__ = ('id', 'gem', 'prestige', 'cost', 'tier')
+
+    id: int
     gem: Gem
     prestige: int
     cost: Gems
     tier: int
 
     def __init__(self, gem, prestige, cost, tier):
-        self.gem = gem
-        self.prestige = prestige
-        self.cost = cost
-        self.tier = tier
+        object.__setattr__(self, 'id', EMPTY_CARD_ID)
+        object.__setattr__(self, 'gem', gem)
+        object.__setattr__(self, 'prestige', prestige)
+        object.__setattr__(self, 'cost', cost)
+        object.__setattr__(self, 'tier', tier)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def _set_id(self, card_id: int) -> None:
+        # a card is numbered once, by the catalog interning it
+        if self.id not in (EMPTY_CARD_ID, card_id):
+            raise ValueError(f'card already has id {self.id}')
+        object.__setattr__(self, 'id', card_id)
+
+    def __reduce__(self):
+        # unpickles to the catalog's own instance
+        return get_card, (self.id,)
+
+    def __repr__(self):
+        return (
+            f'{self.__class__.__name__}(id={self.id}, gem={self.gem.value}, prestige={self.prestige}, '
+            f'tier={self.tier})'
+        )
 
 
 T = TypeVar('T')
@@ -24,8 +56,16 @@ class AbstractCards(MutableSequence[T]):
     def __init__(self, *cards: T):
         self._cards: list[T] = list(cards)
 
-    def shuffle(self) -> None:
-        shuffle(self)
+    def shuffle(self, rng: Optional[Random] = None) -> None:
+        if rng is None:
+            shuffle(self)
+        else:
+            rng.shuffle(self)
+
+    def copy(self) -> 'AbstractCards[T]':
+        cards = object.__new__(self.__class__)
+        cards._cards = self._cards.copy()
+        return cards
 
     def insert(self, index, value):
         return self._cards.insert(index, value)
@@ -43,7 +83,241 @@ class AbstractCards(MutableSequence[T]):
         return self._cards.__len__()
 
 
-DevelopmentCards = AbstractCards[DevelopmentCard]
+class DevelopmentCards(AbstractCards[DevelopmentCard]):
+    # card ids packed in a byte array, the cards themselves are looked up in `CARD_CATALOG`
+    ids: array
+
+    def __init__(self, *cards: DevelopmentCard):
+        self.ids = array('B', [card.id for card in cards])
+
+    @classmethod
+    def from_ids(cls, ids: Iterable[int]) -> Self:
+        cards = object.__new__(cls)
+        cards.ids = array('B', ids)
+        return cards
+
+    def shuffle(self, rng: Optional[Random] = None) -> None:
+        # permutes the ids exactly like shuffling a list of the same length would
+        (rng or random).shuffle(self.ids)
+
+    def copy(self) -> Self:
+        cards = object.__new__(self.__class__)
+        cards.ids = self.ids[:]
+        return cards
+
+    def insert(self, index, value):
+        self.ids.insert(index, value.id)
+
+    def append(self, value):
+        self.ids.append(value.id)
+
+    def pop(self, index=-1):
+        return CARD_CATALOG.cards[self.ids.pop(index)]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.from_ids(self.ids[index])
+        return CARD_CATALOG.cards[self.ids[index]]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self.ids[index] = array('B', [card.id for card in value])
+        else:
+            self.ids[index] = value.id
+
+    def __delitem__(self, index):
+        del self.ids[index]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[DevelopmentCard]:
+        return map(CARD_CATALOG.cards.__getitem__, self.ids)
+
+    def __contains__(self, value):
+        return isinstance(value, DevelopmentCard) and value.id in self.ids
+
+
+class CardSlots(AbstractCards[Optional[DevelopmentCard]]):
+    # cards of a byte array of card ids that may hold empty slots, which read as `None`; a view,
+    # so writes go through to the array
+    ids: array
+
+    def __init__(self, ids: array):
+        self.ids = ids
+
+    @staticmethod
+    def _get_id(card: Optional[DevelopmentCard]) -> int:
+        return EMPTY_CARD_ID if card is None else card.id
+
+    def copy(self) -> Self:
+        # detached from the array of this view
+        return self.__class__(self.ids[:])
+
+    def insert(self, index, value):
+        self.ids.insert(index, self._get_id(value))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [CARD_CATALOG.get_card(card_id) for card_id in self.ids[index]]
+        return CARD_CATALOG.get_card(self.ids[index])
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self.ids[index] = array('B', [self._get_id(card) for card in value])
+        else:
+            self.ids[index] = self._get_id(value)
+
+    def __delitem__(self, index):
+        del self.ids[index]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[Optional[DevelopmentCard]]:
+        return map(CARD_CATALOG.get_card, self.ids)
+
+    def __eq__(self, other):
+        if isinstance(other, (CardSlots, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({list(self)})'
+
+
+class CardSet:
+    # unordered set of development cards kept as a bitmask, bit `i` standing for the card with id `i`;
+    # iterates in card id order
+    __slots__ = ('mask',)
+
+    mask: int
+
+    def __init__(self, *cards: DevelopmentCard):
+        mask = 0
+        for card in cards:
+            mask |= 1 << card.id
+        self.mask = mask
+
+    @classmethod
+    def from_mask(cls, mask: int) -> Self:
+        cards = object.__new__(cls)
+        cards.mask = mask
+        return cards
+
+    @classmethod
+    def from_ids(cls, ids: Iterable[int]) -> Self:
+        mask = 0
+        for card_id in ids:
+            mask |= 1 << card_id
+        return cls.from_mask(mask)
+
+    @property
+    def ids(self) -> list[int]:
+        ids = []
+        mask = self.mask
+        while mask:
+            lowest = mask & -mask
+            ids.append(lowest.bit_length() - 1)
+            mask ^= lowest
+        return ids
+
+    def copy(self) -> Self:
+        return self.from_mask(self.mask)
+
+    def add(self, card: DevelopmentCard) -> None:
+        self.mask |= 1 << card.id
+
+    def discard(self, card: DevelopmentCard) -> None:
+        self.mask &= ~(1 << card.id)
+
+    def clear(self) -> None:
+        self.mask = 0
+
+    def get_gem_counts(self) -> Gems:
+        # bonuses granted by the cards, counted per gem without visiting them
+        mask = self.mask
+        return Gems.from_values([(mask & gem_mask).bit_count() for gem_mask in CARD_CATALOG.gem_masks])
+
+    def get_prestige(self) -> int:
+        mask = self.mask
+        return sum(
+            prestige * (mask & prestige_mask).bit_count()
+            for prestige, prestige_mask in enumerate(CARD_CATALOG.prestige_masks)
+        )
+
+    def __len__(self):
+        return self.mask.bit_count()
+
+    def __iter__(self) -> Iterator[DevelopmentCard]:
+        return map(CARD_CATALOG.cards.__getitem__, self.ids)
+
+    def __contains__(self, value):
+        return isinstance(value, DevelopmentCard) and bool(self.mask >> value.id & 1)
+
+    def __eq__(self, other):
+        if isinstance(other, CardSet):
+            return self.mask == other.mask
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.mask)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(ids={self.ids})'
+
+
+class CardCatalog:
+    # interned, numbered set of every development card, with the card attributes packed
+    # into byte arrays indexed by card id; costs are stored `Gems`-layout rows of `GEM_COUNT`
+    GEM_COUNT = len(Gems.TOKEN_TYPES)
+
+    cards: list[DevelopmentCard]
+    costs: array
+    gems: array
+    prestige: array
+    tiers: array
+    # bitmasks of the card ids of every gem, in the `Gems` layout, and of every prestige value
+    gem_masks: list[int]
+    prestige_masks: list[int]
+
+    def __init__(self, cards: Sequence[DevelopmentCard]):
+        if len(cards) >= EMPTY_CARD_ID:
+            raise ValueError('card ids must fit a byte')
+
+        self.cards = list(cards)
+        for card_id, card in enumerate(self.cards):
+            card._set_id(card_id)
+
+        self.costs = array('B', [count for card in self.cards for count in card.cost.values()])
+        self.gems = array('B', [Gems.TOKEN_TYPES.index(card.gem.value) for card in self.cards])
+        self.prestige = array('B', [card.prestige for card in self.cards])
+        self.tiers = array('B', [card.tier for card in self.cards])
+
+        self.gem_masks = [0] * self.GEM_COUNT
+        self.prestige_masks = [0] * (max(self.prestige, default=0) + 1)
+        for card_id, (gem, prestige) in enumerate(zip(self.gems, self.prestige)):
+            self.gem_masks[gem] |= 1 << card_id
+            self.prestige_masks[prestige] |= 1 << card_id
+
+    def __reduce_ex__(self, protocol):
+        # the shared catalog unpickles to itself, like its cards
+        if self is CARD_CATALOG:
+            return get_card_catalog, ()
+        return super().__reduce_ex__(protocol)
+
+    def __len__(self):
+        return len(self.cards)
+
+    def get_card(self, card_id: int) -> Optional[DevelopmentCard]:
+        return None if card_id == EMPTY_CARD_ID else self.cards[card_id]
+
+    def get_cost(self, card_id: int) -> array:
+        return self.costs[card_id * self.GEM_COUNT:(card_id + 1) * self.GEM_COUNT]
+
+    def get_tier_ids(self, tier: int) -> list[int]:
+        return [card_id for card_id, card_tier in enumerate(self.tiers) if card_tier == tier]
+
 
 TIER_ONE_CARDS = [
     DevelopmentCard(gem=Gem.ONYX, prestige=0, cost=Gems(diamond=1, sapphire=1, emerald=1, ruby=1, onyx=0), tier=1),
@@ -143,3 +417,13 @@ TIER_THREE_CARDS = [
     DevelopmentCard(gem=Gem.RUBY, prestige=4, cost=Gems(diamond=0, sapphire=3, emerald=6, ruby=3, onyx=0), tier=3),
     DevelopmentCard(gem=Gem.RUBY, prestige=5, cost=Gems(diamond=0, sapphire=0, emerald=7, ruby=3, onyx=0), tier=3),
 ]
+
+CARD_CATALOG = CardCatalog(TIER_ONE_CARDS + TIER_TWO_CARDS + TIER_THREE_CARDS)
+
+
+def get_card(card_id: int) -> Optional[DevelopmentCard]:
+    return CARD_CATALOG.get_card(card_id)
+
+
+def get_card_catalog() -> CardCatalog:
+    return CARD_CATALOG
@@ -0,0 +1,60 @@
+from enum import Enum
+from typing import NamedTuple
+
+from .exceptions import GameOver, IllegalPlayerActionError, OverPlayerTokenLimit
+
+
+class ActionCheck(Enum):
+    # outcome of validating an action without raising, the member name is the code and its value
+    # the reason; `perform_player_turn` raises `get_error(...)` for anything but `OK`
+    OK = 'the action is legal'
+    UNSUPPORTED_ACTION = 'the action is not supported'
+    INVALID_PARAMETERS = 'the action parameters do not match the action'
+    GAME_OVER = 'the game is over'
+
+    NEGATIVE_TOKENS = 'a token selection may not hold negative amounts'
+    GOLD_SELECTED = 'gold may only be obtained by reserving a card'
+    TOO_MANY_TOKENS = 'at most three tokens may be selected'
+    DOUBLE_PICK_TOO_LARGE = 'two tokens of the same kind may not be combined with others'
+    DOUBLE_PICK_PILE_TOO_SMALL = 'two tokens of the same kind require a pile of at least four'
+    DISTINCT_PICK_SIZE = 'three different tokens must be selected, unless fewer kinds are left'
+    COMMUNITY_TOKENS_MISSING = 'the selected tokens are not left in the community pool'
+    PLAYER_TOKEN_LIMIT = 'the player holds more tokens than allowed and has to discard first'
+
+    DISCARD_SIZE = 'exactly one token is discarded at a time'
+    NOTHING_TO_DISCARD = 'the player does not hold more tokens than allowed'
+    TOKENS_NOT_HELD = 'the player does not hold the token to discard'
+
+    RESERVED_CARD_LIMIT = 'the player holds the maximum amount of reserved cards'
+    TIER_OUT_OF_RANGE = 'the shop has no such tier'
+    COLUMN_OUT_OF_RANGE = 'the shop tier has no such slot'
+    EMPTY_SLOT = 'the shop slot is empty'
+
+    PURCHASE_SOURCE = 'a card is bought either from the shop or from the reserved cards'
+    RESERVED_INDEX_OUT_OF_RANGE = 'the player holds no such reserved card'
+    CARD_UNAFFORDABLE = 'bonuses, gem tokens and gold do not cover the cost of the card'
+
+    @property
+    def ok(self) -> bool:
+        return self is ActionCheck.OK
+
+    def get_error(self, default: type[IllegalPlayerActionError] = IllegalPlayerActionError) -> IllegalPlayerActionError:
+        # `default` is the error class of the checked action
+        return _ERRORS.get(self, default)(self.value)
+
+
+# codes raising something more specific than the error class of their action
+_ERRORS = {
+    ActionCheck.GAME_OVER: GameOver,
+    ActionCheck.PLAYER_TOKEN_LIMIT: OverPlayerTokenLimit,
+}
+
+
+class CheckContext(NamedTuple):
+    # the parts of a state every candidate action of the current player is checked against,
+    # computed once by `Player.get_check_context` and shared across a batch
+    available_gem_types: int  # gem kinds left in the community pool
+    token_room: int  # tokens the player may still take, negative while they have to discard
+    reserved_room: int  # cards the player may still reserve
+    buying_power: list[int]  # bonuses plus gem tokens, `Gems` layout
+    gold: int
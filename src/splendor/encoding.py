@@ -0,0 +1,218 @@
+from typing import Optional
+
+from .cards import CARD_CATALOG, EMPTY_CARD_ID, CardSet, DevelopmentCards
+from .exceptions import InvalidGameConfiguration
+from .game import GameState
+from .nobles import EMPTY_NOBLE_ID
+from .player import Player
+from .ruleset import CompiledRuleset, Ruleset
+from .shop import Shop, ShopTier
+from .tokens import Tokens
+
+FORMAT_VERSION = 2
+HEADER_SIZE = 4  # format version, ruleset id, player count, player turn
+TOKEN_SLOTS = len(Tokens.TOKEN_TYPES)
+
+
+class GameStateCodec:
+    # fixed-size byte layout of a game, every field of a given ruleset and player count lives at
+    # the same offset:
+    #
+    #   header             version, ruleset id, player count, player turn
+    #   community tokens   one byte per token type
+    #   shop nobles        ids of the nobles still to visit
+    #   per player         tokens, owned cards as a bitmap over card ids, reserved card ids,
+    #                      visited nobles as a bitmap over noble ids
+    #   per shop tier      visible card ids, restock pile size, restock pile ids bottom to top
+    #
+    # absent cards are `EMPTY_CARD_ID` and absent nobles `EMPTY_NOBLE_ID`; the order of owned
+    # cards and nobles and the game's RNG are not kept; the header only names the ruleset, so
+    # games of a customised ruleset have to be decoded with the codec they were encoded with
+    _cache: dict[int, tuple[CompiledRuleset, 'GameStateCodec']] = {}  # by compiled ruleset identity
+    _registered: dict[tuple[int, int], 'GameStateCodec'] = {}  # by ruleset id and player count
+
+    def __init__(self, ruleset: Ruleset):
+        self.ruleset = ruleset = ruleset.compile()
+        catalog = CARD_CATALOG
+        self.card_bitmap_size = (len(catalog) + 7) // 8
+        self.reserved_size = ruleset.MAX_PLAYER_RESERVED_CARDS
+        self.tier_size = ruleset.SHOP_TIER_CARDS_COUNT
+        self.pile_size = max(len(catalog.get_tier_ids(tier)) for tier in range(1, ruleset.SHOP_TIER_COUNT + 1))
+
+        self.noble_bitmap_size = (len(ruleset.NOBLE_CATALOG) + 7) // 8
+        self.nobles_size = ruleset.NOBLE_COUNT
+
+        self.community_tokens_offset = HEADER_SIZE
+        self.nobles_offset = self.community_tokens_offset + TOKEN_SLOTS
+        self.player_size = TOKEN_SLOTS + self.card_bitmap_size + self.reserved_size + self.noble_bitmap_size
+        self.players_offset = self.nobles_offset + self.nobles_size
+        self.shop_tier_size = self.tier_size + 1 + self.pile_size
+        self.shop_offset = self.players_offset + self.player_size * ruleset.PLAYER_COUNT
+        self.size = self.shop_offset + self.shop_tier_size * ruleset.SHOP_TIER_COUNT
+
+    @classmethod
+    def for_ruleset(cls, ruleset: Ruleset) -> 'GameStateCodec':
+        # slot sizes depend on several fields of the ruleset, so customised configs get their own
+        ruleset = ruleset.compile()
+        entry = cls._cache.get(id(ruleset))
+        if entry is None or entry[0] is not ruleset:
+            entry = cls._cache[id(ruleset)] = ruleset, cls(ruleset)
+        return entry[1]
+
+    @classmethod
+    def for_buffer(cls, buffer, offset: int = 0) -> 'GameStateCodec':
+        version, ruleset_id, player_count = buffer[offset:offset + 3]
+        if version != FORMAT_VERSION:
+            raise InvalidGameConfiguration(f'unsupported game encoding version {version}')
+        return cls.for_id(ruleset_id, player_count)
+
+    @classmethod
+    def for_id(cls, ruleset_id: int, player_count: int) -> 'GameStateCodec':
+        # codec of the registered ruleset, the one games in a buffer are decoded with
+        key = (ruleset_id, player_count)
+        if key not in cls._registered:
+            cls._registered[key] = cls.for_ruleset(Ruleset.from_id(ruleset_id, player_count))
+        return cls._registered[key]
+
+    def get_player_offset(self, player: int) -> int:
+        return self.players_offset + player * self.player_size
+
+    def get_shop_tier_offset(self, tier: int) -> int:
+        # `tier` counts from one, like `Shop.get_tier`
+        return self.shop_offset + (tier - 1) * self.shop_tier_size
+
+    def encode(self, game: GameState) -> bytes:
+        buffer = bytearray(self.size)
+        self.encode_into(game, buffer)
+        return bytes(buffer)
+
+    def encode_into(self, game: GameState, buffer, offset: int = 0) -> None:
+        # raises instead of shifting the fields that follow when a part of the game does not fit its slots
+        ruleset = self.ruleset
+        if len(game.players) != ruleset.PLAYER_COUNT or len(game.shop.tiers) != ruleset.SHOP_TIER_COUNT:
+            raise InvalidGameConfiguration('game does not match the codec')
+        buffer[offset:offset + HEADER_SIZE] = bytes((
+            FORMAT_VERSION, ruleset.RULESET_ID, ruleset.PLAYER_COUNT, game.player_turn,
+        ))
+        position = offset + self.community_tokens_offset
+        buffer[position:position + TOKEN_SLOTS] = bytes(game.community_tokens.values())
+        position = offset + self.nobles_offset
+        nobles = bytes(noble.id for noble in game.shop.nobles)
+        _check_fits('shop nobles', len(nobles), self.nobles_size)
+        buffer[position:position + self.nobles_size] = (
+            nobles + bytes((EMPTY_NOBLE_ID,)) * (self.nobles_size - len(nobles))
+        )
+
+        for i, player in enumerate(game.players):
+            position = offset + self.get_player_offset(i)
+            buffer[position:position + TOKEN_SLOTS] = bytes((Tokens() + player.tokens).values())
+            position += TOKEN_SLOTS
+
+            bitmap = player.development_cards.mask
+            buffer[position:position + self.card_bitmap_size] = bitmap.to_bytes(self.card_bitmap_size, 'little')
+            position += self.card_bitmap_size
+
+            reserved = player.reserved_cards.ids
+            _check_fits('reserved cards', len(reserved), self.reserved_size)
+            buffer[position:position + self.reserved_size] = (
+                reserved.tobytes() + bytes((EMPTY_CARD_ID,)) * (self.reserved_size - len(reserved))
+            )
+            position += self.reserved_size
+
+            bitmap = 0
+            for noble in player.nobles:
+                bitmap |= 1 << noble.id
+            buffer[position:position + self.noble_bitmap_size] = bitmap.to_bytes(self.noble_bitmap_size, 'little')
+
+        for i, tier in enumerate(game.shop.tiers, start=1):
+            position = offset + self.get_shop_tier_offset(i)
+            if len(tier.card_ids) != self.tier_size:
+                raise InvalidGameConfiguration(f'{len(tier.card_ids)} shop cards do not fill {self.tier_size} slots')
+            buffer[position:position + self.tier_size] = tier.card_ids.tobytes()
+            position += self.tier_size
+
+            pile = tier.restock_pile.ids
+            _check_fits('restock pile cards', len(pile), self.pile_size)
+            buffer[position] = len(pile)
+            buffer[position + 1:position + 1 + self.pile_size] = (
+                pile.tobytes() + bytes((EMPTY_CARD_ID,)) * (self.pile_size - len(pile))
+            )
+
+    def decode(self, buffer, offset: int = 0) -> GameState:
+        buffer = memoryview(buffer)
+        ruleset = self.ruleset
+        if bytes(buffer[offset:offset + 3]) != bytes((FORMAT_VERSION, ruleset.RULESET_ID, ruleset.PLAYER_COUNT)):
+            raise InvalidGameConfiguration('encoded game does not match the codec')
+
+        noble_catalog = ruleset.NOBLE_CATALOG
+        players = []
+        for i in range(ruleset.PLAYER_COUNT):
+            position = offset + self.get_player_offset(i)
+            tokens = Tokens.from_values(buffer[position:position + TOKEN_SLOTS])
+            position += TOKEN_SLOTS
+
+            bitmap = int.from_bytes(buffer[position:position + self.card_bitmap_size], 'little')
+            development_cards = CardSet.from_mask(bitmap)
+            position += self.card_bitmap_size
+
+            reserved_cards = DevelopmentCards.from_ids(
+                card_id for card_id in buffer[position:position + self.reserved_size] if card_id != EMPTY_CARD_ID
+            )
+            position += self.reserved_size
+
+            bitmap = int.from_bytes(buffer[position:position + self.noble_bitmap_size], 'little')
+            nobles = [
+                noble_catalog.nobles[noble_id]
+                for noble_id in range(bitmap.bit_length())
+                if bitmap >> noble_id & 1
+            ]
+            players.append(Player(
+                ruleset,
+                reserved_cards=reserved_cards,
+                development_cards=development_cards,
+                nobles=nobles,
+                tokens=tokens,
+            ))
+
+        tiers = []
+        for i in range(1, ruleset.SHOP_TIER_COUNT + 1):
+            position = offset + self.get_shop_tier_offset(i)
+            pile_count = buffer[position + self.tier_size]
+            pile_start = position + self.tier_size + 1
+            tiers.append(ShopTier(
+                ruleset,
+                tier_numer=i,
+                restock_pile=DevelopmentCards.from_ids(buffer[pile_start:pile_start + pile_count]),
+                available_cards=[
+                    CARD_CATALOG.get_card(card_id) for card_id in buffer[position:position + self.tier_size]
+                ],
+            ))
+
+        position = offset + self.nobles_offset
+        nobles = [
+            noble_catalog.nobles[noble_id]
+            for noble_id in buffer[position:position + self.nobles_size]
+            if noble_id != EMPTY_NOBLE_ID
+        ]
+
+        position = offset + self.community_tokens_offset
+        return GameState(
+            ruleset,
+            players,
+            Shop(ruleset, nobles=nobles, tiers=tiers),
+            Tokens.from_values(buffer[position:position + TOKEN_SLOTS]),
+            player_turn=buffer[offset + 3],
+        )
+
+
+def _check_fits(field: str, count: int, size: int) -> None:
+    if count > size:
+        raise InvalidGameConfiguration(f'{count} {field} do not fit {size} slots')
+
+
+def encode_game(game: GameState) -> bytes:
+    return GameStateCodec.for_ruleset(game.ruleset).encode(game)
+
+
+def decode_game(buffer, offset: int = 0, codec: Optional[GameStateCodec] = None) -> GameState:
+    return (codec or GameStateCodec.for_buffer(buffer, offset)).decode(buffer, offset)
@@ -30,6 +30,10 @@ class IllegalCardReservation(IllegalPlayerActionError):
     pass
 
 
+class IllegalTokenDiscard(IllegalPlayerActionError):
+    pass
+
+
 class NotEnoughCommunityTokensError(InvalidTokenPullError):
     pass
 
@@ -48,3 +52,27 @@ class NotEnoughPlayers(InvalidGameConfiguration):
 
 class InvalidShopTierCount(InvalidGameConfiguration):
     pass
+
+
+class OutOfTurnAction(IllegalPlayerActionError):
+    pass
+
+
+class GameOver(IllegalPlayerActionError):
+    pass
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class UnknownSession(ProtocolError):
+    pass
+
+
+class IllegalCardPurchase(IllegalPlayerActionError):
+    pass
+
+
+class ConcurrentSlotUpdate(Exception):
+    pass
@@ -0,0 +1,164 @@
+from typing import Iterator, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from .batch import EMPTY_SLOT, BatchGameState
+from .cards import CARD_CATALOG
+from .exceptions import InvalidGameConfiguration
+from .game import GameState
+from .replay import ReplayReader
+from .ruleset import Ruleset
+from .tokens import Gems, Tokens
+
+# every card slot is described by a presence flag, a one-hot of the gem it grants,
+# its prestige and its cost in the `Gems` layout
+CARD_FEATURES = 1 + len(Gems.TOKEN_TYPES) + 1 + len(Gems.TOKEN_TYPES)
+
+
+class TrainingBatch(NamedTuple):
+    # views into the buffers of `FeatureEncoder.iter_batches`, only valid until the next batch
+    features: np.ndarray  # (positions, features)
+    masks: np.ndarray  # (positions, actions), legal action flags
+    actions: np.ndarray  # (positions,), `ActionSpace` id of the action played
+    values: np.ndarray  # (positions,), final outcome for the player to move: 1 won, 0 shared, -1 lost
+
+
+class FeatureEncoder:
+    # writes positions as fixed-size float32 rows seen from the player to move, whose seat comes
+    # first; positions are staged in a `BatchGameState` of `batch_size` games, so every feature
+    # is computed for a whole batch at once
+    ruleset: Ruleset
+    batch_size: int
+    size: int  # features per position
+    offsets: dict[str, tuple[int, int]]  # feature range of every section
+
+    def __init__(self, ruleset: Ruleset, batch_size: int = 256):
+        self.ruleset = ruleset = ruleset.compile()
+        self.batch_size = batch_size
+        self._batch = BatchGameState(ruleset, batch_size)
+        self.action_space = self._batch.action_space
+
+        players, reserved = ruleset.PLAYER_COUNT, ruleset.MAX_PLAYER_RESERVED_CARDS
+        self.player_size = len(Tokens.TOKEN_TYPES) + len(Gems.TOKEN_TYPES) + 1 + reserved * CARD_FEATURES
+        sections = [
+            ('community', len(Tokens.TOKEN_TYPES)),
+            ('players', players * self.player_size),
+            ('shop', ruleset.SHOP_TIER_COUNT * ruleset.SHOP_TIER_CARDS_COUNT * CARD_FEATURES),
+            ('restock', ruleset.SHOP_TIER_COUNT),
+            ('nobles', len(ruleset.NOBLE_CATALOG)),
+        ]
+        self.offsets = {}
+        self.size = 0
+        for name, size in sections:
+            self.offsets[name] = self.size, self.size + size
+            self.size += size
+
+        # one row per byte value, like the tables of `BatchGameState`, `EMPTY_SLOT` is all zeros
+        catalog, batch = CARD_CATALOG, self._batch
+        gems = len(Gems.TOKEN_TYPES)
+        self.card_features = np.zeros((EMPTY_SLOT + 1, CARD_FEATURES), dtype=np.float32)
+        self.card_features[:len(catalog), 0] = 1
+        self.card_features[np.arange(len(catalog)), 1 + batch.card_gems[:len(catalog)]] = 1
+        self.card_features[:, 1 + gems] = batch.card_prestige
+        self.card_features[:, 2 + gems:] = batch.card_costs
+
+        self._actions = np.zeros(batch_size, dtype=np.int16)
+        self._values = np.zeros(batch_size, dtype=np.float32)
+
+    def new_buffers(self, positions: Optional[int] = None) -> tuple[np.ndarray, np.ndarray]:
+        # feature and legal mask buffers fitting `positions` rows, a batch by default
+        positions = self.batch_size if positions is None else positions
+        return (
+            np.zeros((positions, self.size), dtype=np.float32),
+            np.zeros((positions, self.action_space.size), dtype=bool),
+        )
+
+    def encode(
+        self,
+        game: GameState,
+        features: Optional[np.ndarray] = None,
+        mask: Optional[np.ndarray] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        if features is None or mask is None:
+            new_features, new_mask = self.new_buffers(1)
+            features = new_features[0] if features is None else features
+            mask = new_mask[0] if mask is None else mask
+        self.encode_batch([game], features[None], mask[None])
+        return features, mask
+
+    def encode_batch(self, games: Sequence[GameState], features: np.ndarray, masks: np.ndarray) -> None:
+        # fills the first `len(games)` rows of both buffers
+        for start in range(0, len(games), self.batch_size):
+            chunk = games[start:start + self.batch_size]
+            self._batch.load_game_states(chunk)
+            self._write(len(chunk), features[start:start + len(chunk)], masks[start:start + len(chunk)])
+
+    def iter_batches(self, paths: Sequence[str]) -> Iterator[TrainingBatch]:
+        # streams every position of the replay files in order, `batch_size` at a time; the last
+        # batch may be shorter, and the batches share the same buffers
+        features, masks = self.new_buffers()
+        packed = []
+        for path in paths:
+            with ReplayReader(path) as reader:
+                for game_index in range(len(reader)):
+                    game = reader.get_initial_state(game_index)
+                    self._check_ruleset(game)
+                    outcomes = get_outcomes(reader.get_state(game_index))
+                    for action in reader.get_actions(game_index):
+                        self._actions[len(packed)] = action
+                        self._values[len(packed)] = outcomes[game.player_turn]
+                        packed.append(self._batch.pack_game_state(game))
+                        if len(packed) == self.batch_size:
+                            yield self._flush(packed, features, masks)
+                            packed = []
+                        game.apply(self.action_space.decode(action))
+        if packed:
+            yield self._flush(packed, features, masks)
+
+    def _flush(self, packed: list[tuple], features: np.ndarray, masks: np.ndarray) -> TrainingBatch:
+        count = len(packed)
+        self._batch.load_packed(0, packed)
+        self._write(count, features[:count], masks[:count])
+        return TrainingBatch(features[:count], masks[:count], self._actions[:count], self._values[:count])
+
+    def _check_ruleset(self, game: GameState) -> None:
+        ruleset = game.ruleset
+        if (ruleset.RULESET_ID, ruleset.PLAYER_COUNT) != (self.ruleset.RULESET_ID, self.ruleset.PLAYER_COUNT):
+            raise InvalidGameConfiguration('replayed game does not match the encoder ruleset')
+
+    def _get_section(self, features: np.ndarray, name: str, *shape: int) -> np.ndarray:
+        start, stop = self.offsets[name]
+        return features[:, start:stop].reshape(len(features), *shape)
+
+    def _write(self, count: int, features: np.ndarray, masks: np.ndarray) -> None:
+        # only the first `count` staged games are current
+        batch, ruleset = self._batch, self.ruleset
+        games = np.arange(count)[:, None]
+        seats = (batch.player_turn[:count, None] + np.arange(ruleset.PLAYER_COUNT)) % ruleset.PLAYER_COUNT
+
+        self._get_section(features, 'community', len(Tokens.TOKEN_TYPES))[:] = batch.community_tokens[:count]
+
+        players = self._get_section(features, 'players', ruleset.PLAYER_COUNT, self.player_size)
+        tokens, gems = len(Tokens.TOKEN_TYPES), len(Gems.TOKEN_TYPES)
+        players[..., :tokens] = batch.player_tokens[games, seats]
+        players[..., tokens:tokens + gems] = batch.player_bonuses[games, seats]
+        players[..., tokens + gems] = batch.player_prestige[games, seats]
+        players[..., tokens + gems + 1:] = self.card_features[batch.reserved_cards[games, seats]].reshape(
+            count, ruleset.PLAYER_COUNT, -1,
+        )
+
+        shop = self._get_section(features, 'shop', -1, CARD_FEATURES)
+        shop[:] = self.card_features[batch.shop_cards[:count].reshape(count, -1)]
+        self._get_section(features, 'restock', ruleset.SHOP_TIER_COUNT)[:] = batch.restock_counts[:count]
+        self._get_section(features, 'nobles', len(ruleset.NOBLE_CATALOG))[:] = batch.shop_nobles[:count]
+
+        masks[:] = batch.get_legal_mask()[:count]
+
+
+def get_outcomes(game: GameState) -> list[float]:
+    # 1 for the only winner by `GameState.get_standings`, 0 for winners sharing the win, -1 for the others
+    winners = game.get_winners()
+    outcomes = [-1.0] * len(game.players)
+    for player in winners:
+        outcomes[player] = 1.0 if len(winners) == 1 else 0.0
+    return outcomes
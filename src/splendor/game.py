@@ -1,48 +1,118 @@
-from typing import Self
+from array import array
+from random import Random
+from time import perf_counter_ns
+from typing import Any, Iterable, NamedTuple, Optional, Self
 
-from .player import Player, PlayerAction
-from .ruleset import Ruleset
+from .checks import ActionCheck, CheckContext
+from .exceptions import IllegalPlayerActionError, InvalidGameConfiguration
+from .instrumentation import GameEvent, Instrumentation
+from .nobles import Noble
+from .player import Action, Player, PlayerAction, get_dispatch
+from .ruleset import CompiledRuleset, Ruleset
 from .shop import Shop
-from .tokens import Gems, Tokens
+from .tokens import Tokens
+from .zobrist import ZobristKeys
+
+
+class UndoRecord:
+    # the parts of a `GameState` a single action may touch, captured right before it is applied
+    __slots__ = (
+        'player_turn',
+        'player_tokens',
+        'community_tokens',
+        'reserved_cards',
+        'development_cards',
+        'nobles_count',
+        'shop_cards',
+        'shop_nobles',
+        'zobrist_hash',
+    )
+
+    def __init__(self, game: 'GameState'):
+        player = game.get_current_player()
+        self.player_turn = game.player_turn
+        self.player_tokens = player.tokens.copy()
+        self.community_tokens = game.community_tokens.copy()
+        # reserved cards can leave from any position when bought, so their ids are kept whole
+        self.reserved_cards = player.reserved_cards.ids.tobytes()
+        self.development_cards = player.development_cards.mask
+        self.nobles_count = len(player.nobles)
+        self.shop_cards = [tier.card_ids.tobytes() for tier in game.shop.tiers]
+        # noble visits replace the list instead of mutating it, so keeping a reference is enough
+        self.shop_nobles = game.shop.nobles
+        self.zobrist_hash = game.zobrist_hash
+
+
+class Standing(NamedTuple):
+    player: int
+    prestige: int
+    development_cards: int
+    rank: int  # 1 for the winners, players tied on prestige and cards share their rank
 
 
 class GameState:
-    ruleset: Ruleset
+    ruleset: CompiledRuleset
     player_turn: int = 0
     players: ['Player']
     shop: Shop
     community_tokens: Tokens
+    rng: Random
+    zobrist_keys: ZobristKeys
+    zobrist_hash: int
+    instrumentation: Optional[Instrumentation] = None  # not carried over to clones
 
     @classmethod
-    def from_ruleset(cls, ruleset: Ruleset) -> Self:
+    def from_ruleset(cls, ruleset: Ruleset, seed: Optional[int] = None) -> Self:
+        # every random outcome of the game is drawn from its own generator,
+        # so a game is fully determined by its ruleset, seed and actions
+        ruleset = ruleset.compile()
+        rng = Random(seed)
         return cls(
             ruleset=ruleset,
             players=cls._get_initial_player_states(ruleset),
-            shop=cls._get_initial_shop_state(ruleset),
+            shop=cls._get_initial_shop_state(ruleset, rng),
             community_tokens=cls._get_initial_community_currency_value(ruleset),
+            rng=rng,
         )
 
-    def __init__(self, ruleset, players, shop, community_tokens):
-        self.ruleset = ruleset
+    def __init__(self, ruleset, players, shop, community_tokens, rng=None, player_turn=0):
+        # compiled rulesets are taken as they are, only plain ones go through the compile cache
+        self.ruleset = ruleset if isinstance(ruleset, CompiledRuleset) else ruleset.compile()
         self.players = players
         self.shop = shop
         self.community_tokens = community_tokens
+        self.rng = rng or Random()
+        self.player_turn = player_turn
+        self.zobrist_keys = ZobristKeys.for_ruleset(self.ruleset)
+        self.rehash()
+
+    def reset(self, seed: Optional[int] = None) -> None:
+        # deals a new game into this one, reusing its players, shop and generator; the result is
+        # the same as `from_ruleset(self.ruleset, seed)`
+        self.rng.seed(seed)
+        for player in self.players:
+            player.reset()
+        self.shop.reset(self.ruleset, self.rng)
+        self.community_tokens = self._get_initial_community_currency_value(self.ruleset)
         self.player_turn = 0
+        self.rehash()
+
+    def rehash(self) -> None:
+        # `zobrist_hash` is kept up to date by `perform_player_turn`,
+        # any other change to the state must be followed by a rehash
+        self.zobrist_hash = self.zobrist_keys.hash_game(self)
 
     @staticmethod
     def _get_initial_community_currency_value(ruleset: Ruleset) -> Tokens:
-        return Tokens(
-            gold=ruleset.COMMUNITY_GOLD_COUNT,
-            **{gem: ruleset.COMMUNITY_GEMS_COUNT for gem in Gems.TOKEN_TYPES}
-        )
+        return Tokens.from_values(ruleset.compile().INITIAL_COMMUNITY_TOKENS)
 
     @staticmethod
     def _get_initial_player_states(ruleset: Ruleset) -> ['Player']:
         return [Player(ruleset) for _ in range(ruleset.PLAYER_COUNT)]
 
     @staticmethod
-    def _get_initial_shop_state(ruleset: Ruleset):
-        return Shop.get_initial_shop_state(ruleset)
+    def _get_initial_shop_state(ruleset: Ruleset, rng: Optional[Random] = None):
+        return Shop.get_initial_shop_state(ruleset, rng)
 
     def get_current_player(self) -> 'Player':
         return self.get_player(self.player_turn)
@@ -50,11 +120,186 @@ class GameState:
     def get_player(self, player: int) -> 'Player':
         return self.players[player]
 
-    def perform_player_turn(self, turn_action: PlayerAction, **action_params):
+    def legal_actions(self) -> list[Action]:
+        if self.is_over():
+            return []
+        return self.get_current_player().get_legal_actions(self)
+
+    def is_over(self) -> bool:
+        # once a player reaches the winning prestige the round is played out, so every player
+        # gets the same amount of turns, the game ends when the turn comes back to the first player
+        return self.player_turn == 0 and any(
+            player.prestige >= self.ruleset.WINNING_PRESTIGE for player in self.players
+        )
+
+    def get_standings(self) -> list[Standing]:
+        # players by prestige, ties broken in favour of the fewest development cards
+        scores = [(player.prestige, -len(player.development_cards)) for player in self.players]
+        standings = [
+            Standing(i, prestige, -cards, 1 + sum(other > (prestige, cards) for other in scores))
+            for i, (prestige, cards) in enumerate(scores)
+        ]
+        return sorted(standings, key=lambda standing: (standing.rank, standing.player))
+
+    def get_winners(self) -> list[int]:
+        # more than one player only when the tie-break leaves them level
+        return [standing.player for standing in self.get_standings() if standing.rank == 1]
+
+    def check_action(self, turn_action: PlayerAction, **action_params) -> ActionCheck:
+        # validates an action of the current player like `perform_player_turn` would, but reports
+        # the outcome instead of raising
+        return self._check_action(self.get_current_player(), turn_action, action_params, None)
+
+    def check_actions(self, actions: Iterable[Action]) -> list[ActionCheck]:
+        # validates many candidate actions against this state, the parts of the state the checks
+        # share, like the community token kinds left or the player's buying power, are computed once
         player = self.get_current_player()
-        getattr(player, f'action_{turn_action.value}')(self, **action_params)
+        context = player.get_check_context(self)
+        return [self._check_action(player, turn_action, params, context) for turn_action, params in actions]
+
+    def _check_action(
+        self,
+        player: Player,
+        turn_action: PlayerAction,
+        params: dict[str, Any],
+        context: Optional[CheckContext],
+    ) -> ActionCheck:
+        if self.is_over():
+            return ActionCheck.GAME_OVER
+        entry = get_dispatch(player.__class__)[1].get(turn_action)
+        if entry is None:
+            return ActionCheck.UNSUPPORTED_ACTION
+        check, required, accepted = entry
+        if not required <= params.keys() <= accepted:
+            return ActionCheck.INVALID_PARAMETERS
+        return check(player, self, **params, context=context)
+
+    def clone(self) -> Self:
+        # the ruleset and the cards are shared, everything mutable is copied
+        game = object.__new__(self.__class__)
+        game.ruleset = self.ruleset
+        game.players = [player.clone() for player in self.players]
+        game.shop = self.shop.clone()
+        game.community_tokens = self.community_tokens.copy()
+        game.rng = Random()
+        game.rng.setstate(self.rng.getstate())
+        game.player_turn = self.player_turn
+        game.zobrist_keys = self.zobrist_keys
+        game.zobrist_hash = self.zobrist_hash
+        return game
+
+    def apply(self, action: Action) -> UndoRecord:
+        turn_action, params = action
+        return self.perform_player_turn(turn_action, **params)
+
+    def undo(self, record: UndoRecord) -> None:
+        # records must be undone in the reverse order they were applied in
+        player = self.get_player(record.player_turn)
+        player.tokens.assign(record.player_tokens)
+        player.truncate(len(player.reserved_cards), record.development_cards, record.nobles_count)
+        if player.reserved_cards.ids.tobytes() != record.reserved_cards:
+            player.reserved_cards.ids[:] = array('B', record.reserved_cards)
+        self.community_tokens.assign(record.community_tokens)
 
-        self.progress_player_turn()
+        for tier, cards in zip(self.shop.tiers, record.shop_cards):
+            for column, card_id in enumerate(cards):
+                if tier.card_ids[column] != card_id:
+                    tier.put_back(column, card_id)
+        self.shop.nobles = record.shop_nobles
+
+        self.player_turn = record.player_turn
+        self.zobrist_hash = record.zobrist_hash
+
+    def perform_player_turn(self, turn_action: PlayerAction, **action_params) -> UndoRecord:
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            if instrumentation.wants(GameEvent.BEFORE_ACTION):
+                instrumentation.emit(GameEvent.BEFORE_ACTION, self, action=turn_action, params=action_params)
+            started = perf_counter_ns()
+
+        record = UndoRecord(self)
+        player = self.get_current_player()
+        try:
+            if self.is_over():
+                raise ActionCheck.GAME_OVER.get_error()
+            get_dispatch(player.__class__)[0][turn_action](player, self, **action_params)
+        except IllegalPlayerActionError as error:
+            if instrumentation is not None:
+                if instrumentation.metrics is not None:
+                    instrumentation.metrics.record_rejection(turn_action, error, perf_counter_ns() - started)
+                if instrumentation.wants(GameEvent.ACTION_REJECTED):
+                    instrumentation.emit(
+                        GameEvent.ACTION_REJECTED, self, action=turn_action, params=action_params, error=error,
+                    )
+            raise
+
+        if player.tokens.get_total_count() <= self.ruleset.MAX_PLAYER_TOKENS:
+            # a player over the token limit keeps the turn to discard
+            self.resolve_noble_visit()
+            self.progress_player_turn()
+        self.zobrist_hash ^= self.zobrist_keys.get_update(self, record)
+
+        if instrumentation is not None:
+            elapsed_ns = perf_counter_ns() - started
+            if instrumentation.metrics is not None:
+                instrumentation.metrics.record(turn_action, elapsed_ns)
+            if instrumentation.wants(GameEvent.AFTER_ACTION):
+                instrumentation.emit(
+                    GameEvent.AFTER_ACTION, self, action=turn_action, params=action_params, elapsed_ns=elapsed_ns,
+                )
+        return record
+
+    def resolve_noble_visit(self) -> Optional[Noble]:
+        # at the end of a turn the current player is visited by at most one noble they qualify for,
+        # the one with the lowest id when there are several
+        player = self.get_current_player()
+        eligible = self.ruleset.NOBLE_CATALOG.get_eligible_mask(player.bonuses)
+        if not eligible:
+            return None
+
+        candidates = [noble for noble in self.shop.nobles if eligible >> noble.id & 1]
+        if not candidates:
+            return None
+        noble = min(candidates, key=lambda candidate: candidate.id)
+        self.shop.nobles = [other for other in self.shop.nobles if other is not noble]
+        player.add_noble(noble)
+
+        instrumentation = self.instrumentation
+        if instrumentation is not None and instrumentation.wants(GameEvent.NOBLE_VISITED):
+            instrumentation.emit(GameEvent.NOBLE_VISITED, self, player=self.player_turn, noble=noble)
+        return noble
 
     def progress_player_turn(self):
+        previous = self.player_turn
         self.player_turn = (self.player_turn + 1) % len(self.players)
+
+        instrumentation = self.instrumentation
+        if instrumentation is not None and instrumentation.wants(GameEvent.TURN_ADVANCED):
+            instrumentation.emit(GameEvent.TURN_ADVANCED, self, previous=previous, player_turn=self.player_turn)
+
+
+class GameFactory:
+    # hands out games of one ruleset, released games are kept and reset in place for the next
+    # request instead of being dealt from scratch
+    ruleset: CompiledRuleset
+
+    def __init__(self, ruleset: Ruleset):
+        self.ruleset = ruleset.compile()
+        self._pool: list[GameState] = []
+
+    def create(self, seed: Optional[int] = None) -> GameState:
+        if not self._pool:
+            return GameState.from_ruleset(self.ruleset, seed)
+        game = self._pool.pop()
+        game.reset(seed)
+        return game
+
+    def release(self, game: GameState) -> None:
+        # the game must not be used by the caller afterwards
+        if game.ruleset != self.ruleset:
+            raise InvalidGameConfiguration('the game was not created for this ruleset')
+        game.instrumentation = None
+        self._pool.append(game)
+
+    def __len__(self):
+        return len(self._pool)
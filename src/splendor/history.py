@@ -0,0 +1,115 @@
+from typing import Iterable, NamedTuple, Self
+
+from .actions import ActionSpace
+from .cards import CARD_CATALOG, EMPTY_CARD_ID
+from .encoding import GameStateCodec
+from .game import GameState, UndoRecord
+from .player import Action
+
+
+class HistoryEntry(NamedTuple):
+    player: int
+    action: int  # `ActionSpace` id
+    drawn: bytes  # ids of the cards drawn from the restock piles to refill the shop
+
+
+class GameHistory:
+    # event log of a game: every applied action with the cards it drew, and the encoded state every
+    # `checkpoint_interval` plies; `seek` restores the closest checkpoint at or before the target
+    # and replays the entries after it, so a seek replays fewer than `checkpoint_interval` actions
+    # and the checkpoints take `len(self) / checkpoint_interval` codec records
+    #
+    # `game` is the state at `ply`, actions must be applied through the history to be logged,
+    # and seeking backwards replaces `game` with a decoded checkpoint
+    game: GameState
+    ply: int
+    entries: list[HistoryEntry]
+    checkpoint_interval: int
+
+    def __init__(self, game: GameState, checkpoint_interval: int = 16):
+        if checkpoint_interval < 1:
+            raise ValueError('checkpoint interval must be positive')
+
+        self.game = game
+        self.ply = 0
+        self.entries = []
+        self.checkpoint_interval = checkpoint_interval
+        self.codec = GameStateCodec.for_ruleset(game.ruleset)
+        self.action_space = ActionSpace(game.ruleset)
+        # fixed-size codec records back to back, checkpoint `i` is the state at ply `i * interval`
+        self._checkpoints = bytearray(self.codec.encode(game))
+
+    @classmethod
+    def from_actions(cls, game: GameState, actions: Iterable[int], checkpoint_interval: int = 16) -> Self:
+        # logs `actions` played from `game`, which ends up at the last ply
+        history = cls(game, checkpoint_interval)
+        for action in actions:
+            history.apply(action)
+        return history
+
+    def __len__(self):
+        return len(self.entries)
+
+    def apply(self, action: Action | int) -> HistoryEntry:
+        # applying an action before the last ply drops the plies after it
+        if self.ply < len(self.entries):
+            self._truncate(self.ply)
+
+        if isinstance(action, int):
+            action_id, action = action, self.action_space.decode(action)
+        else:
+            action_id = self.action_space.encode(action)
+
+        record = self.game.apply(action)
+        entry = HistoryEntry(record.player_turn, action_id, self._get_drawn(record))
+        self.entries.append(entry)
+        self.ply += 1
+        if self.ply % self.checkpoint_interval == 0:
+            self._checkpoints += self.codec.encode(self.game)
+        return entry
+
+    def seek(self, ply: int) -> GameState:
+        if not 0 <= ply <= len(self.entries):
+            raise IndexError(ply)
+
+        checkpoint = ply // self.checkpoint_interval
+        start = checkpoint * self.checkpoint_interval
+        if not start <= self.ply <= ply:
+            # the current state cannot be replayed into the target
+            self.game = self.codec.decode(self._checkpoints, checkpoint * self.codec.size)
+            self.ply = start
+
+        for entry in self.entries[self.ply:ply]:
+            self._replay(entry)
+        self.ply = ply
+        return self.game
+
+    def get_checkpoint_count(self) -> int:
+        return len(self._checkpoints) // self.codec.size
+
+    def _replay(self, entry: HistoryEntry) -> None:
+        game = self.game
+        # the logged draws are the source of truth, piles shuffled since (e.g. by a search
+        # determinizing hidden cards) are fixed up to draw the same cards again
+        stacked = False
+        for card_id in entry.drawn:
+            pile = game.shop.get_tier(CARD_CATALOG.tiers[card_id]).restock_pile.ids
+            if pile[-1] != card_id:
+                pile.remove(card_id)
+                pile.append(card_id)
+                stacked = True
+        if stacked:
+            game.rehash()
+        game.apply(self.action_space.decode(entry.action))
+
+    def _get_drawn(self, record: UndoRecord) -> bytes:
+        drawn = bytearray()
+        for tier, card_ids in zip(self.game.shop.tiers, record.shop_cards):
+            for old, new in zip(card_ids, tier.card_ids):
+                if old != new and new != EMPTY_CARD_ID:
+                    drawn.append(new)
+        return bytes(drawn)
+
+    def _truncate(self, ply: int) -> None:
+        del self.entries[ply:]
+        del self._checkpoints[(ply // self.checkpoint_interval + 1) * self.codec.size:]
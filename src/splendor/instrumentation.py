@@ -0,0 +1,110 @@
+from collections import defaultdict
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+if TYPE_CHECKING:
+    from .game import GameState
+    from .player import PlayerAction
+
+HISTOGRAM_BUCKETS = 64
+
+
+class GameEvent(Enum):
+    BEFORE_ACTION = 'before_action'  # action, params
+    AFTER_ACTION = 'after_action'  # action, params, elapsed_ns
+    ACTION_REJECTED = 'action_rejected'  # action, params, error
+    TOKEN_TRANSFER = 'token_transfer'  # source, target, tokens; players by index, 'community' for the pool
+    CARD_TAKEN = 'card_taken'  # tier, column, card
+    CARD_REFILLED = 'card_refilled'  # tier, column, card, `None` when the restock pile was empty
+    CARD_PURCHASED = 'card_purchased'  # card, payment, card_placement, reserved_index
+    NOBLE_VISITED = 'noble_visited'  # player, noble
+    TURN_ADVANCED = 'turn_advanced'  # previous, player_turn
+
+
+Hook = Callable[..., Any]
+
+
+class ActionMetrics:
+    # per-action call counters and latency histograms, the bucket of a call is the bit length of
+    # its duration in nanoseconds, i.e. bucket `b` holds durations below `2 ** b` ns; rejected
+    # calls are kept apart, per error class and action
+    def __init__(self):
+        self.counts: dict[str, int] = defaultdict(int)
+        self.total_ns: dict[str, int] = defaultdict(int)
+        self.histograms: dict[str, list[int]] = defaultdict(lambda: [0] * HISTOGRAM_BUCKETS)
+        self.rejections: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.rejection_total_ns: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.rejection_histograms: dict[str, dict[str, list[int]]] = defaultdict(
+            lambda: defaultdict(lambda: [0] * HISTOGRAM_BUCKETS),
+        )
+
+    def record(self, action: 'PlayerAction', elapsed_ns: int) -> None:
+        name = action.value
+        self.counts[name] += 1
+        self.total_ns[name] += elapsed_ns
+        self.histograms[name][min(elapsed_ns.bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def record_rejection(self, action: 'PlayerAction', error: Exception, elapsed_ns: int = 0) -> None:
+        error_name, name = error.__class__.__name__, action.value
+        self.rejections[error_name][name] += 1
+        self.rejection_total_ns[error_name][name] += elapsed_ns
+        self.rejection_histograms[error_name][name][min(elapsed_ns.bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    @staticmethod
+    def _get_histogram(histogram: list[int]) -> dict[int, int]:
+        return {2 ** bucket: calls for bucket, calls in enumerate(histogram) if calls}
+
+    def snapshot(self) -> dict[str, Any]:
+        # plain, json-serializable copy of the counters
+        return {
+            'actions': {
+                name: {
+                    'count': count,
+                    'total_ns': self.total_ns[name],
+                    'histogram_ns': self._get_histogram(self.histograms[name]),
+                }
+                for name, count in self.counts.items()
+            },
+            'rejections': {name: dict(actions) for name, actions in self.rejections.items()},
+            'rejection_latency': {
+                error_name: {
+                    name: {
+                        'total_ns': self.rejection_total_ns[error_name][name],
+                        'histogram_ns': self._get_histogram(histogram),
+                    }
+                    for name, histogram in histograms.items()
+                }
+                for error_name, histograms in self.rejection_histograms.items()
+            },
+        }
+
+    def reset(self) -> None:
+        self.__init__()
+
+
+class Instrumentation:
+    # event hooks and metrics of a game, may be shared by any amount of games; games without
+    # instrumentation skip all of it behind a single `is None` check
+    metrics: Optional[ActionMetrics]
+
+    def __init__(self, metrics: bool = True):
+        self._hooks: dict[GameEvent, list[Hook]] = {}
+        self.metrics = ActionMetrics() if metrics else None
+
+    def subscribe(self, event: GameEvent, hook: Hook) -> None:
+        # hooks are called as `hook(game, **payload)` with the payload documented on `GameEvent`
+        self._hooks.setdefault(event, []).append(hook)
+
+    def unsubscribe(self, event: GameEvent, hook: Hook) -> None:
+        hooks = self._hooks.get(event, [])
+        hooks.remove(hook)
+        if not hooks:
+            self._hooks.pop(event, None)
+
+    def wants(self, event: GameEvent) -> bool:
+        # emitters check this first, so payloads are only built when a hook listens
+        return event in self._hooks
+
+    def emit(self, event: GameEvent, game: 'GameState', **payload) -> None:
+        for hook in self._hooks.get(event, ()):
+            hook(game, **payload)
@@ -0,0 +1,158 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+from typing import Any, Optional, Sequence
+
+
+class Client:
+    # one connection to a `GameServer`, requests are matched to replies by id so any amount of
+    # sessions can share it; events of subscribed sessions are counted and otherwise ignored
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.events = 0
+        self._ids = itertools.count()
+        self._pending: dict[int, asyncio.Future] = {}
+        self._read_task = asyncio.create_task(self._read_loop())
+
+    @classmethod
+    async def connect(cls, host: str = '127.0.0.1', port: int = 7777, path: Optional[str] = None) -> 'Client':
+        if path:
+            return cls(*await asyncio.open_unix_connection(path, limit=2 ** 20))
+        return cls(*await asyncio.open_connection(host, port, limit=2 ** 20))
+
+    async def request(self, op: str, **fields) -> dict[str, Any]:
+        request_id = next(self._ids)
+        future = self._pending[request_id] = asyncio.get_running_loop().create_future()
+        self.writer.write(json.dumps({'id': request_id, 'op': op, **fields}).encode() + b'\n')
+        await self.writer.drain()
+        return await future
+
+    async def _read_loop(self) -> None:
+        while line := await self.reader.readline():
+            message = json.loads(line)
+            if 'event' in message:
+                self.events += 1
+            else:
+                self._pending.pop(message['id']).set_result(message)
+        for future in self._pending.values():
+            future.set_exception(ConnectionError('connection closed'))
+
+    async def close(self) -> None:
+        self.writer.close()
+        self._read_task.cancel()
+
+
+def get_percentile(samples: Sequence[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * percentile / 100), len(ordered) - 1)] if ordered else 0.0
+
+
+async def play_session(client: Client, rng: random.Random, moves: int, subscribe: bool, latencies: list[float]) -> int:
+    # plays random legal moves in a fresh session, returns the number of rejected moves
+    reply = await client.request('create', players=rng.randint(2, 4), seed=rng.getrandbits(32), legal=True)
+    session, legal = reply['session'], reply['legal']
+    if subscribe:
+        await client.request('subscribe', session=session)
+
+    rejected = 0
+    for _ in range(moves):
+        if not legal:
+            break
+        started = time.perf_counter()
+        reply = await client.request('move', session=session, action=rng.choice(legal), legal=True)
+        latencies.append(time.perf_counter() - started)
+        if not reply['ok']:
+            rejected += 1
+            break
+        legal = reply['legal']
+    return rejected
+
+
+async def run(
+    sessions: int,
+    connections: int,
+    moves: int,
+    concurrency: int,
+    seed: int = 0,
+    subscribe: bool = False,
+    host: str = '127.0.0.1',
+    port: int = 7777,
+    path: Optional[str] = None,
+) -> dict[str, Any]:
+    clients = [await Client.connect(host, port, path) for _ in range(connections)]
+    latencies: list[float] = []
+    rejected = 0
+    limit = asyncio.Semaphore(concurrency)
+
+    async def worker(index: int) -> None:
+        nonlocal rejected
+        async with limit:
+            rejected += await play_session(
+                clients[index % connections], random.Random(seed + index), moves, subscribe, latencies,
+            )
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(sessions)))
+    elapsed = time.perf_counter() - started
+    events = sum(client.events for client in clients)
+    for client in clients:
+        await client.close()
+
+    return {
+        'sessions': sessions,
+        'moves': len(latencies),
+        'rejected': rejected,
+        'events': events,
+        'elapsed_s': elapsed,
+        'moves_per_s': len(latencies) / elapsed,
+        'p50_ms': get_percentile(latencies, 50) * 1000,
+        'p99_ms': get_percentile(latencies, 99) * 1000,
+        'max_ms': max(latencies, default=0.0) * 1000,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m splendor.loadtest', description='load test a local game server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7777)
+    parser.add_argument('--unix', metavar='PATH', help='connect to a unix socket instead of tcp')
+    parser.add_argument('-n', '--sessions', type=int, default=10000)
+    parser.add_argument('-c', '--connections', type=int, default=64)
+    parser.add_argument('-m', '--moves', type=int, default=20, help='moves per session')
+    parser.add_argument('-j', '--concurrency', type=int, default=10000, help='sessions played at the same time')
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('--subscribe', action='store_true', help='subscribe to the state diffs of every session')
+    parser.add_argument('--p50', type=float, default=None, help='fail when the median move latency exceeds it (ms)')
+    parser.add_argument('--p99', type=float, default=None, help='fail when the p99 move latency exceeds it (ms)')
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(
+        args.sessions,
+        args.connections,
+        args.moves,
+        args.concurrency,
+        seed=args.seed,
+        subscribe=args.subscribe,
+        host=args.host,
+        port=args.port,
+        path=args.unix,
+    ))
+    print(json.dumps(report))
+
+    failed = [
+        f'{name} {report[f"{name}_ms"]:.2f}ms > {target:.2f}ms'
+        for name, target in (('p50', args.p50), ('p99', args.p99))
+        if target is not None and report[f'{name}_ms'] > target
+    ]
+    if failed:
+        print(f'latency targets missed: {", ".join(failed)}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+import math
+import time
+from random import Random
+from typing import Callable, NamedTuple, Optional, Sequence
+
+from .actions import ActionSpace
+from .agents import Agent, random_agent
+from .game import GameState
+from .player import Action
+
+Evaluation = Callable[[GameState], Sequence[float]]
+
+
+def prestige_evaluation(game: GameState) -> list[float]:
+    # share of the total prestige held by every player, in [0, 1]
+    scores = [player.get_prestige() for player in game.players]
+    total = sum(scores)
+    if not total:
+        return [1 / len(scores)] * len(scores)
+    return [score / total for score in scores]
+
+
+class Node:
+    __slots__ = ('parent', 'action', 'player', 'children', 'visits', 'rewards')
+
+    def __init__(self, parent: Optional['Node'], action: Optional[int], player: Optional[int], players: int):
+        self.parent = parent
+        self.action = action
+        self.player = player  # the player whose action led to this node
+        self.children: dict[int, Node] = {}
+        self.visits = 0
+        self.rewards = [0.0] * players
+
+    def get_size(self) -> int:
+        size, stack = 0, [self]
+        while stack:
+            node = stack.pop()
+            size += 1
+            stack.extend(node.children.values())
+        return size
+
+
+class SearchStats(NamedTuple):
+    iterations: int
+    elapsed: float
+    iterations_per_second: float
+    tree_size: int
+    reused_nodes: int
+
+
+class MCTS:
+    # determinized UCT: every iteration reshuffles the hidden restock piles of a copy of the
+    # searched state, children are keyed by `ActionSpace` ids so the tree is shared across
+    # determinizations and may be carried over to the next turn through `advance`
+    def __init__(
+        self,
+        exploration: float = math.sqrt(2),
+        rollout_policy: Agent = random_agent,
+        evaluation: Evaluation = prestige_evaluation,
+        rollout_depth: int = 20,
+        seed: Optional[int] = None,
+    ):
+        self.exploration = exploration
+        self.rollout_policy = rollout_policy
+        self.evaluation = evaluation
+        self.rollout_depth = rollout_depth
+        self.rng = Random(seed)
+        self.root: Optional[Node] = None
+        self.root_hash: Optional[int] = None
+        self.tree_size = 0
+        self.last_stats: Optional[SearchStats] = None
+        self._action_space: Optional[ActionSpace] = None
+
+    def search(
+        self,
+        game: GameState,
+        time_limit: Optional[float] = None,
+        iterations: Optional[int] = None,
+    ) -> Optional[Action]:
+        # `time_limit` is in seconds and checked between iterations; without any limit a single
+        # iteration is run; `None` when there is nothing to play, as the game is over or the
+        # player to move is stuck
+        if self._action_space is None or self.root is None or self.root_hash != game.zobrist_hash:
+            self._action_space = ActionSpace(game.ruleset)
+            self.root = Node(None, None, None, len(game.players))
+            self.root_hash = game.zobrist_hash
+            self.tree_size = 1
+        reused_nodes = self.tree_size
+        if not game.legal_actions():
+            self.last_stats = SearchStats(0, 0.0, 0.0, self.tree_size, reused_nodes)
+            return None
+
+        started = time.perf_counter()
+        deadline = None if time_limit is None else started + time_limit
+        iterations = iterations if iterations is not None else (None if time_limit is not None else 1)
+        done = 0
+        while iterations is None or done < iterations:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            self._iterate(game)
+            done += 1
+
+        elapsed = time.perf_counter() - started
+        self.last_stats = SearchStats(
+            iterations=done,
+            elapsed=elapsed,
+            iterations_per_second=done / elapsed if elapsed else 0.0,
+            tree_size=self.tree_size,
+            reused_nodes=reused_nodes,
+        )
+        return self.get_best_action(game)
+
+    def get_best_action(self, game: GameState) -> Optional[Action]:
+        actions = game.legal_actions()
+        if not actions:
+            return None
+        encoded = [self._action_space.encode(action) for action in actions]
+        children = self.root.children
+        visits = [children[action].visits if action in children else -1 for action in encoded]
+        return actions[visits.index(max(visits))]
+
+    def advance(self, action: Action, game: GameState) -> None:
+        # moves the root along an action that was played on the real game, `game` being the
+        # state after it; unexplored actions drop the tree
+        if self.root is None or self._action_space is None:
+            return
+        child = self.root.children.get(self._action_space.encode(action))
+        if child is None:
+            self.root = None
+            self.tree_size = 0
+            return
+        child.parent = None
+        self.root = child
+        self.root_hash = game.zobrist_hash
+        self.tree_size = child.get_size()
+
+    def _determinize(self, game: GameState) -> None:
+        for tier in game.shop.tiers:
+            tier.restock_pile.shuffle(self.rng)
+        game.rehash()
+
+    def _iterate(self, root_game: GameState) -> None:
+        game = root_game.clone()
+        self._determinize(game)
+        encode = self._action_space.encode
+        node = self.root
+
+        terminal = False
+        while True:
+            actions = game.legal_actions()
+            if not actions:
+                # terminal nodes are leaves, scored as they are
+                terminal = True
+                break
+
+            encoded = [encode(action) for action in actions]
+            untried = [i for i, action in enumerate(encoded) if action not in node.children]
+            player = game.player_turn
+            if untried:
+                i = self.rng.choice(untried)
+                game.apply(actions[i])
+                child = Node(node, encoded[i], player, len(game.players))
+                node.children[encoded[i]] = child
+                self.tree_size += 1
+                node = child
+                break
+
+            i = self._select(node, encoded)
+            game.apply(actions[i])
+            node = node.children[encoded[i]]
+
+        values = self.evaluation(game) if terminal else self._rollout(game)
+        while node is not None:
+            node.visits += 1
+            rewards = node.rewards
+            for player, value in enumerate(values):
+                rewards[player] += value
+            node = node.parent
+
+    def _select(self, node: Node, encoded: list[int]) -> int:
+        log_visits = math.log(node.visits or 1)
+        best, best_score = 0, -math.inf
+        for i, action in enumerate(encoded):
+            child = node.children[action]
+            score = (
+                child.rewards[child.player] / child.visits +
+                self.exploration * math.sqrt(log_visits / child.visits)
+            )
+            if score > best_score:
+                best, best_score = i, score
+        return best
+
+    def _rollout(self, game: GameState) -> Sequence[float]:
+        for _ in range(self.rollout_depth):
+            actions = game.legal_actions()
+            if not actions:
+                break
+            turn_action, params = self.rollout_policy(game, actions, self.rng)
+            game.perform_player_turn(turn_action, **params)
+        return self.evaluation(game)
+
+
+class MCTSAgent:
+    # self-play agent around `MCTS`, carries its tree over when told about every played action
+    def __init__(self, time_limit: Optional[float] = 0.1, iterations: Optional[int] = None, **options):
+        self.time_limit = time_limit
+        self.iterations = iterations
+        self.mcts = MCTS(**options)
+
+    def __call__(self, game: GameState, actions: list[Action], rng: Random) -> Action:
+        return self.mcts.search(game, time_limit=self.time_limit, iterations=self.iterations)
+
+    def observe(self, action: Action, game: GameState) -> None:
+        self.mcts.advance(action, game)
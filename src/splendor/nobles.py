@@ -1,10 +1,96 @@
+from typing import Optional, Sequence
+
 from .tokens import Gems
 
+EMPTY_NOBLE_ID = 0xFF
+
 
 class Noble:
+    # nobles are shared flyweights handed out by `NOBLE_CATALOG`, which also assigns their `id`
+    __slots__ = ('id', 'cost', 'prestige')
+
+    id: int
     cost: Gems
     prestige: int
 
     def __init__(self, cost, prestige):
+        self.id = EMPTY_NOBLE_ID
         self.cost = cost
         self.prestige = prestige
+
+    def __reduce__(self):
+        # unpickles to the catalog's own instance
+        return get_noble, (self.id,)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(id={self.id}, cost={self.cost!r}, prestige={self.prestige})'
+
+
+class NobleCatalog:
+    # numbered set of every noble with a requirement index: `requirement_masks[gem][count]` has
+    # bit `id` set for every noble asking for at most `count` bonuses of `gem`, so the nobles a
+    # bonus vector qualifies for are a handful of lookups and'ed together
+    nobles: list[Noble]
+    requirement_masks: list[list[int]]
+
+    def __init__(self, nobles: Sequence[Noble]):
+        if len(nobles) >= EMPTY_NOBLE_ID:
+            raise ValueError('noble ids must fit a byte')
+
+        self.nobles = list(nobles)
+        for noble_id, noble in enumerate(self.nobles):
+            noble.id = noble_id
+
+        # bonuses past the highest requirement qualify for everything that gem asks for
+        self.max_requirement = max((count for noble in self.nobles for count in noble.cost.values()), default=0)
+        self.requirement_masks = [
+            [
+                sum(1 << noble.id for noble in self.nobles if noble.cost[gem] <= count)
+                for count in range(self.max_requirement + 1)
+            ]
+            for gem in Gems.TOKEN_TYPES
+        ]
+
+    def __len__(self):
+        return len(self.nobles)
+
+    def __reduce_ex__(self, protocol):
+        # the shared catalog unpickles to itself, like its nobles
+        if self is NOBLE_CATALOG:
+            return get_noble_catalog, ()
+        return super().__reduce_ex__(protocol)
+
+    def get_noble(self, noble_id: int) -> Optional[Noble]:
+        return None if noble_id == EMPTY_NOBLE_ID else self.nobles[noble_id]
+
+    def get_eligible_mask(self, bonuses: Gems) -> int:
+        # bit `id` is set for every noble the bonuses satisfy
+        cap = self.max_requirement
+        mask = -1
+        for masks, count in zip(self.requirement_masks, bonuses.values()):
+            mask &= masks[count if count < cap else cap]
+        return mask & ((1 << len(self.nobles)) - 1)
+
+
+NOBLES = [
+    Noble(cost=Gems(diamond=4, sapphire=4), prestige=3),
+    Noble(cost=Gems(sapphire=4, emerald=4), prestige=3),
+    Noble(cost=Gems(emerald=4, ruby=4), prestige=3),
+    Noble(cost=Gems(ruby=4, onyx=4), prestige=3),
+    Noble(cost=Gems(onyx=4, diamond=4), prestige=3),
+    Noble(cost=Gems(diamond=3, sapphire=3, emerald=3), prestige=3),
+    Noble(cost=Gems(sapphire=3, emerald=3, ruby=3), prestige=3),
+    Noble(cost=Gems(emerald=3, ruby=3, onyx=3), prestige=3),
+    Noble(cost=Gems(ruby=3, onyx=3, diamond=3), prestige=3),
+    Noble(cost=Gems(onyx=3, diamond=3, sapphire=3), prestige=3),
+]
+
+NOBLE_CATALOG = NobleCatalog(NOBLES)
+
+
+def get_noble(noble_id: int) -> Optional[Noble]:
+    return NOBLE_CATALOG.get_noble(noble_id)
+
+
+def get_noble_catalog() -> NobleCatalog:
+    return NOBLE_CATALOG
@@ -1,86 +1,556 @@
 from enum import Enum
-from typing import TYPE_CHECKING
+from inspect import Parameter, signature
+from typing import TYPE_CHECKING, Any, Callable, Iterable, NamedTuple, Optional, Self
 
-from .cards import DevelopmentCards
-from .exceptions import IllegalCardReservation, IllegalTokenSelection, OverPlayerTokenLimit
+from .cards import EMPTY_CARD_ID, CardSet, DevelopmentCards
+from .checks import ActionCheck, CheckContext
+from .exceptions import IllegalCardPurchase, IllegalCardReservation, IllegalTokenDiscard, IllegalTokenSelection
+from .instrumentation import GameEvent
 from .ruleset import Ruleset
-from .tokens import Gems, Tokens
+from .tokens import TOKEN_DISCARDS, Gems, Token, Tokens
 
 if TYPE_CHECKING:
+    from .cards import DevelopmentCard
     from .game import GameState
     from .nobles import Noble
 
 
+GOLD_SLOT = Tokens.TOKEN_TYPES.index(Token.GOLD.value)
+
+
 class PlayerAction(Enum):
     SELECT_TOKENS = 'select_tokens'
     RESERVE_CARD = 'reserve_card'
     BUY_CARD = 'buy_card'
+    DISCARD_TOKENS = 'discard_tokens'
+
+
+Action = tuple[PlayerAction, dict[str, Any]]
+
+
+class PurchasePlan(NamedTuple):
+    card: 'DevelopmentCard'
+    payment: Tokens
+    card_placement: Optional[tuple[int, int]] = None
+    reserved_index: Optional[int] = None
+
+    def get_params(self) -> dict[str, Any]:
+        if self.card_placement is None:
+            return {'reserved_index': self.reserved_index}
+        return {'card_placement': self.card_placement}
 
 
 class Player:
-    reserved_cards: DevelopmentCards
-    development_cards: DevelopmentCards
+    reserved_cards: DevelopmentCards  # in reservation order, buys address them by index
+    development_cards: CardSet
     nobles: list['Noble']
     tokens: Tokens
+    bonuses: Gems
+    prestige: int
 
     def __init__(self, ruleset: Ruleset, reserved_cards=None, development_cards=None, nobles=None, tokens=None):
         self.reserved_cards = reserved_cards or DevelopmentCards()
-        self.development_cards = development_cards or DevelopmentCards()
-        self.nobles = nobles or []
+        self.development_cards = CardSet()
+        self.nobles = []
         self.tokens = tokens or Tokens()
+        # kept up to date by `add_development_card` and `add_noble`
+        self.bonuses = Gems()
+        self.prestige = 0
+
+        for card in development_cards or ():
+            self.add_development_card(card)
+        for noble in nobles or ():
+            self.add_noble(noble)
+
+    def clone(self) -> Self:
+        # cards and nobles are shared, only the collections holding them are copied
+        player = object.__new__(self.__class__)
+        player.reserved_cards = self.reserved_cards.copy()
+        player.development_cards = self.development_cards.copy()
+        player.nobles = self.nobles.copy()
+        player.tokens = self.tokens.copy()
+        player.bonuses = self.bonuses.copy()
+        player.prestige = self.prestige
+        return player
+
+    def reset(self) -> None:
+        # empties the player in place for the next game
+        del self.reserved_cards[:]
+        self.development_cards.clear()
+        self.nobles = []
+        self.tokens = Tokens()
+        self.bonuses = Gems()
+        self.prestige = 0
+
+    def add_development_card(self, card: 'DevelopmentCard') -> None:
+        self.development_cards.add(card)
+        self.bonuses[card.gem] += 1
+        self.prestige += card.prestige
+
+    def add_noble(self, noble: 'Noble') -> None:
+        self.nobles.append(noble)
+        self.prestige += noble.prestige
+
+    def truncate(self, reserved_cards_count: int, development_cards_mask: int, nobles_count: int) -> None:
+        # drops the most recently gained cards and nobles, used to take back actions;
+        # development cards are restored from the `CardSet.mask` they had before
+        gained = CardSet.from_mask(self.development_cards.mask & ~development_cards_mask)
+        if gained.mask:
+            self.bonuses -= gained.get_gem_counts()
+            self.prestige -= gained.get_prestige()
+        for noble in self.nobles[nobles_count:]:
+            self.prestige -= noble.prestige
+
+        del self.reserved_cards[reserved_cards_count:]
+        self.development_cards.mask &= development_cards_mask
+        del self.nobles[nobles_count:]
 
     def get_development_cards_gem_value(self) -> Gems:
-        return Gems(**{
-            gem: len([card for card in self.development_cards if card.gem == gem])
-            for gem in Gems.TOKEN_TYPES
-        })
+        return self.bonuses.copy()
+
+    def get_prestige(self) -> int:
+        return self.prestige
+
+    def _get_buying_power(self) -> list[int]:
+        # gems the player can pay without gold, bonuses first, in the `Gems` layout
+        tokens = self.tokens
+        return [bonus + tokens[gem] for gem, bonus in zip(Gems.TOKEN_TYPES, self.bonuses.values())]
+
+    def shortfall(self, card: 'DevelopmentCard') -> int:
+        # gold tokens needed to cover what bonuses and gem tokens do not
+        return sum(
+            cost - power
+            for cost, power in zip(card.cost.values(), self._get_buying_power())
+            if cost > power
+        )
+
+    def affordable(self, cards: Iterable[Optional['DevelopmentCard']]) -> list[bool]:
+        # checks many cards against one snapshot of the player's means, empty slots are never affordable
+        power = self._get_buying_power()
+        gold = self.tokens[Token.GOLD]
+        return [
+            card is not None and sum(cost - own for cost, own in zip(card.cost.values(), power) if cost > own) <= gold
+            for card in cards
+        ]
+
+    def get_payment(self, card: 'DevelopmentCard') -> Tokens:
+        # tokens a purchase of `card` takes, gem tokens are spent before gold
+        payment = Tokens()
+        gold = 0
+        for gem, cost, bonus in zip(Gems.TOKEN_TYPES, card.cost.values(), self.bonuses.values()):
+            due = cost - bonus
+            if due <= 0:
+                continue
+            paid = min(due, self.tokens[gem])
+            payment[gem] = paid
+            gold += due - paid
+        payment[Token.GOLD] = gold
+        return payment
+
+    def get_payments(self, cards: Iterable[Optional['DevelopmentCard']]) -> list[Optional[Tokens]]:
+        # exact payments of many cards from one snapshot of the player's means, gold only covers
+        # what bonuses and gem tokens do not, `None` marks empty slots and unaffordable cards
+        bonuses = self.bonuses.values()
+        gems = [self.tokens[gem] for gem in Gems.TOKEN_TYPES]
+        gold = self.tokens[Token.GOLD]
+        payments = []
+        for card in cards:
+            if card is None:
+                payments.append(None)
+                continue
+
+            paid = []
+            missing = 0
+            for cost, bonus, own in zip(card.cost.values(), bonuses, gems):
+                due = cost - bonus
+                if due <= own:
+                    paid.append(max(due, 0))
+                else:
+                    paid.append(own)
+                    missing += due - own
+            # the `Tokens` layout starts with gold, followed by the gems
+            payments.append(Tokens.from_values([missing, *paid]) if missing <= gold else None)
+        return payments
+
+    def get_purchase_plans(self, game: 'GameState') -> list[PurchasePlan]:
+        # payment of every affordable card in the shop and among the reserved cards, in one pass
+        placements = [
+            (tier.tier_numer, column)
+            for tier in game.shop.tiers
+            for column in range(len(tier.card_ids))
+        ]
+        cards = [card for tier in game.shop.tiers for card in tier.available_cards]
+        plans = [
+            PurchasePlan(card, payment, card_placement=placement)
+            for placement, card, payment in zip(placements, cards, self.get_payments(cards))
+            if payment is not None
+        ]
+        plans += [
+            PurchasePlan(card, payment, reserved_index=index)
+            for index, (card, payment) in enumerate(zip(self.reserved_cards, self.get_payments(self.reserved_cards)))
+            if payment is not None
+        ]
+        return plans
 
     def action_select_tokens(self, game: 'GameState', tokens: Tokens) -> None:
         self._ensure_player_select_tokens_legal(game, tokens)
-        self.tokens += game.community_tokens.pull(tokens)
+        pulled = game.community_tokens.pull(tokens)
+        self.tokens += pulled
+
+        instrumentation = game.instrumentation
+        if instrumentation is not None and instrumentation.wants(GameEvent.TOKEN_TRANSFER):
+            instrumentation.emit(
+                GameEvent.TOKEN_TRANSFER, game, source='community', target=game.player_turn, tokens=pulled,
+            )
+
+    def _ensure_player_select_tokens_legal(self, game: 'GameState', tokens: Tokens):
+        check = self._check_select_tokens(game, tokens)
+        if check is not ActionCheck.OK:
+            raise check.get_error(IllegalTokenSelection)
+
+    def _check_select_tokens(
+        self,
+        game: 'GameState',
+        tokens: Tokens,
+        context: Optional[CheckContext] = None,
+    ) -> ActionCheck:
+        room = self._get_token_room(game) if context is None else context.token_room
+        if room < 0:
+            # tokens over the limit are discarded before anything else
+            return ActionCheck.PLAYER_TOKEN_LIMIT
 
-        if self.tokens.get_total_count() > game.ruleset.MAX_PLAYER_TOKENS:
-            raise OverPlayerTokenLimit  # TODO: should allow discarding
+        # plain value tuples in the `Tokens` layout keep the checks cheap enough to screen thousands
+        # of candidates
+        values = tokens.values() if tokens.__class__ is Tokens else (Tokens() + tokens).values()
+        if min(values) < 0:
+            return ActionCheck.NEGATIVE_TOKENS
 
-    def _ensure_player_select_tokens_legal(self, game, tokens: Tokens):
-        # TODO: split exceptions, or add messages
-        if not tokens.is_positive():
-            raise IllegalTokenSelection
+        if values[GOLD_SLOT]:
+            # gold may only be obtained by reserving a card
+            return ActionCheck.GOLD_SELECTED
 
-        if tokens.get_total_count() > 3:
+        total = sum(values)
+        if total > 3:
             # the player may not select more than three tokens
-            raise IllegalTokenSelection
+            return ActionCheck.TOO_MANY_TOKENS
 
-        if any(value > 1 for value in tokens.values()):
-            if tokens.get_total_count() > 2:
+        community = game.community_tokens.values()
+        if max(values) > 1:
+            if total > 2:
                 # when player is only allowed to pick two of the same token
-                raise IllegalTokenSelection
+                return ActionCheck.DOUBLE_PICK_TOO_LARGE
 
-            token_type = next(token for token, value in tokens if value)
-            if game.community_tokens[token_type] < 4:
+            if community[values.index(2)] < 4:
                 # the player may not pick two tokens from a pile with less than four tokens
-                raise IllegalTokenSelection
+                return ActionCheck.DOUBLE_PICK_PILE_TOO_SMALL
+        else:
+            available_gem_types = (
+                sum(1 for count in community[1:] if count)
+                if context is None else context.available_gem_types
+            )
+            if total != min(3, available_gem_types):
+                # three tokens of different kind must be picked, unless fewer kinds are left
+                return ActionCheck.DISTINCT_PICK_SIZE
+
+        if any(have < want for have, want in zip(community, values)):
+            # the player may only pick tokens that are left in the community pool
+            return ActionCheck.COMMUNITY_TOKENS_MISSING
+        # picking past the token limit is allowed, the player then discards down to it
+        return ActionCheck.OK
+
+    def _get_token_room(self, game: 'GameState') -> int:
+        return game.ruleset.MAX_PLAYER_TOKENS - self.tokens.get_total_count()
+
+    def get_legal_token_selections(self, game: 'GameState') -> list[Tokens]:
+        if self._get_token_room(game) < 0:
+            return []
+
+        community = game.community_tokens
+        available = [community[gem] > 0 for gem in Gems.TOKEN_TYPES]
+
+        # the precomputed picks follow the `Tokens` layout, so gem `i` lives in slot `i + 1`
+        pick_size = min(3, sum(available))
+        selections = [
+            Tokens.from_values(pick)
+            for pick in game.ruleset.DISTINCT_GEM_PICKS[pick_size]
+            if all(pick[i + 1] <= available[i] for i in range(len(available)))
+        ]
+        selections += [
+            Tokens.from_values(pick)
+            for pick, gem in zip(game.ruleset.DOUBLE_GEM_PICKS, Gems.TOKEN_TYPES)
+            if community[gem] >= 4
+        ]
+        return selections
+
+    def action_discard_tokens(self, game: 'GameState', tokens: Tokens) -> None:
+        # a player holding more tokens than allowed returns them to the community one at a time,
+        # their turn only ends once they are back at the limit
+        self._ensure_player_discard_tokens_legal(game, tokens)
+        discarded = self.tokens.pull_exact(tokens)
+        game.community_tokens += discarded
+
+        instrumentation = game.instrumentation
+        if instrumentation is not None and instrumentation.wants(GameEvent.TOKEN_TRANSFER):
+            instrumentation.emit(
+                GameEvent.TOKEN_TRANSFER, game, source=game.player_turn, target='community', tokens=discarded,
+            )
+
+    def _ensure_player_discard_tokens_legal(self, game: 'GameState', tokens: Tokens):
+        check = self._check_discard_tokens(game, tokens)
+        if check is not ActionCheck.OK:
+            raise check.get_error(IllegalTokenDiscard)
 
-        if tokens.get_total_count() == 3 and all(value in (0, 1) for value in tokens.values()):
-            # when three tokens are picked, they must all be of different king
-            raise IllegalTokenSelection
+    def _check_discard_tokens(
+        self,
+        game: 'GameState',
+        tokens: Tokens,
+        context: Optional[CheckContext] = None,
+    ) -> ActionCheck:
+        values = tokens.values() if tokens.__class__ is Tokens else (Tokens() + tokens).values()
+        if min(values) < 0:
+            return ActionCheck.NEGATIVE_TOKENS
+
+        if sum(values) != 1:
+            return ActionCheck.DISCARD_SIZE
+
+        room = self._get_token_room(game) if context is None else context.token_room
+        if room >= 0:
+            # only tokens over the limit are discarded
+            return ActionCheck.NOTHING_TO_DISCARD
+
+        if any(have < want for have, want in zip(self.tokens.values(), values)):
+            return ActionCheck.TOKENS_NOT_HELD
+        return ActionCheck.OK
+
+    def get_legal_token_discards(self, game: 'GameState') -> list[Tokens]:
+        if self._get_token_room(game) >= 0:
+            return []
+        return [Tokens.from_values(discard) for discard, held in zip(TOKEN_DISCARDS, self.tokens.values()) if held]
 
     def action_reserve_card(self, game: 'GameState', card_placement: tuple[int, int]):
         # TODO: implement drawing from the restock pile
+        # the gold may take the player past the token limit, which they then discard down to
         self._ensure_player_reserve_card_legal(game, card_placement)
         tier, column = card_placement
-        self.reserved_cards.append(game.shop.get_tier(tier).pick_and_replace(column))
-        self.tokens += game.community_tokens.pull(Tokens(gold=1))
+        shop_tier = game.shop.get_tier(tier)
+        card = shop_tier.pick_and_replace(column)
+        self.reserved_cards.append(card)
+        gold = game.community_tokens.pull(Tokens(gold=1))
+        self.tokens += gold
+
+        instrumentation = game.instrumentation
+        if instrumentation is not None:
+            if instrumentation.wants(GameEvent.CARD_TAKEN):
+                instrumentation.emit(GameEvent.CARD_TAKEN, game, tier=tier, column=column, card=card)
+            if instrumentation.wants(GameEvent.CARD_REFILLED):
+                instrumentation.emit(
+                    GameEvent.CARD_REFILLED, game, tier=tier, column=column, card=shop_tier.get_card(column),
+                )
+            if instrumentation.wants(GameEvent.TOKEN_TRANSFER):
+                instrumentation.emit(
+                    GameEvent.TOKEN_TRANSFER, game, source='community', target=game.player_turn, tokens=gold,
+                )
 
     def _ensure_player_reserve_card_legal(self, game: 'GameState', card_placement: tuple[int, int]):
-        tier, column = card_placement
-        if len(self.reserved_cards) > game.ruleset.MAX_PLAYER_RESERVED_CARDS:
-            raise
+        check = self._check_reserve_card(game, card_placement)
+        if check is not ActionCheck.OK:
+            raise check.get_error(IllegalCardReservation)
+
+    def _check_reserve_card(
+        self,
+        game: 'GameState',
+        card_placement: tuple[int, int],
+        context: Optional[CheckContext] = None,
+    ) -> ActionCheck:
+        reserved_room = (
+            game.ruleset.MAX_PLAYER_RESERVED_CARDS - len(self.reserved_cards)
+            if context is None else context.reserved_room
+        )
+        if reserved_room <= 0:
+            # the player may not hold more than the maximum amount of reserved cards
+            return ActionCheck.RESERVED_CARD_LIMIT
+
+        room = self._get_token_room(game) if context is None else context.token_room
+        if room < 0:
+            return ActionCheck.PLAYER_TOKEN_LIMIT
+        return self._check_shop_slot(game, card_placement)
 
+    @staticmethod
+    def _check_shop_slot(game: 'GameState', card_placement: tuple[int, int]) -> ActionCheck:
+        tier, column = card_placement
         if tier < 1 or tier > game.ruleset.SHOP_TIER_COUNT:
             # there are only three tiers
-            raise IllegalCardReservation
+            return ActionCheck.TIER_OUT_OF_RANGE
+
+        card_ids = game.shop.get_tier(tier).card_ids
+        if column < 0 or column >= len(card_ids):
+            # tried to pick a slot outside of the shop
+            return ActionCheck.COLUMN_OUT_OF_RANGE
 
-        if not game.shop.get_tier(tier).available_cards[column]:
+        if card_ids[column] == EMPTY_CARD_ID:
             # tried to pick an empty slot
-            raise IllegalCardReservation
+            return ActionCheck.EMPTY_SLOT
+        return ActionCheck.OK
+
+    def get_legal_card_reservations(self, game: 'GameState') -> list[tuple[int, int]]:
+        if len(self.reserved_cards) >= game.ruleset.MAX_PLAYER_RESERVED_CARDS or self._get_token_room(game) < 0:
+            return []
+
+        return [
+            (tier.tier_numer, column)
+            for tier in game.shop.tiers
+            for column, card_id in enumerate(tier.card_ids)
+            if card_id != EMPTY_CARD_ID
+        ]
+
+    def action_buy_card(
+        self,
+        game: 'GameState',
+        card_placement: Optional[tuple[int, int]] = None,
+        reserved_index: Optional[int] = None,
+    ):
+        self._ensure_player_buy_card_legal(game, card_placement, reserved_index)
+        if card_placement is None:
+            card = self.reserved_cards.pop(reserved_index)
+        else:
+            tier, column = card_placement
+            shop_tier = game.shop.get_tier(tier)
+            card = shop_tier.pick_and_replace(column)
+
+        payment = self.tokens.pull_exact(self.get_payment(card))
+        game.community_tokens += payment
+        self.add_development_card(card)
+
+        instrumentation = game.instrumentation
+        if instrumentation is not None:
+            if card_placement is not None:
+                if instrumentation.wants(GameEvent.CARD_TAKEN):
+                    instrumentation.emit(GameEvent.CARD_TAKEN, game, tier=tier, column=column, card=card)
+                if instrumentation.wants(GameEvent.CARD_REFILLED):
+                    instrumentation.emit(
+                        GameEvent.CARD_REFILLED, game, tier=tier, column=column, card=shop_tier.get_card(column),
+                    )
+            if instrumentation.wants(GameEvent.TOKEN_TRANSFER):
+                instrumentation.emit(
+                    GameEvent.TOKEN_TRANSFER, game, source=game.player_turn, target='community', tokens=payment,
+                )
+            if instrumentation.wants(GameEvent.CARD_PURCHASED):
+                instrumentation.emit(
+                    GameEvent.CARD_PURCHASED,
+                    game,
+                    card=card,
+                    payment=payment,
+                    card_placement=card_placement,
+                    reserved_index=reserved_index,
+                )
+
+    def _ensure_player_buy_card_legal(
+        self,
+        game: 'GameState',
+        card_placement: Optional[tuple[int, int]],
+        reserved_index: Optional[int],
+    ):
+        check = self._check_buy_card(game, card_placement, reserved_index)
+        if check is not ActionCheck.OK:
+            raise check.get_error(IllegalCardPurchase)
+
+    def _check_buy_card(
+        self,
+        game: 'GameState',
+        card_placement: Optional[tuple[int, int]] = None,
+        reserved_index: Optional[int] = None,
+        context: Optional[CheckContext] = None,
+    ) -> ActionCheck:
+        if (card_placement is None) == (reserved_index is None):
+            # a card is bought either from the shop or from the reserved cards
+            return ActionCheck.PURCHASE_SOURCE
+
+        room = self._get_token_room(game) if context is None else context.token_room
+        if room < 0:
+            return ActionCheck.PLAYER_TOKEN_LIMIT
+
+        if card_placement is None:
+            if reserved_index < 0 or reserved_index >= len(self.reserved_cards):
+                # tried to buy a reserved card the player does not hold
+                return ActionCheck.RESERVED_INDEX_OUT_OF_RANGE
+            card = self.reserved_cards[reserved_index]
+        else:
+            check = self._check_shop_slot(game, card_placement)
+            if check is not ActionCheck.OK:
+                return check
+            tier, column = card_placement
+            card = game.shop.get_tier(tier).get_card(column)
+
+        if context is None:
+            affordable = self.shortfall(card) <= self.tokens[Token.GOLD]
+        else:
+            affordable = sum(
+                cost - power
+                for cost, power in zip(card.cost.values(), context.buying_power)
+                if cost > power
+            ) <= context.gold
+        if not affordable:
+            # bonuses, gem tokens and gold together do not cover the cost
+            return ActionCheck.CARD_UNAFFORDABLE
+        return ActionCheck.OK
+
+    def get_check_context(self, game: 'GameState') -> CheckContext:
+        return CheckContext(
+            available_gem_types=sum(1 for gem in Gems.TOKEN_TYPES if game.community_tokens[gem]),
+            token_room=self._get_token_room(game),
+            reserved_room=game.ruleset.MAX_PLAYER_RESERVED_CARDS - len(self.reserved_cards),
+            buying_power=self._get_buying_power(),
+            gold=self.tokens[Token.GOLD],
+        )
+
+    def get_legal_actions(self, game: 'GameState') -> list[Action]:
+        if self._get_token_room(game) < 0:
+            # the turn goes on with nothing but discards until the player is back at the limit
+            return [(PlayerAction.DISCARD_TOKENS, {'tokens': tokens}) for tokens in self.get_legal_token_discards(game)]
+        return [
+            *((PlayerAction.SELECT_TOKENS, {'tokens': tokens}) for tokens in self.get_legal_token_selections(game)),
+            *((PlayerAction.RESERVE_CARD, {'card_placement': placement})
+              for placement in self.get_legal_card_reservations(game)),
+            *((PlayerAction.BUY_CARD, plan.get_params()) for plan in self.get_purchase_plans(game)),
+        ]
+
+
+def _get_action_handlers(player_class: type[Player]) -> dict[PlayerAction, Callable]:
+    return {
+        action: getattr(player_class, f'action_{action.value}')
+        for action in PlayerAction
+        if hasattr(player_class, f'action_{action.value}')
+    }
+
+
+def _get_action_checks(player_class: type[Player]) -> dict[PlayerAction, tuple[Callable, frozenset, frozenset]]:
+    # the parameters every action requires and accepts, so anything else fails its check instead of
+    # raising a `TypeError`
+    return {
+        action: (
+            getattr(player_class, f'_check_{action.value}'),
+            frozenset(
+                name
+                for name, parameter in list(signature(handler).parameters.items())[2:]
+                if parameter.default is Parameter.empty
+            ),
+            frozenset(list(signature(handler).parameters)[2:]),
+        )
+        for action, handler in _get_action_handlers(player_class).items()
+    }
+
+
+# dispatch of `GameState.perform_player_turn` and `GameState.check_action`, resolved once per
+# player class, so subclasses overriding `action_*` or `_check_*` methods are dispatched to
+_dispatch: dict[type[Player], tuple[dict, dict]] = {}
+
+
+def get_dispatch(player_class: type[Player]) -> tuple[dict[PlayerAction, Callable], dict[PlayerAction, tuple]]:
+    # action handlers and checks of a player class
+    tables = _dispatch.get(player_class)
+    if tables is None:
+        tables = _dispatch[player_class] = _get_action_handlers(player_class), _get_action_checks(player_class)
+    return tables
+
+
+ACTION_HANDLERS, ACTION_CHECKS = get_dispatch(Player)
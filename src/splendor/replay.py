@@ -0,0 +1,154 @@
+import mmap
+import os
+import struct
+from typing import BinaryIO, Iterator, Optional, Sequence
+
+from .actions import ActionSpace
+from .encoding import GameStateCodec
+from .exceptions import InvalidGameConfiguration
+from .game import GameState
+from .history import GameHistory
+
+MAGIC = b'SPLR\x01\x00\x00\x00'
+ACTION_COUNT = struct.Struct('<I')
+INDEX_ENTRY = struct.Struct('<Q')
+
+
+def get_index_path(path: str) -> str:
+    return f'{path}.idx'
+
+
+class ReplayWriter:
+    # append-only store of games, each record being the encoded initial state followed by the
+    # number of actions and one `ActionSpace` id byte per action; the offset of every record is
+    # appended to a sidecar index file once the record is fully written, so readers never see
+    # a partial game
+    path: str
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data: BinaryIO = open(path, 'ab')
+        self._index: BinaryIO = open(get_index_path(path), 'ab')
+        if self._data.tell() == 0:
+            self._data.write(MAGIC)
+        self._count = self._index.tell() // INDEX_ENTRY.size
+
+    def append(self, initial_state: GameState, actions: Sequence[int]) -> int:
+        # returns the number of the stored game
+        ruleset = initial_state.ruleset
+        codec = GameStateCodec.for_ruleset(ruleset)
+        if codec.ruleset != GameStateCodec.for_id(ruleset.RULESET_ID, ruleset.PLAYER_COUNT).ruleset:
+            # records only name their ruleset, a customised one could not be read back
+            raise InvalidGameConfiguration('replays can only store games of a registered ruleset')
+
+        offset = self._data.tell()
+        self._data.write(codec.encode(initial_state))
+        self._data.write(ACTION_COUNT.pack(len(actions)))
+        self._data.write(bytes(actions))
+        self._data.flush()
+        self._index.write(INDEX_ENTRY.pack(offset))
+        self._index.flush()
+
+        self._count += 1
+        return self._count - 1
+
+    def __len__(self):
+        return self._count
+
+    def close(self) -> None:
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReplayReader:
+    # memory-maps a replay file and its index, any game or position is reached without
+    # reading the records before it
+    path: str
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data = self._map(path)
+        self._index = self._map(get_index_path(path))
+        if self._data[:len(MAGIC)] != MAGIC:
+            raise InvalidGameConfiguration(f'{path} is not a replay file')
+        self._count = len(self._index) // INDEX_ENTRY.size
+        self._action_spaces: dict[int, ActionSpace] = {}
+
+    @staticmethod
+    def _map(path: str) -> mmap.mmap | bytes:
+        with open(path, 'rb') as file:
+            if not os.fstat(file.fileno()).st_size:
+                return b''
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self._count
+
+    def _get_offset(self, game: int) -> int:
+        if game < 0:
+            game += self._count
+        if not 0 <= game < self._count:
+            raise IndexError(game)
+        return INDEX_ENTRY.unpack_from(self._index, game * INDEX_ENTRY.size)[0]
+
+    def _get_record(self, game: int) -> tuple[GameStateCodec, int, int, int]:
+        # codec, offset of the initial state, offset and number of the actions
+        offset = self._get_offset(game)
+        codec = GameStateCodec.for_buffer(self._data, offset)
+        actions_offset = offset + codec.size + ACTION_COUNT.size
+        return codec, offset, actions_offset, ACTION_COUNT.unpack_from(self._data, offset + codec.size)[0]
+
+    def get_initial_state(self, game: int) -> GameState:
+        codec, offset, _, _ = self._get_record(game)
+        return codec.decode(self._data, offset)
+
+    def get_actions(self, game: int) -> bytes:
+        _, _, offset, count = self._get_record(game)
+        return self._data[offset:offset + count]
+
+    def get_turn_count(self, game: int) -> int:
+        return self._get_record(game)[3]
+
+    def get_state(self, game: int, ply: Optional[int] = None) -> GameState:
+        # state after the first `ply` actions of `game`, the final state when `ply` is omitted
+        codec, offset, actions_offset, count = self._get_record(game)
+        ply = count if ply is None else ply
+        if not 0 <= ply <= count:
+            raise IndexError(ply)
+
+        state = codec.decode(self._data, offset)
+        action_space = self._get_action_space(codec)
+        for action in self._data[actions_offset:actions_offset + ply]:
+            state.apply(action_space.decode(action))
+        return state
+
+    def get_history(self, game: int, checkpoint_interval: int = 16) -> GameHistory:
+        # the whole game with checkpoints, positioned at its last ply
+        return GameHistory.from_actions(self.get_initial_state(game), self.get_actions(game), checkpoint_interval)
+
+    def _get_action_space(self, codec: GameStateCodec) -> ActionSpace:
+        key = id(codec)
+        if key not in self._action_spaces:
+            self._action_spaces[key] = ActionSpace(codec.ruleset)
+        return self._action_spaces[key]
+
+    def __iter__(self) -> Iterator[tuple[GameState, bytes]]:
+        for game in range(self._count):
+            yield self.get_initial_state(game), self.get_actions(game)
+
+    def close(self) -> None:
+        for mapped in (self._data, self._index):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
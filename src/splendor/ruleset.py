@@ -1,10 +1,13 @@
-from typing import Self
+from typing import NamedTuple, Self
 
-from .cards import TIER_ONE_CARDS, TIER_THREE_CARDS, TIER_TWO_CARDS, DevelopmentCards
-from .exceptions import NotEnoughPlayers, OverPlayerLimit
+from .cards import CARD_CATALOG, TIER_ONE_CARDS, TIER_THREE_CARDS, TIER_TWO_CARDS, DevelopmentCard, DevelopmentCards
+from .exceptions import InvalidGameConfiguration, InvalidShopTierCount, NotEnoughPlayers, OverPlayerLimit
+from .nobles import NOBLE_CATALOG, NOBLES, Noble, NobleCatalog
+from .tokens import DISTINCT_GEM_PICKS, DOUBLE_GEM_PICKS, Gems, Tokens
 
 
 class Ruleset:
+    RULESET_ID: int  # stable number identifying the ruleset in stored games
     MAX_PLAYER_TOKENS: int
     MAX_PLAYER_RESERVED_CARDS: int
     PLAYER_COUNT: int
@@ -17,9 +20,38 @@ class Ruleset:
     TIER_ONE_DEVELOPMENT_CARDS_POOL: DevelopmentCards
     TIER_TWO_DEVELOPMENT_CARDS_POOL: DevelopmentCards
     TIER_THREE_DEVELOPMENT_CARDS_POOL: DevelopmentCards
+    NOBLE_COUNT: int  # nobles dealt at the start of a game
+    NOBLES_POOL: list[Noble]
+    NOBLE_CATALOG: NobleCatalog
+    WINNING_PRESTIGE: int  # prestige that makes the current round the last one
+
+    _compiled: dict[tuple, tuple['CompiledRuleset', tuple]] = {}
+
+    @classmethod
+    def from_id(cls, ruleset_id: int, player_count: int) -> 'Ruleset':
+        subclasses = [cls]
+        while subclasses:
+            ruleset_class = subclasses.pop()
+            if getattr(ruleset_class, 'RULESET_ID', None) == ruleset_id:
+                return ruleset_class.from_players(player_count)
+            subclasses += ruleset_class.__subclasses__()
+        raise InvalidGameConfiguration(f'unknown ruleset {ruleset_id}')
+
+    def compile(self) -> 'CompiledRuleset':
+        # the compiled form is cached for as long as the configuration stays the same; pools are
+        # told apart by identity and kept alive by the cache, so their ids are never reused
+        config = self._get_config()
+        key = (self.__class__, *(id(value) if isinstance(value, list) else value for value in config))
+        if key not in self._compiled:
+            self._compiled[key] = CompiledRuleset.from_ruleset(self), config
+        return self._compiled[key][0]
+
+    def _get_config(self) -> tuple:
+        return tuple(getattr(self, name) for name in CompiledRuleset._fields[:CONFIG_FIELD_COUNT])
 
 
 class ClassicRuleset(Ruleset):
+    RULESET_ID: int = 1
     MAX_PLAYER_TOKENS: int = 10
     MAX_PLAYER_RESERVED_CARDS: int = 3
     PLAYER_COUNT: int = 4
@@ -32,12 +64,16 @@ class ClassicRuleset(Ruleset):
     TIER_ONE_DEVELOPMENT_CARDS_POOL: DevelopmentCards = TIER_ONE_CARDS
     TIER_TWO_DEVELOPMENT_CARDS_POOL: DevelopmentCards = TIER_TWO_CARDS
     TIER_THREE_DEVELOPMENT_CARDS_POOL: DevelopmentCards = TIER_THREE_CARDS
+    NOBLE_COUNT: int = 5
+    NOBLES_POOL: list[Noble] = NOBLES
+    NOBLE_CATALOG: NobleCatalog = NOBLE_CATALOG
+    WINNING_PRESTIGE: int = 15
 
     @classmethod
     def from_players(cls, player_count: int) -> Self:
         if player_count > cls.MAX_PLAYERS:
             raise OverPlayerLimit
-        if player_count > cls.MAX_PLAYERS:
+        if player_count < cls.MIN_PLAYERS:
             raise NotEnoughPlayers
 
         ruleset = cls()
@@ -47,5 +83,82 @@ class ClassicRuleset(Ruleset):
             5 if player_count < 4 else
             7
         )
+        ruleset.NOBLE_COUNT = player_count + 1
 
         return ruleset
+
+
+class CompiledRuleset(NamedTuple):
+    # immutable, hashable snapshot of a validated `Ruleset` with the tables every new game needs;
+    # it exposes the same attributes as the ruleset it was compiled from, so it can stand in for it
+    RULESET_ID: int
+    MAX_PLAYER_TOKENS: int
+    MAX_PLAYER_RESERVED_CARDS: int
+    PLAYER_COUNT: int
+    MAX_PLAYERS: int
+    MIN_PLAYERS: int
+    SHOP_TIER_CARDS_COUNT: int
+    SHOP_TIER_COUNT: int
+    COMMUNITY_GEMS_COUNT: int
+    COMMUNITY_GOLD_COUNT: int
+    TIER_ONE_DEVELOPMENT_CARDS_POOL: tuple[DevelopmentCard, ...]
+    TIER_TWO_DEVELOPMENT_CARDS_POOL: tuple[DevelopmentCard, ...]
+    TIER_THREE_DEVELOPMENT_CARDS_POOL: tuple[DevelopmentCard, ...]
+    NOBLE_COUNT: int
+    NOBLES_POOL: tuple[Noble, ...]
+    NOBLE_CATALOG: NobleCatalog
+    WINNING_PRESTIGE: int
+    # precomputed tables
+    INITIAL_COMMUNITY_TOKENS: tuple[int, ...]  # `Tokens` layout
+    CARD_POOL_IDS: tuple[bytes, ...]  # card ids of every tier's pool, in pool order
+    DISTINCT_GEM_PICKS: tuple[tuple[tuple[int, ...], ...], ...]
+    DOUBLE_GEM_PICKS: tuple[tuple[int, ...], ...]
+
+    @classmethod
+    def from_ruleset(cls, ruleset: Ruleset) -> Self:
+        if ruleset.PLAYER_COUNT > ruleset.MAX_PLAYERS:
+            raise OverPlayerLimit
+        if ruleset.PLAYER_COUNT < ruleset.MIN_PLAYERS:
+            raise NotEnoughPlayers
+
+        pools = (
+            tuple(ruleset.TIER_ONE_DEVELOPMENT_CARDS_POOL),
+            tuple(ruleset.TIER_TWO_DEVELOPMENT_CARDS_POOL),
+            tuple(ruleset.TIER_THREE_DEVELOPMENT_CARDS_POOL),
+        )
+        if ruleset.SHOP_TIER_COUNT != len(pools):
+            raise InvalidShopTierCount
+        # cards are stored by their id in `CARD_CATALOG`, any other card would read back as an empty slot
+        for pool in pools:
+            for card in pool:
+                if card.id >= len(CARD_CATALOG) or CARD_CATALOG.cards[card.id] is not card:
+                    raise InvalidGameConfiguration(f'{card!r} is not a card of the catalog')
+
+        community = Tokens(
+            gold=ruleset.COMMUNITY_GOLD_COUNT,
+            **dict.fromkeys(Gems.TOKEN_TYPES, ruleset.COMMUNITY_GEMS_COUNT),
+        )
+        return cls(
+            *(tuple(value) if isinstance(value, list) else value for value in ruleset._get_config()),
+            INITIAL_COMMUNITY_TOKENS=community.values(),
+            CARD_POOL_IDS=tuple(bytes(card.id for card in pool) for pool in pools),
+            DISTINCT_GEM_PICKS=tuple(tuple(picks) for picks in DISTINCT_GEM_PICKS),
+            DOUBLE_GEM_PICKS=tuple(DOUBLE_GEM_PICKS),
+        )
+
+    def compile(self) -> Self:
+        return self
+
+    def __reduce__(self):
+        # the compiled form of a registered ruleset is pickled by reference, like the games stored
+        # by `GameStateCodec`; customised configs, e.g. made with `_replace`, carry their fields
+        if get_compiled_ruleset(self.RULESET_ID, self.PLAYER_COUNT) is self:
+            return get_compiled_ruleset, (self.RULESET_ID, self.PLAYER_COUNT)
+        return self.__class__, tuple(self)
+
+
+CONFIG_FIELD_COUNT = CompiledRuleset._fields.index('INITIAL_COMMUNITY_TOKENS')
+
+
+def get_compiled_ruleset(ruleset_id: int, player_count: int) -> CompiledRuleset:
+    return Ruleset.from_id(ruleset_id, player_count).compile()
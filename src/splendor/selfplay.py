@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from itertools import islice
+from random import Random
+from typing import Iterable, Iterator, NamedTuple, Optional, Sequence
+
+from .actions import ActionSpace
+# `random_agent` stays importable from here for existing `splendor.selfplay:random_agent` references
+from .agents import Agent, load_agent, random_agent
+from .game import GameFactory, GameState
+from .ruleset import ClassicRuleset
+
+
+class GameResult(NamedTuple):
+    game_index: int
+    seed: int
+    winner: Optional[int]  # `None` for shared wins and games cut short by `max_turns` or a stuck player
+    scores: tuple[int, ...]
+    turns: int
+    over: bool  # the game ended by the rules
+    actions: bytes  # `ActionSpace` ids of every action played, in order
+
+
+# per player count, games are reused across `play_game` calls of a worker
+_factories: dict[int, tuple[GameFactory, ActionSpace]] = {}
+
+
+def _get_factory(players: int) -> tuple[GameFactory, ActionSpace]:
+    if players not in _factories:
+        ruleset = ClassicRuleset.from_players(players).compile()
+        _factories[players] = GameFactory(ruleset), ActionSpace(ruleset)
+    return _factories[players]
+
+
+def play_game(agents: Sequence[Agent], seed: int, game_index: int = 0, max_turns: int = 500) -> GameResult:
+    factory, action_space = _get_factory(len(agents))
+    game = factory.create(seed)
+    try:
+        return _play(game, action_space, agents, seed, game_index, max_turns)
+    finally:
+        factory.release(game)
+
+
+def _play(
+    game: GameState,
+    action_space: ActionSpace,
+    agents: Sequence[Agent],
+    seed: int,
+    game_index: int,
+    max_turns: int,
+) -> GameResult:
+    # agents draw from their own generator, so they cannot perturb the game's outcomes
+    agent_rng = Random(f'agents:{seed}')
+
+    # agents exposing `observe(action, game)` are told about every action played
+    unique_agents = {id(agent): agent for agent in agents}.values()
+    observers = [agent.observe for agent in unique_agents if hasattr(agent, 'observe')]
+
+    log = bytearray()
+    while len(log) < max_turns:
+        actions = game.legal_actions()
+        if not actions:
+            # the game is over, or the player to move is stuck
+            break
+
+        action = agents[game.player_turn](game, actions, agent_rng)
+        log.append(action_space.encode(action))
+        turn_action, params = action
+        game.perform_player_turn(turn_action, **params)
+        for observer in observers:
+            observer(action, game)
+
+    over = game.is_over()
+    winners = game.get_winners() if over else []
+    return GameResult(
+        game_index=game_index,
+        seed=seed,
+        winner=winners[0] if len(winners) == 1 else None,
+        scores=tuple(player.get_prestige() for player in game.players),
+        turns=len(log),
+        over=over,
+        actions=bytes(log),
+    )
+
+
+def replay_game(result: GameResult) -> GameState:
+    ruleset = ClassicRuleset.from_players(len(result.scores))
+    action_space = ActionSpace(ruleset)
+    game = GameState.from_ruleset(ruleset, result.seed)
+    for action in result.actions:
+        turn_action, params = action_space.decode(action)
+        game.perform_player_turn(turn_action, **params)
+    return game
+
+
+def play_games(agents: Sequence[Agent], n_games: int, seed: int = 0, max_turns: int = 500) -> Iterator[GameResult]:
+    # plays game `i` with `seed + i` in this process, one game at a time; nothing but the game
+    # being played is held, so memory stays flat however many results are consumed
+    for game_index in range(n_games):
+        yield play_game(agents, seed + game_index, game_index, max_turns)
+
+
+def _play_games(agents: Sequence[Agent], games: Sequence[tuple[int, int]], max_turns: int) -> list[GameResult]:
+    return [play_game(agents, seed, game_index, max_turns) for game_index, seed in games]
+
+
+def run_tournament(
+    agents: Sequence[Agent],
+    n_games: int,
+    seed: int = 0,
+    seeds: Optional[Sequence[int]] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = 16,
+    max_turns: int = 500,
+) -> Iterator[GameResult]:
+    # yields results as the games finish, which is not necessarily in game order;
+    # game `i` is played with `seeds[i]`, or `seed + i` when no seeds are given; chunks are only
+    # cut as workers ask for them
+    if seeds is not None and len(seeds) < n_games:
+        raise ValueError(f'{n_games} games need as many seeds, got {len(seeds)}')
+
+    games = ((i, seeds[i] if seeds is not None else seed + i) for i in range(n_games))
+    chunks = iter(lambda: list(islice(games, chunk_size)), [])
+
+    if workers == 1:
+        for chunk in chunks:
+            yield from _play_games(agents, chunk, max_turns)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from _stream_chunks(executor, agents, chunks, max_turns, workers * 2)
+
+
+def _stream_chunks(
+    executor: Executor,
+    agents: Sequence[Agent],
+    chunks: Iterable[list[tuple[int, int]]],
+    max_turns: int,
+    max_pending: int,
+) -> Iterator[GameResult]:
+    # only a bounded amount of chunks is queued at once to keep the parent's memory flat
+    pending: set[Future] = set()
+    chunks = iter(chunks)
+    while True:
+        for chunk in chunks:
+            pending.add(executor.submit(_play_games, agents, chunk, max_turns))
+            if len(pending) >= max_pending:
+                break
+
+        if not pending:
+            return
+
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield from future.result()
+
+
+def _parse_seeds(value: str) -> list[int]:
+    try:
+        return [int(seed) for seed in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid seed list: {value!r}')
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m splendor.selfplay')
+    parser.add_argument('-n', '--games', type=int, default=None, help='defaults to 100, or one game per seed')
+    parser.add_argument(
+        '-a', '--agent', action='append', dest='agents', metavar='MODULE:CALLABLE',
+        help='agent of the next seat, repeat once per player',
+    )
+    parser.add_argument('-p', '--players', type=int, default=2, help='seats to fill when no agents are given')
+    parser.add_argument('-w', '--workers', type=int, default=None)
+    parser.add_argument('-c', '--chunk-size', type=int, default=16)
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument(
+        '--seeds', type=_parse_seeds, default=None, metavar='SEED,...',
+        help='seed of each game, overrides --seed',
+    )
+    parser.add_argument('--max-turns', type=int, default=500)
+    args = parser.parse_args(argv)
+    if args.games is None:
+        args.games = len(args.seeds) if args.seeds is not None else 100
+    elif args.seeds is not None and len(args.seeds) < args.games:
+        parser.error(f'--seeds lists {len(args.seeds)} seeds for {args.games} games')
+
+    agents = [load_agent(path) for path in args.agents or ['splendor.agents:random_agent'] * args.players]
+
+    started = time.perf_counter()
+    wins = [0] * len(agents)
+    for result in run_tournament(
+        agents,
+        args.games,
+        seed=args.seed,
+        seeds=args.seeds,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        max_turns=args.max_turns,
+    ):
+        if result.winner is not None:
+            wins[result.winner] += 1
+        print(json.dumps({**result._asdict(), 'actions': result.actions.hex()}))
+
+    elapsed = time.perf_counter() - started
+    print(f'{args.games} games in {elapsed:.2f}s ({args.games / elapsed:.1f} games/s), wins: {wins}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
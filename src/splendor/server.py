@@ -0,0 +1,418 @@
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from typing import Any, Optional, Sequence
+
+from .actions import ActionSpace
+from .encoding import decode_game, encode_game
+from .exceptions import (
+    IllegalPlayerActionError, InvalidGameConfiguration, OutOfTurnAction, ProtocolError, UnknownSession,
+)
+from .game import GameState
+from .player import Action, PlayerAction, get_dispatch
+from .replay import ReplayReader, ReplayWriter
+from .ruleset import ClassicRuleset, CompiledRuleset
+from .tokens import Tokens
+
+# line-delimited json over a tcp or unix socket, every request is an object with an `op` and an
+# optional `id` echoed back in its reply:
+#   {"op": "create", "players": 2, "seed": 1}  -> {"ok": true, "session": "...", "state": {...}}
+#   {"op": "move", "session": "...", "action": 3, "player": 0, "ply": 7}
+#   {"op": "move", "session": "...", "action": {"type": "select_tokens", "tokens": {"ruby": 1, "onyx": 1}}}
+#   {"op": "subscribe" | "unsubscribe" | "state" | "legal" | "close", "session": "..."}
+# `player` and `ply` of a move are optional guards against out of turn and stale moves, and
+# `"legal": true` on create and move adds the legal action ids of the next turn to the reply;
+# failures reply {"ok": false, "error": "<exception class>", "message": "..."}
+# subscribers receive {"event": "state", ...} once and {"event": "diff", "changes": {...}} after
+# every move, where changes hold only the keys of `get_state_view` whose value changed
+
+DEFAULT_MAX_PENDING = 256
+DEFAULT_IDLE_TIMEOUT = 300.0
+
+
+def get_state_view(game: GameState, ply: int) -> dict[str, Any]:
+    # flat, json-serializable view of what every seat sees, cards are catalog ids and empty
+    # shop slots are null; restock piles only show their size
+    view = {
+        'ply': ply,
+        'player_turn': game.player_turn,
+        'over': game.is_over(),
+        'community_tokens': list(game.community_tokens.values()),
+    }
+    for index, player in enumerate(game.players):
+        view[f'players.{index}.tokens'] = list(player.tokens.values())
+        view[f'players.{index}.reserved_cards'] = list(player.reserved_cards.ids)
+        view[f'players.{index}.development_cards'] = list(player.development_cards.ids)
+        view[f'players.{index}.nobles'] = [noble.id for noble in player.nobles]
+        view[f'players.{index}.prestige'] = player.prestige
+    view['shop.nobles'] = [noble.id for noble in game.shop.nobles]
+    for tier in game.shop.tiers:
+        view[f'shop.{tier.tier_numer}.cards'] = [card and card.id for card in tier.available_cards]
+        view[f'shop.{tier.tier_numer}.restock'] = len(tier.restock_pile)
+    return view
+
+
+def get_view_changes(previous: dict[str, Any], current: dict[str, Any]) -> dict[str, Any]:
+    return {key: value for key, value in current.items() if previous.get(key) != value}
+
+
+class Session:
+    __slots__ = ('id', 'game', 'ply', 'last_active', 'subscribers', 'view', 'evicted')
+
+    def __init__(self, session_id: str, game: GameState):
+        self.id = session_id
+        self.game: Optional[GameState] = game
+        self.ply = 0
+        self.last_active = time.monotonic()
+        self.subscribers: set['Connection'] = set()
+        # last view sent to subscribers, dropped while nobody listens
+        self.view: Optional[dict[str, Any]] = None
+        # record of the session in the eviction store while `game` is None
+        self.evicted: Optional[int | bytes] = None
+
+
+class SessionStore:
+    # evicted sessions as `GameStateCodec` records, appended to a replay file when a path is
+    # given and kept as bytes in memory otherwise; the rng is not part of the encoding, so
+    # restored games only keep what the codec stores
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._writer = ReplayWriter(path) if path else None
+        self._reader: Optional[ReplayReader] = None
+
+    def put(self, game: GameState) -> int | bytes:
+        if self._writer is None:
+            return encode_game(game)
+        return self._writer.append(game, ())
+
+    def get(self, record: int | bytes) -> GameState:
+        if isinstance(record, bytes):
+            return decode_game(record)
+        if self._reader is None or record >= len(self._reader):
+            # records appended since the file was mapped are not visible to the old mapping
+            if self._reader is not None:
+                self._reader.close()
+            self._reader = ReplayReader(self.path)
+        return self._reader.get_initial_state(record)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader is not None:
+            self._reader.close()
+
+
+class Connection:
+    # outgoing messages go through a bounded queue drained by a writer task; replies wait for
+    # room, which stops reading further requests of a client that does not read its replies,
+    # while broadcasts are dropped when the queue is full and the affected sessions are
+    # resynchronised with a full state once the client caught up
+    def __init__(self, server: 'GameServer', writer: asyncio.StreamWriter, max_pending: int):
+        self.server = server
+        self.writer = writer
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(max_pending)
+        self.sessions: set[Session] = set()
+        self.stale: set[Session] = set()
+        self.dropped = 0
+
+    async def send(self, message: dict[str, Any]) -> None:
+        await self.queue.put(_dump(message))
+
+    def publish(self, session: Session, message: bytes) -> None:
+        if session in self.stale:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self.stale.add(session)
+
+    async def write_loop(self) -> None:
+        while True:
+            self.writer.write(await self.queue.get())
+            if self.queue.empty():
+                await self.writer.drain()
+                self._resync()
+
+    def _resync(self) -> None:
+        while self.stale and not self.queue.full():
+            session = self.stale.pop()
+            if session in self.sessions:
+                self.queue.put_nowait(_dump(self.server.get_state_event(session)))
+
+
+class GameServer:
+    def __init__(
+        self,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        store_path: Optional[str] = None,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ):
+        self.sessions: dict[str, Session] = {}
+        self.store = SessionStore(store_path)
+        self.idle_timeout = idle_timeout
+        self.max_pending = max_pending
+        self.evictions = 0
+        self.restores = 0
+        self._session_ids = itertools.count()
+        # by the identity of the ruleset, hashing a compiled ruleset hashes all of its card pools
+        self._action_spaces: dict[int, tuple[CompiledRuleset, ActionSpace]] = {}
+        self._handlers = {
+            'create': self.op_create,
+            'move': self.op_move,
+            'state': self.op_state,
+            'legal': self.op_legal,
+            'subscribe': self.op_subscribe,
+            'unsubscribe': self.op_unsubscribe,
+            'close': self.op_close,
+        }
+
+    def get_action_space(self, game: GameState) -> ActionSpace:
+        ruleset = game.ruleset
+        entry = self._action_spaces.get(id(ruleset))
+        if entry is None or entry[0] is not ruleset:
+            entry = self._action_spaces[id(ruleset)] = ruleset, ActionSpace(ruleset)
+        return entry[1]
+
+    def create_session(self, players: int = 2, seed: Optional[int] = None) -> Session:
+        game = GameState.from_ruleset(ClassicRuleset.from_players(players), seed)
+        session = Session(f'{next(self._session_ids):x}', game)
+        self.sessions[session.id] = session
+        return session
+
+    def get_session(self, session_id: Any) -> Session:
+        if not isinstance(session_id, str):
+            raise ProtocolError('session must be a string')
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise UnknownSession(f'no session {session_id!r}')
+        return session
+
+    def get_game(self, session: Session) -> GameState:
+        session.last_active = time.monotonic()
+        if session.game is None:
+            session.game = self.store.get(session.evicted)
+            session.evicted = None
+            self.restores += 1
+        return session.game
+
+    def evict(self, session: Session) -> None:
+        session.evicted = self.store.put(session.game)
+        session.game = None
+        session.view = None
+        self.evictions += 1
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        deadline = (time.monotonic() if now is None else now) - self.idle_timeout
+        idle = [
+            session for session in self.sessions.values()
+            if session.game is not None and session.last_active < deadline
+        ]
+        for session in idle:
+            self.evict(session)
+        return len(idle)
+
+    def get_state_event(self, session: Session) -> dict[str, Any]:
+        session.view = get_state_view(self.get_game(session), session.ply)
+        return {'event': 'state', 'session': session.id, 'state': session.view}
+
+    def get_legal_action_ids(self, game: GameState) -> list[int]:
+        action_space = self.get_action_space(game)
+        return [action_space.encode(action) for action in game.legal_actions()]
+
+    def parse_action(self, game: GameState, action: Any) -> Action:
+        if _is_int(action):
+            try:
+                return self.get_action_space(game).decode(action)
+            except KeyError:
+                raise ProtocolError(f'unknown action id {action}') from None
+        if not isinstance(action, dict) or 'type' not in action:
+            raise ProtocolError('action must be an action id or an object with a type')
+
+        params = dict(action)
+        try:
+            turn_action = PlayerAction(params.pop('type'))
+        except ValueError:
+            raise ProtocolError(f'unknown action type {action["type"]!r}') from None
+        try:
+            if 'tokens' in params:
+                tokens = params['tokens']
+                if not isinstance(tokens, dict) or not all(
+                    token in Tokens.TOKEN_TYPES and _is_int(count) for token, count in tokens.items()
+                ):
+                    raise ValueError
+                params['tokens'] = Tokens(**tokens)
+            if 'card_placement' in params:
+                placement = params['card_placement']
+                if not isinstance(placement, list) or len(placement) != 2 or not all(map(_is_int, placement)):
+                    raise ValueError
+                params['card_placement'] = tuple(placement)
+            if 'reserved_index' in params and not _is_int(params['reserved_index']):
+                raise ValueError
+        except (KeyError, TypeError, ValueError):
+            raise ProtocolError(f'invalid {turn_action.value} parameters') from None
+        return turn_action, params
+
+    def broadcast(self, session: Session) -> None:
+        if not session.subscribers:
+            session.view = None
+            return
+        if session.view is None:
+            message = _dump(self.get_state_event(session))
+        else:
+            view = get_state_view(session.game, session.ply)
+            changes = get_view_changes(session.view, view)
+            session.view = view
+            message = _dump({'event': 'diff', 'session': session.id, 'changes': changes})
+        for connection in session.subscribers:
+            connection.publish(session, message)
+
+    async def op_create(self, connection: Connection, request: dict[str, Any]) -> dict[str, Any]:
+        players = request.get('players', 2)
+        if not _is_int(players):
+            raise ProtocolError('players must be an integer')
+        seed = request.get('seed')
+        if seed is not None and not _is_int(seed):
+            raise ProtocolError('seed must be an integer')
+        session = self.create_session(players, seed)
+        reply = {'session': session.id, 'state': get_state_view(session.game, session.ply)}
+        if request.get('legal'):
+            reply['legal'] = self.get_legal_action_ids(session.game)
+        return reply
+
+    async def op_move(self, connection: Connection, request: dict[str, Any]) -> dict[str, Any]:
+        session = self.get_session(request.get('session'))
+        game = self.get_game(session)
+        if 'ply' in request and request['ply'] != session.ply:
+            raise OutOfTurnAction(f'move for ply {request["ply"]}, the game is at ply {session.ply}')
+        if 'player' in request and request['player'] != game.player_turn:
+            raise OutOfTurnAction(f'player {request["player"]} moved during the turn of player {game.player_turn}')
+
+        turn_action, params = self.parse_action(game, request.get('action'))
+        if turn_action not in get_dispatch(game.get_current_player().__class__)[0]:
+            raise ProtocolError(f'{turn_action.value} is not supported')
+        try:
+            game.perform_player_turn(turn_action, **params)
+        except TypeError as error:
+            raise ProtocolError(f'invalid {turn_action.value} parameters: {error}') from None
+        session.ply += 1
+        self.broadcast(session)
+
+        reply = {'ply': session.ply}
+        if request.get('legal'):
+            reply['legal'] = self.get_legal_action_ids(game)
+        return reply
+
+    async def op_state(self, connection: Connection, request: dict[str, Any]) -> dict[str, Any]:
+        session = self.get_session(request.get('session'))
+        return {'state': get_state_view(self.get_game(session), session.ply)}
+
+    async def op_legal(self, connection: Connection, request: dict[str, Any]) -> dict[str, Any]:
+        session = self.get_session(request.get('session'))
+        return {'legal': self.get_legal_action_ids(self.get_game(session))}
+
+    async def op_subscribe(self, connection: Connection, request: dict[str, Any]) -> dict[str, Any]:
+        session = self.get_session(request.get('session'))
+        session.subscribers.add(connection)
+        connection.sessions.add(session)
+        await connection.send(self.get_state_event(session))
+        return {}
+
+    async def op_unsubscribe(self, connection: Connection, request: dict[str, Any]) -> dict[str, Any]:
+        session = self.get_session(request.get('session'))
+        session.subscribers.discard(connection)
+        connection.sessions.discard(session)
+        return {}
+
+    async def op_close(self, connection: Connection, request: dict[str, Any]) -> dict[str, Any]:
+        session = self.sessions.pop(self.get_session(request.get('session')).id)
+        for subscriber in session.subscribers:
+            subscriber.sessions.discard(session)
+            subscriber.publish(session, _dump({'event': 'closed', 'session': session.id}))
+        return {}
+
+    async def handle_request(self, connection: Connection, line: bytes) -> dict[str, Any]:
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                raise ProtocolError('request is not valid json') from None
+            if not isinstance(request, dict):
+                raise ProtocolError('request must be an object')
+            request_id = request.get('id')
+            op = request.get('op')
+            handler = self._handlers.get(op) if isinstance(op, str) else None
+            if handler is None:
+                raise ProtocolError(f'unknown op {request.get("op")!r}')
+            reply = {'ok': True, **await handler(connection, request)}
+        except (IllegalPlayerActionError, InvalidGameConfiguration, ProtocolError) as error:
+            reply = {'ok': False, 'error': error.__class__.__name__, 'message': str(error)}
+        if request_id is not None:
+            reply['id'] = request_id
+        return reply
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connection = Connection(self, writer, self.max_pending)
+        write_task = asyncio.create_task(connection.write_loop())
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    await connection.send(await self.handle_request(connection, line))
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            for session in connection.sessions:
+                session.subscribers.discard(connection)
+            write_task.cancel()
+            writer.close()
+
+    async def evict_idle_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(self.idle_timeout / 4, 0.01))
+            self.evict_idle()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 7777, path: Optional[str] = None) -> None:
+        if path:
+            server = await asyncio.start_unix_server(self.handle_connection, path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        eviction = asyncio.create_task(self.evict_idle_loop())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            eviction.cancel()
+            self.store.close()
+
+
+def _is_int(value: Any) -> bool:
+    # json booleans are python ints as well
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _dump(message: dict[str, Any]) -> bytes:
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m splendor.server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7777)
+    parser.add_argument('--unix', metavar='PATH', help='listen on a unix socket instead of tcp')
+    parser.add_argument('--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT, help='seconds before eviction')
+    parser.add_argument('--store', metavar='PATH', help='replay file of evicted sessions, kept in memory if omitted')
+    parser.add_argument('--max-pending', type=int, default=DEFAULT_MAX_PENDING, help='queued messages per client')
+    args = parser.parse_args(argv)
+
+    server = GameServer(idle_timeout=args.idle_timeout, store_path=args.store, max_pending=args.max_pending)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,9 @@
+import random
+from array import array
+from random import Random
 from typing import Optional, Self
 
-from .cards import DevelopmentCard, DevelopmentCards
+from .cards import CARD_CATALOG, EMPTY_CARD_ID, CardSlots, DevelopmentCard, DevelopmentCards
 from .nobles import Noble
 from .ruleset import Ruleset
 
@@ -8,41 +11,74 @@ from .ruleset import Ruleset
 class ShopTier:
     tier_numer: int = 1
     restock_pile: DevelopmentCards
-    available_cards: list[Optional[DevelopmentCard]]
+    card_ids: array  # ids of the cards for sale, `EMPTY_CARD_ID` marks an empty slot
 
     def __init__(self, ruleset: Ruleset, tier_numer=1, restock_pile=None, available_cards=None):
         self.tier_numer = tier_numer
         self.restock_pile = restock_pile or DevelopmentCards()
-        self.available_cards = available_cards or []
+        self.card_ids = array('B', [EMPTY_CARD_ID if card is None else card.id for card in available_cards or ()])
 
-        self.available_cards += [  # ensure the correct amount of cards is available for sale
-            self.restock_pile.pop()
-            for _ in range(ruleset.SHOP_TIER_CARDS_COUNT - len(self.available_cards))
-        ]
+        self.card_ids.extend(  # ensure the correct amount of cards is available for sale
+            self.restock_pile.ids.pop()
+            for _ in range(ruleset.SHOP_TIER_CARDS_COUNT - len(self.card_ids))
+        )
+
+    @property
+    def available_cards(self) -> CardSlots:
+        # the cards for sale, `None` in empty slots; changes to it change the tier
+        return CardSlots(self.card_ids)
+
+    @available_cards.setter
+    def available_cards(self, cards: list[Optional[DevelopmentCard]]) -> None:
+        self.card_ids[:] = array('B', [EMPTY_CARD_ID if card is None else card.id for card in cards])
+
+    def get_card(self, index: int) -> Optional[DevelopmentCard]:
+        return CARD_CATALOG.get_card(self.card_ids[index])
 
     def pick_and_replace(self, index: int) -> Optional[DevelopmentCard]:
         # TODO: may raise index error
-        card = self.available_cards[index]
-        self.available_cards[index] = (
-            self.restock_pile and
-            self.restock_pile.pop() or
-            None
-        )
+        card_id = self.card_ids[index]
+        restock_ids = self.restock_pile.ids
+        self.card_ids[index] = restock_ids.pop() if restock_ids else EMPTY_CARD_ID
+
+        return CARD_CATALOG.get_card(card_id)
 
-        return card
+    def put_back(self, index: int, card_id: int) -> None:
+        # reverts `pick_and_replace`, its replacement goes back on top of the restock pile
+        replacement = self.card_ids[index]
+        if replacement != EMPTY_CARD_ID:
+            self.restock_pile.ids.append(replacement)
+        self.card_ids[index] = card_id
+
+    def clone(self) -> Self:
+        tier = object.__new__(self.__class__)
+        tier.tier_numer = self.tier_numer
+        tier.restock_pile = self.restock_pile.copy()
+        tier.card_ids = self.card_ids[:]
+        return tier
 
 
 class Shop:
-    nobles: list[Noble]
+    nobles: list[Noble]  # replaced rather than mutated when a noble leaves, see `UndoRecord`
     tiers: list[ShopTier]
 
     def get_tier(self, tier):
-        return self.tiers[tier + 1]
+        return self.tiers[tier - 1]
 
     @classmethod
-    def from_pools(cls, ruleset: Ruleset, card_pools: list[DevelopmentCards], nobles: list[Noble]) -> Self:
+    def from_pools(
+        cls,
+        ruleset: Ruleset,
+        card_pools: list[DevelopmentCards],
+        nobles: list[Noble],
+        rng: Optional[Random] = None,
+    ) -> Self:
         for pool in card_pools:
-            pool.shuffle()
+            pool.shuffle(rng)
+        # nobles are dealt after the cards, so a seed deals the same cards as before nobles existed
+        nobles = list(nobles)
+        (rng or random).shuffle(nobles)
+        nobles = nobles[:ruleset.NOBLE_COUNT]
 
         return cls(
             ruleset,
@@ -57,10 +93,33 @@ class Shop:
         self.nobles = nobles or []
         self.tiers = tiers or []
 
+    def clone(self) -> Self:
+        shop = object.__new__(self.__class__)
+        shop.nobles = self.nobles.copy()
+        shop.tiers = [tier.clone() for tier in self.tiers]
+        return shop
+
+    def reset(self, ruleset: Ruleset, rng: Optional[Random] = None) -> None:
+        # deals a new game into the existing tiers, consuming `rng` exactly like `from_pools`
+        ruleset = ruleset.compile()
+        for tier, pool_ids in zip(self.tiers, ruleset.CARD_POOL_IDS):
+            tier.restock_pile.ids = array('B', pool_ids)
+            tier.restock_pile.shuffle(rng)
+        for tier in self.tiers:
+            card_ids, restock_ids = tier.card_ids, tier.restock_pile.ids
+            for column in range(len(card_ids)):
+                card_ids[column] = restock_ids.pop()
+
+        nobles = list(ruleset.NOBLES_POOL)
+        (rng or random).shuffle(nobles)
+        self.nobles = nobles[:ruleset.NOBLE_COUNT]
+
     @classmethod
-    def get_initial_shop_state(cls, ruleset: Ruleset) -> Self:
-        return cls.from_pools(ruleset, [
-            DevelopmentCards(*ruleset.TIER_ONE_DEVELOPMENT_CARDS_POOL),
-            DevelopmentCards(*ruleset.TIER_TWO_DEVELOPMENT_CARDS_POOL),
-            DevelopmentCards(*ruleset.TIER_THREE_DEVELOPMENT_CARDS_POOL),
-        ], [])
+    def get_initial_shop_state(cls, ruleset: Ruleset, rng: Optional[Random] = None) -> Self:
+        ruleset = ruleset.compile()
+        return cls.from_pools(
+            ruleset,
+            [DevelopmentCards.from_ids(pool_ids) for pool_ids in ruleset.CARD_POOL_IDS],
+            ruleset.NOBLES_POOL,
+            rng,
+        )
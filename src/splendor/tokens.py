@@ -1,6 +1,6 @@
-from collections import defaultdict
 from enum import Enum
-from typing import MutableMapping, Self
+from itertools import combinations
+from typing import Mapping, MutableMapping, Self
 
 from .exceptions import InvalidTokenPullError
 
@@ -22,7 +22,22 @@ class Gem(Enum):
     ONYX = 'onyx'
 
 
+def _index_token_types(token_types: list[str]) -> dict:
+    # every slot may be addressed by its name, its `Token` or its `Gem` member
+    index = {}
+    for i, token in enumerate(token_types):
+        index[token] = i
+        index[Token(token)] = i
+        if token in Gem._value2member_map_:
+            index[Gem(token)] = i
+    return index
+
+
 class Tokens(MutableMapping[str, int]):
+    # counts live in a fixed list with one slot per entry of `TOKEN_TYPES`,
+    # the mapping interface is only a view over it
+    __slots__ = ('_values',)
+
     TOKEN_TYPES = [
         'gold',
         'ruby',
@@ -31,91 +46,165 @@ class Tokens(MutableMapping[str, int]):
         'diamond',
         'onyx',
     ]
+    _INDEX: dict
+
+    _values: list[int]
+
+    def __init_subclass__(cls, **kw):
+        super().__init_subclass__(**kw)
+        cls._INDEX = _index_token_types(cls.TOKEN_TYPES)
+
+    @classmethod
+    def from_values(cls, values) -> Self:
+        tokens = object.__new__(cls)
+        tokens._values = list(values)
+        return tokens
+
+    def copy(self) -> Self:
+        tokens = object.__new__(self.__class__)
+        tokens._values = self._values.copy()
+        return tokens
+
+    def assign(self, tokens: Self) -> None:
+        # overwrites the counts in place so holders of `self` see the change
+        self._values[:] = self._align(tokens)
+
+    def _align(self, other: Mapping) -> list[int]:
+        # returns the values of `other` laid out in the slots of `self`
+        if isinstance(other, Tokens):
+            if other.TOKEN_TYPES is self.TOKEN_TYPES:
+                return other._values
+            pairs = zip(other.TOKEN_TYPES, other._values)
+        else:
+            pairs = other.items()
+
+        values = [0] * len(self.TOKEN_TYPES)
+        index = self._INDEX
+        for token, value in pairs:
+            if value:
+                values[index[token]] = value
+        return values
 
     def pull(self, tokens: Self) -> Self:
         result = self.__class__()
-        for token, value in tokens.items():
-            if not value:
+        own = self._values
+        pulled = result._values
+        for i, value in enumerate(self._align(tokens)):
+            if value <= 0:
                 continue
 
-            if self[token] >= value:
-                result[token] = value
-                self[token] -= value
+            if own[i] >= value:
+                pulled[i] = value
+                own[i] -= value
             else:
-                result[token] = self[token]
-                self[token] = 0
+                pulled[i] = own[i]
+                own[i] = 0
 
         return result
 
     def pull_exact(self, tokens: Self) -> Self:
-        if all(a >= b for a, b in zip(self.values(), tokens.values())):
+        if self >= tokens:
             return self.pull(tokens)
         raise InvalidTokenPullError
 
     def get_total_count(self):
-        return sum(self.values())
+        return sum(self._values)
 
     def is_positive(self):
-        return all(value >= 0 for value in self.values())
+        return min(self._values, default=0) >= 0
 
     def __init__(self, **kw):
-        self._tokens = defaultdict(lambda: 0, **kw)
+        self._values = [0] * len(self.TOKEN_TYPES)
+        for token, value in kw.items():
+            self[token] = value
 
     def __getitem__(self, item):
-        if item not in self.TOKEN_TYPES:
-            raise KeyError()
-        return self._tokens.__getitem__(item)
+        return self._values[self._INDEX[item]]
 
     def __setitem__(self, key, value):
-        if key not in self.TOKEN_TYPES:
-            raise KeyError
+        index = self._INDEX[key]
         if not isinstance(value, int):
             raise ValueError
-        return self._tokens.__setitem__(key, value)
+        self._values[index] = value
 
     def __delitem__(self, key):
-        self._tokens[key] = 0
+        self._values[self._INDEX[key]] = 0
 
     def __len__(self):
         return len(self.TOKEN_TYPES)
 
     def __iter__(self):
-        yield from self.TOKEN_TYPES
+        return iter(self.TOKEN_TYPES)
+
+    def __contains__(self, item):
+        return item in self._INDEX
+
+    def keys(self):
+        return tuple(self.TOKEN_TYPES)
+
+    def values(self):
+        return tuple(self._values)
+
+    def items(self):
+        return tuple(zip(self.TOKEN_TYPES, self._values))
+
+    def __eq__(self, other):
+        if isinstance(other, Tokens) and other.TOKEN_TYPES is self.TOKEN_TYPES:
+            return self._values == other._values
+        return super().__eq__(other)
+
+    def __ge__(self, other: Self):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        try:
+            values = self._align(other)
+        except KeyError:
+            # `other` holds tokens this layout has no slot for
+            return NotImplemented
+        return all(a >= b for a, b in zip(self._values, values))
+
+    def __le__(self, other: Self):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        try:
+            values = self._align(other)
+        except KeyError:
+            # `other` holds tokens this layout has no slot for
+            return NotImplemented
+        return all(a <= b for a, b in zip(self._values, values))
 
     def __add__(self, other: Self):
-        return self.__class__(**{
-            token: self[token] + value
-            for token, value in other.items()
-        })
+        return self.from_values([a + b for a, b in zip(self._values, self._align(other))])
 
     def __iadd__(self, other: Self):
-        for token, value in other.items():
-            self[token] += value
+        values = self._values
+        for i, value in enumerate(self._align(other)):
+            values[i] += value
         return self
 
     def __sub__(self, other: Self):
-        return self.__class__(**{
-            token: self[token] - value
-            for token, value in other.items()
-        })
+        return self.from_values([a - b for a, b in zip(self._values, self._align(other))])
 
     def __isub__(self, other: Self):
-        for token, value in other.items():
-            self[token] -= value
+        values = self._values
+        for i, value in enumerate(self._align(other)):
+            values[i] -= value
         return self
 
     def __neg__(self):
-        self.__class__(**{
-            token: -self[token]
-            for token, value in self.items()
-        })
+        return self.from_values([-value for value in self._values])
 
     def __repr__(self):
-        members = ', '.join(f'{token}={value}' for token, value in self.items())
+        members = ', '.join(f'{token}={value}' for token, value in zip(self.TOKEN_TYPES, self._values))
         return f'{self.__class__.__name__}({members})'
 
 
+Tokens._INDEX = _index_token_types(Tokens.TOKEN_TYPES)
+
+
 class Gems(Tokens):
+    __slots__ = ()
+
     TOKEN_TYPES = [
         'ruby',
         'emerald',
@@ -123,3 +212,19 @@ class Gems(Tokens):
         'diamond',
         'onyx',
     ]
+
+
+def _gem_pick_values(counts: dict[str, int]) -> tuple[int, ...]:
+    return tuple(counts.get(token, 0) for token in Tokens.TOKEN_TYPES)
+
+
+# every token selection shape the rules allow, as value tuples in the `Tokens` layout;
+# `DISTINCT_GEM_PICKS[n]` holds the picks of `n` different gems
+DISTINCT_GEM_PICKS: list[list[tuple[int, ...]]] = [
+    [_gem_pick_values(dict.fromkeys(gems, 1)) for gems in combinations(Gems.TOKEN_TYPES, count)]
+    for count in range(4)
+]
+DOUBLE_GEM_PICKS: list[tuple[int, ...]] = [_gem_pick_values({gem: 2}) for gem in Gems.TOKEN_TYPES]
+
+# single tokens a player over the token limit may discard, one per kind including gold
+TOKEN_DISCARDS: list[tuple[int, ...]] = [_gem_pick_values({token: 1}) for token in Tokens.TOKEN_TYPES]
@@ -0,0 +1,195 @@
+from collections import Counter
+from random import Random
+from typing import TYPE_CHECKING, Any, NamedTuple, Optional
+
+from .cards import CARD_CATALOG, EMPTY_CARD_ID, CardSet
+from .ruleset import CompiledRuleset, Ruleset
+from .tokens import Tokens
+
+if TYPE_CHECKING:
+    from .game import GameState, UndoRecord
+
+ZOBRIST_SEED = 0x5B1E_0D0B
+
+
+class ZobristKeys:
+    # random 64-bit keys for every (feature, value) pair of a game, drawn from a fixed seed
+    # so that hashes are stable across processes; a count of zero tokens has the key 0
+    # by the identity of the compiled ruleset, the tables are sized from several of its fields
+    _cache: dict[int, tuple[CompiledRuleset, 'ZobristKeys']] = {}
+
+    def __init__(self, ruleset: Ruleset):
+        self._ruleset = ruleset = ruleset.compile()
+        rng = Random(ZOBRIST_SEED)
+
+        def keys(count: int) -> list[int]:
+            return [rng.getrandbits(64) for _ in range(count)]
+
+        catalog = CARD_CATALOG
+        cards = len(catalog)
+        players = ruleset.PLAYER_COUNT
+        # no pile of a single token type ever holds more than the community started with
+        counts = max(ruleset.COMMUNITY_GEMS_COUNT, ruleset.COMMUNITY_GOLD_COUNT) + 1
+
+        self.player_turn = keys(players)
+        self.community_tokens = [[0, *keys(counts - 1)] for _ in Tokens.TOKEN_TYPES]
+        self.player_tokens = [[[0, *keys(counts - 1)] for _ in Tokens.TOKEN_TYPES] for _ in range(players)]
+        self.development_cards = [keys(cards) for _ in range(players)]
+        self.reserved_cards = [keys(cards) for _ in range(players)]
+        # a card only ever shows up in its own tier, so slots and pile positions need no tier key;
+        # slots are padded so that `EMPTY_CARD_ID` has the key 0
+        self.shop_cards = [
+            keys(cards) + [0] * (EMPTY_CARD_ID + 1 - cards)
+            for _ in range(ruleset.SHOP_TIER_CARDS_COUNT)
+        ]
+        self.restock_piles = [keys(cards) for _ in range(max(Counter(catalog.tiers).values()))]
+        self.nobles = [keys(len(ruleset.NOBLE_CATALOG)) for _ in range(players)]
+        self.shop_nobles = keys(len(ruleset.NOBLE_CATALOG))
+
+    @classmethod
+    def for_ruleset(cls, ruleset: Ruleset) -> 'ZobristKeys':
+        ruleset = ruleset.compile()
+        entry = cls._cache.get(id(ruleset))
+        if entry is None or entry[0] is not ruleset:
+            entry = cls._cache[id(ruleset)] = ruleset, cls(ruleset)
+        return entry[1]
+
+    def __reduce__(self):
+        # games are pickled with a reference to their keys instead of the tables themselves
+        return self.for_ruleset, (self._ruleset,)
+
+    def hash_game(self, game: 'GameState') -> int:
+        value = self.player_turn[game.player_turn]
+        for slot, count in enumerate(game.community_tokens.values()):
+            value ^= self.community_tokens[slot][count]
+
+        for i, player in enumerate(game.players):
+            for slot, count in enumerate((Tokens() + player.tokens).values()):
+                value ^= self.player_tokens[i][slot][count]
+            for card_id in player.development_cards.ids:
+                value ^= self.development_cards[i][card_id]
+            for card_id in player.reserved_cards.ids:
+                value ^= self.reserved_cards[i][card_id]
+            for noble in player.nobles:
+                value ^= self.nobles[i][noble.id]
+
+        for noble in game.shop.nobles:
+            value ^= self.shop_nobles[noble.id]
+        for tier in game.shop.tiers:
+            for column, card_id in enumerate(tier.card_ids):
+                value ^= self.shop_cards[column][card_id]
+            for position, card_id in enumerate(tier.restock_pile.ids):
+                value ^= self.restock_piles[position][card_id]
+
+        return value
+
+    def get_update(self, game: 'GameState', record: 'UndoRecord') -> int:
+        # xor-delta between the state captured by `record` and the current one,
+        # only looks at what a single action can have touched
+        i = record.player_turn
+        player = game.get_player(i)
+        delta = self.player_turn[record.player_turn] ^ self.player_turn[game.player_turn]
+
+        community_keys = self.community_tokens
+        for slot, (old, new) in enumerate(zip(record.community_tokens.values(), game.community_tokens.values())):
+            if old != new:
+                delta ^= community_keys[slot][old] ^ community_keys[slot][new]
+
+        token_keys = self.player_tokens[i]
+        for slot, (old, new) in enumerate(zip(record.player_tokens.values(), player.tokens.values())):
+            if old != new:
+                delta ^= token_keys[slot][old] ^ token_keys[slot][new]
+
+        for card_id in CardSet.from_mask(player.development_cards.mask ^ record.development_cards).ids:
+            delta ^= self.development_cards[i][card_id]
+        reserved_ids = player.reserved_cards.ids
+        if reserved_ids.tobytes() != record.reserved_cards:
+            reserved_keys = self.reserved_cards[i]
+            for card_id in record.reserved_cards:
+                delta ^= reserved_keys[card_id]
+            for card_id in reserved_ids:
+                delta ^= reserved_keys[card_id]
+        for noble in player.nobles[record.nobles_count:]:
+            # a visiting noble always comes from the shop
+            delta ^= self.nobles[i][noble.id] ^ self.shop_nobles[noble.id]
+
+        for tier, card_ids in zip(game.shop.tiers, record.shop_cards):
+            current = tier.card_ids
+            for column, old in enumerate(card_ids):
+                new = current[column]
+                if old == new:
+                    continue
+                slot_keys = self.shop_cards[column]
+                delta ^= slot_keys[old] ^ slot_keys[new]
+                if new != EMPTY_CARD_ID:
+                    # the replacement was drawn from the top of the pile
+                    delta ^= self.restock_piles[len(tier.restock_pile)][new]
+
+        return delta
+
+
+class TranspositionEntry(NamedTuple):
+    key: int
+    depth: int
+    generation: int
+    value: Any
+
+
+class TranspositionTable:
+    # fixed-size, directly indexed table of search results keyed by zobrist hash; a slot is
+    # overwritten when it is empty, holds the same position, was stored by an older search
+    # or holds a result that was searched less deeply than the new one
+    capacity: int
+    generation: int
+    hits: int
+    misses: int
+
+    def __init__(self, capacity: int = 1 << 20):
+        # rounded up to a power of two so the slot is a mask of the key
+        self.capacity = 1 << max(capacity - 1, 1).bit_length()
+        self._mask = self.capacity - 1
+        self._entries: list[Optional[TranspositionEntry]] = [None] * self.capacity
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def new_search(self) -> None:
+        # ages every stored entry, so results of previous searches are replaced first
+        self.generation += 1
+
+    def probe(self, key: int, min_depth: int = 0) -> Optional[TranspositionEntry]:
+        entry = self._entries[key & self._mask]
+        if entry is not None and entry.key == key and entry.depth >= min_depth:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def get(self, key: int, default: Any = None, min_depth: int = 0) -> Any:
+        entry = self.probe(key, min_depth)
+        return default if entry is None else entry.value
+
+    def store(self, key: int, value: Any, depth: int = 0) -> bool:
+        slot = key & self._mask
+        entry = self._entries[slot]
+        if (
+            entry is None or
+            entry.key == key or
+            entry.generation != self.generation or
+            entry.depth <= depth
+        ):
+            self._entries[slot] = TranspositionEntry(key, depth, self.generation, value)
+            return True
+        return False
+
+    def clear(self) -> None:
+        self._entries = [None] * self.capacity
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return sum(entry is not None for entry in self._entries)
+
+    def __contains__(self, key: int):
+        entry = self._entries[key & self._mask]
+        return entry is not None and entry.key == key
@@ -0,0 +1,89 @@
+from random import Random
+
+import pytest
+
+from splendor.arena import GameArena
+from splendor.encoding import GameStateCodec
+from splendor.exceptions import InvalidTokenValueError
+from splendor.game import GameState
+from splendor.ruleset import ClassicRuleset
+from splendor.tokens import Tokens
+
+
+def test_store_load_and_view():
+    ruleset = ClassicRuleset.from_players(4)
+    codec = GameStateCodec.for_ruleset(ruleset)
+    game = GameState.from_ruleset(ruleset, 1)
+    with GameArena(ruleset, 2) as arena:
+        with pytest.raises(KeyError):
+            arena.load(0)
+
+        arena.store(0, game)
+        assert codec.encode(arena.load(0)) == codec.encode(game)
+
+        view = arena.view(0)
+        version = view.version
+        view.player_turn = 2
+        view.set_player_tokens(1, Tokens(ruby=4))
+        assert not view.is_current(version)
+
+        loaded = view.read()
+        assert loaded.player_turn == 2
+        assert loaded.players[1].tokens['ruby'] == 4
+        assert view.zobrist_hash == loaded.zobrist_keys.hash_game(loaded)
+
+
+def test_view_rejects_writes_to_empty_slots():
+    ruleset = ClassicRuleset.from_players(2)
+    with GameArena(ruleset, 2) as arena:
+        view = arena.view(1)
+        with pytest.raises(KeyError):
+            view.player_turn = 1
+        with pytest.raises(KeyError):
+            arena.load(1)
+
+
+@pytest.mark.parametrize('ruby', [9, -1])
+def test_failed_view_writes_keep_the_hash(ruby):
+    ruleset = ClassicRuleset.from_players(2)
+    with GameArena(ruleset, 1) as arena:
+        arena.store(0, GameState.from_ruleset(ruleset, 1))
+        view = arena.view(0)
+        zobrist_hash = view.zobrist_hash
+        with pytest.raises(InvalidTokenValueError):
+            view.set_player_tokens(0, Tokens(ruby=ruby))
+        with pytest.raises(IndexError):
+            view.player_turn = 2
+        assert view.zobrist_hash == zobrist_hash
+        assert view.version % 2 == 0
+
+        view.community_tokens = Tokens(ruby=1)
+        loaded = view.read()
+        assert view.zobrist_hash == loaded.zobrist_keys.hash_game(loaded)
+
+
+def test_view_reads_like_the_game():
+    ruleset = ClassicRuleset.from_players(3)
+    game = GameState.from_ruleset(ruleset, 3)
+    rng = Random(3)
+    with GameArena(ruleset, 1) as arena:
+        for _ in range(200):
+            legal = game.legal_actions()
+            if not legal:
+                break
+            game.apply(rng.choice(legal))
+            arena.store(0, game)
+            view = arena.view(0)
+            assert view.is_over() == game.is_over()
+            assert view.get_standings() == game.get_standings()
+            assert view.get_current_player().tokens == game.get_current_player().tokens
+            for player, stored in zip(view.players, game.players):
+                assert player.prestige == stored.prestige
+                assert player.bonuses == stored.bonuses
+                assert sorted(noble.id for noble in player.nobles) == sorted(noble.id for noble in stored.nobles)
+                assert list(player.reserved_cards) == list(stored.reserved_cards)
+
+        player = arena.view(0).get_player(0)
+        tokens = player.tokens
+        player.tokens += Tokens(diamond=1)
+        assert player.tokens == tokens + Tokens(diamond=1)
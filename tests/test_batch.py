@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from splendor.batch import BatchGameState
+from splendor.game import GameState
+from splendor.ruleset import ClassicRuleset
+
+
+def _snapshot(game: GameState) -> tuple:
+    # the batch does not keep the order of nobles
+    return (
+        game.player_turn,
+        game.community_tokens.values(),
+        sorted(noble.id for noble in game.shop.nobles),
+        [
+            (
+                player.tokens.values(),
+                player.development_cards.mask,
+                player.reserved_cards.ids.tobytes(),
+                sorted(noble.id for noble in player.nobles),
+                player.prestige,
+            )
+            for player in game.players
+        ],
+        [(tier.card_ids.tobytes(), tier.restock_pile.ids.tobytes()) for tier in game.shop.tiers],
+    )
+
+
+@pytest.mark.parametrize('players', [2, 3, 4])
+def test_matches_game_state(players):
+    ruleset = ClassicRuleset.from_players(players)
+    games = [GameState.from_ruleset(ruleset, seed) for seed in range(12)]
+    batch = BatchGameState.from_game_states(games)
+    space = batch.action_space
+    rng = np.random.default_rng(players)
+    for _ in range(120):
+        mask = batch.get_legal_mask()
+        for i, game in enumerate(games):
+            legal = sorted(space.encode(action) for action in game.legal_actions())
+            assert legal == list(np.flatnonzero(mask[i]))
+        assert list(batch.is_over()) == [game.is_over() for game in games]
+
+        actions = batch.sample_legal_actions(rng)
+        # some illegal actions, which must be rejected by both
+        actions[::5] = 3
+        applied = batch.step(actions)
+        for i, game in enumerate(games):
+            if actions[i] < 0:
+                assert not applied[i]
+                continue
+
+            turn_action, params = space.decode(actions[i])
+            try:
+                game.perform_player_turn(turn_action, **params)
+            except Exception:
+                assert not applied[i]
+            else:
+                assert applied[i]
+            assert _snapshot(batch.to_game_state(i)) == _snapshot(game)
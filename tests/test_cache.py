@@ -0,0 +1,40 @@
+from random import Random
+
+from splendor.cache import PositionCache
+from splendor.game import GameState
+from splendor.ruleset import ClassicRuleset
+
+
+def _get_games(count: int) -> list[GameState]:
+    game = GameState.from_ruleset(ClassicRuleset.from_players(2), 1)
+    rng = Random(0)
+    games = []
+    for _ in range(count):
+        games.append(game.clone())
+        game.apply(rng.choice(game.legal_actions()))
+    return games
+
+
+def test_deeper_result_is_kept(tmp_path):
+    games = _get_games(3)
+    with PositionCache(str(tmp_path / 'cache.sqlite'), memory_size=1) as cache:
+        cache.store(games[0], 'deep', depth=3)
+        cache.store(games[0], 'shallow', depth=1)
+        assert cache.get(games[0]) == 'deep'
+
+        # the deep result is now only on disk
+        cache.store(games[1], 'other')
+        cache.store(games[0], 'shallow', depth=1)
+        assert cache.get(games[0]) == 'deep'
+        assert cache.get(games[0], min_depth=4) is None
+
+
+def test_results_persist(tmp_path):
+    games = _get_games(10)
+    path = str(tmp_path / 'cache.sqlite')
+    with PositionCache(path) as cache:
+        for i, game in enumerate(games):
+            cache.store(game, i)
+
+    with PositionCache(path) as cache:
+        assert [cache.get(game) for game in games] == list(range(10))
@@ -0,0 +1,33 @@
+import pytest
+
+from splendor.cards import CARD_CATALOG, CardSet
+from splendor.game import GameState
+from splendor.ruleset import ClassicRuleset
+
+
+def test_cards_are_immutable():
+    card = CARD_CATALOG.cards[0]
+    with pytest.raises(AttributeError):
+        card.prestige = 5
+    with pytest.raises(AttributeError):
+        del card.id
+
+
+def test_available_cards_write_through():
+    game = GameState.from_ruleset(ClassicRuleset.from_players(2), 1)
+    tier = game.shop.get_tier(1)
+    card = tier.available_cards[0]
+    tier.available_cards[0] = None
+    assert tier.available_cards[0] is None
+    assert tier.available_cards[1:] == list(tier.available_cards)[1:]
+
+    tier.available_cards[0] = card
+    assert tier.available_cards[0] is card
+    tier.available_cards = [None] * len(tier.available_cards)
+    assert all(card is None for card in tier.available_cards)
+
+
+def test_card_set_hash():
+    cards = CARD_CATALOG.cards
+    assert CardSet(cards[1], cards[2]) == CardSet.from_ids([2, 1])
+    assert len({CardSet(cards[1], cards[2]), CardSet.from_ids([2, 1]), CardSet()}) == 2
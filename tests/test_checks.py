@@ -0,0 +1,65 @@
+import itertools
+from random import Random
+
+import pytest
+
+from splendor.checks import ActionCheck
+from splendor.exceptions import IllegalPlayerActionError
+from splendor.game import GameState
+from splendor.player import PlayerAction
+from splendor.ruleset import ClassicRuleset
+from splendor.tokens import Tokens
+
+
+def _get_candidates() -> list:
+    # legal and illegal actions of every kind, malformed parameters included
+    candidates = [
+        (PlayerAction.SELECT_TOKENS, {'tokens': Tokens.from_values(values)})
+        for values in itertools.product(range(3), repeat=len(Tokens.TOKEN_TYPES))
+        if sum(values) <= 4
+    ]
+    candidates += [
+        (turn_action, {'card_placement': (tier, column)})
+        for turn_action in (PlayerAction.RESERVE_CARD, PlayerAction.BUY_CARD)
+        for tier in range(5)
+        for column in range(-1, 5)
+    ]
+    candidates += [(PlayerAction.BUY_CARD, {'reserved_index': index}) for index in range(-1, 4)]
+    candidates += [
+        (PlayerAction.DISCARD_TOKENS, {'tokens': Tokens.from_values(values)})
+        for values in itertools.product(range(2), repeat=len(Tokens.TOKEN_TYPES))
+        if sum(values) <= 2
+    ]
+    candidates += [
+        (PlayerAction.BUY_CARD, {}),
+        (PlayerAction.BUY_CARD, {'reserved_index': 0, 'card_placement': (1, 1)}),
+        (PlayerAction.SELECT_TOKENS, {}),
+        (PlayerAction.RESERVE_CARD, {'card_placement': (1, 1), 'bogus': 1}),
+    ]
+    return candidates
+
+
+@pytest.mark.parametrize('players', [2, 4])
+def test_checks_agree_with_perform(players):
+    candidates = _get_candidates()
+    game = GameState.from_ruleset(ClassicRuleset.from_players(players), players)
+    rng = Random(players)
+    for _ in range(60):
+        checks = game.check_actions(candidates)
+        for (turn_action, params), check in zip(candidates, checks):
+            assert game.check_action(turn_action, **params) is check
+            try:
+                game.clone().perform_player_turn(turn_action, **params)
+            except IllegalPlayerActionError as error:
+                assert not check.ok
+                assert str(error) == check.value
+            except TypeError:
+                assert check is ActionCheck.INVALID_PARAMETERS
+            else:
+                assert check.ok
+
+        legal = game.legal_actions()
+        assert all(check.ok for check in game.check_actions(legal))
+        if not legal:
+            break
+        game.apply(rng.choice(legal))
@@ -0,0 +1,64 @@
+from random import Random
+
+import pytest
+
+from splendor.encoding import GameStateCodec, decode_game, encode_game
+from splendor.exceptions import InvalidGameConfiguration
+from splendor.game import GameState
+from splendor.replay import ReplayWriter
+from splendor.ruleset import ClassicRuleset
+
+
+@pytest.mark.parametrize('players', [2, 3, 4])
+def test_round_trip(players):
+    ruleset = ClassicRuleset.from_players(players)
+    codec = GameStateCodec.for_ruleset(ruleset)
+    game = GameState.from_ruleset(ruleset, players)
+    rng = Random(players)
+    for _ in range(100):
+        encoded = codec.encode(game)
+        assert len(encoded) == codec.size
+
+        decoded = codec.decode(encoded)
+        assert codec.encode(decoded) == encoded
+        assert decoded.zobrist_hash == game.zobrist_hash
+        assert decode_game(encode_game(game)).zobrist_hash == game.zobrist_hash
+
+        legal = game.legal_actions()
+        if not legal:
+            break
+        game.apply(rng.choice(legal))
+
+
+def test_round_trip_at_offset():
+    ruleset = ClassicRuleset.from_players(3)
+    codec = GameStateCodec.for_ruleset(ruleset)
+    game = GameState.from_ruleset(ruleset, 1)
+    buffer = bytearray(codec.size + 5)
+    codec.encode_into(game, buffer, 5)
+    assert GameStateCodec.for_buffer(buffer, 5) is codec
+    assert codec.encode(codec.decode(buffer, 5)) == codec.encode(game)
+
+
+def test_customised_rulesets_get_their_own_layout():
+    standard = ClassicRuleset.from_players(2).compile()
+    ruleset = standard._replace(MAX_PLAYER_RESERVED_CARDS=5)
+    codec = GameStateCodec.for_ruleset(ruleset)
+    assert codec is not GameStateCodec.for_ruleset(standard)
+    assert codec.size == GameStateCodec.for_ruleset(standard).size + 2 * 2
+
+    game = GameState.from_ruleset(ruleset, 1)
+    for column in range(4):
+        game.get_current_player().reserved_cards.append(game.shop.get_tier(1).available_cards[column])
+    decoded = codec.decode(codec.encode(game))
+    assert list(decoded.players[0].reserved_cards) == list(game.players[0].reserved_cards)
+
+    with pytest.raises(InvalidGameConfiguration):
+        GameStateCodec.for_ruleset(standard).encode(game)
+
+
+def test_replays_reject_customised_rulesets(tmp_path):
+    ruleset = ClassicRuleset.from_players(2).compile()._replace(MAX_PLAYER_RESERVED_CARDS=5)
+    with ReplayWriter(str(tmp_path / 'games.bin')) as writer:
+        with pytest.raises(InvalidGameConfiguration):
+            writer.append(GameState.from_ruleset(ruleset, 1), [])
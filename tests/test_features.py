@@ -0,0 +1,60 @@
+from random import Random
+
+import numpy as np
+
+from splendor.actions import ActionSpace
+from splendor.features import FeatureEncoder, get_outcomes
+from splendor.game import GameState
+from splendor.replay import ReplayWriter
+from splendor.ruleset import ClassicRuleset
+
+
+def test_encode_batch_matches_single_positions(tmp_path):
+    ruleset = ClassicRuleset.from_players(3)
+    encoder = FeatureEncoder(ruleset, batch_size=16)
+    space = ActionSpace(ruleset)
+    path = str(tmp_path / 'games.bin')
+    rng = Random(0)
+    positions = []
+    actions = []
+    with ReplayWriter(path) as writer:
+        for seed in range(2):
+            game = GameState.from_ruleset(ruleset, seed)
+            initial_state = game.clone()
+            ids = []
+            for _ in range(30):
+                action = rng.choice(game.legal_actions())
+                positions.append(game.clone())
+                ids.append(space.encode(action))
+                game.apply(action)
+            writer.append(initial_state, ids)
+            actions += ids
+
+    features, masks = encoder.new_buffers(len(positions))
+    encoder.encode_batch(positions, features, masks)
+    for i, game in enumerate(positions):
+        legal = np.zeros(space.size, dtype=bool)
+        legal[[space.encode(action) for action in game.legal_actions()]] = True
+        assert (masks[i] == legal).all()
+
+        single_features, single_mask = encoder.encode(game)
+        assert (single_features == features[i]).all()
+        assert (single_mask == masks[i]).all()
+
+        # the player to move comes first
+        start = encoder.offsets['players'][0]
+        assert list(features[i, start:start + 6]) == list(game.get_current_player().tokens.values())
+
+    # batches are views over buffers reused by the next batch
+    batches = [(batch.features.copy(), batch.actions.copy()) for batch in encoder.iter_batches([path])]
+    assert all(len(batch_features) <= 16 for batch_features, _ in batches)
+    assert (np.concatenate([batch_features for batch_features, _ in batches]) == features).all()
+    assert list(np.concatenate([batch_actions for _, batch_actions in batches])) == actions
+
+
+def test_outcomes():
+    game = GameState.from_ruleset(ClassicRuleset.from_players(3), 0)
+    game.players[1].prestige = 16
+    assert get_outcomes(game) == [-1.0, 1.0, -1.0]
+    game.players[2].prestige = 16
+    assert get_outcomes(game) == [-1.0, 0.0, 0.0]
@@ -0,0 +1,134 @@
+from random import Random
+
+import pytest
+
+from splendor.cards import CARD_CATALOG
+from splendor.encoding import GameStateCodec
+from splendor.exceptions import GameOver, IllegalTokenDiscard, OverPlayerTokenLimit
+from splendor.game import GameState
+from splendor.player import Player, PlayerAction
+from splendor.ruleset import ClassicRuleset
+from splendor.tokens import Tokens
+
+
+@pytest.mark.parametrize('players', [2, 3, 4])
+def test_undo_restores_hash_and_encoding(players):
+    ruleset = ClassicRuleset.from_players(players)
+    codec = GameStateCodec.for_ruleset(ruleset)
+    game = GameState.from_ruleset(ruleset, players)
+    rng = Random(players)
+    records = []
+    snapshots = []
+    while len(records) < 150:
+        legal = game.legal_actions()
+        if not legal:
+            break
+
+        snapshots.append((codec.encode(game), game.zobrist_hash))
+        action = rng.choice(legal)
+        record = game.apply(action)
+        assert game.zobrist_hash == game.zobrist_keys.hash_game(game)
+        game.undo(record)
+        assert (codec.encode(game), game.zobrist_hash) == snapshots[-1]
+        records.append(game.apply(action))
+
+    while records:
+        game.undo(records.pop())
+        assert (codec.encode(game), game.zobrist_hash) == snapshots.pop()
+
+
+def test_undo_restores_in_place():
+    game = GameState.from_ruleset(ClassicRuleset.from_players(2), 1)
+    player = game.get_current_player()
+    tokens = player.tokens
+    reserved_cards = player.reserved_cards
+    community_tokens = game.community_tokens
+    game.undo(game.apply(game.legal_actions()[0]))
+    assert player.tokens is tokens
+    assert game.community_tokens is community_tokens
+
+    # buying a reserved card takes it out of the middle of the hand
+    game.apply((PlayerAction.RESERVE_CARD, {'card_placement': (1, 0)}))
+    game.player_turn = 0
+    reserved = list(reserved_cards)
+    tokens.assign(reserved[0].cost)
+    game.rehash()
+    game.undo(game.apply((PlayerAction.BUY_CARD, {'reserved_index': 0})))
+    assert player.reserved_cards is reserved_cards
+    assert list(reserved_cards) == reserved
+    assert player.tokens is tokens
+
+
+def _get_game_with_excess_tokens() -> GameState:
+    game = GameState.from_ruleset(ClassicRuleset.from_players(2), 1)
+    game.get_current_player().tokens = Tokens(ruby=3, emerald=3, sapphire=3)
+    game.rehash()
+    game.apply((PlayerAction.SELECT_TOKENS, {'tokens': Tokens(ruby=1, emerald=1, diamond=1)}))
+    return game
+
+
+def test_discard_phase():
+    game = _get_game_with_excess_tokens()
+    player = game.get_current_player()
+    assert game.player_turn == 0
+    assert player.tokens.get_total_count() == 12
+
+    legal = game.legal_actions()
+    assert {turn_action for turn_action, _ in legal} == {PlayerAction.DISCARD_TOKENS}
+    assert len(legal) == 4
+
+    with pytest.raises(OverPlayerTokenLimit):
+        game.perform_player_turn(PlayerAction.SELECT_TOKENS, tokens=Tokens(ruby=1, emerald=1, onyx=1))
+    with pytest.raises(IllegalTokenDiscard):
+        game.perform_player_turn(PlayerAction.DISCARD_TOKENS, tokens=Tokens(onyx=1))
+
+    game.apply((PlayerAction.DISCARD_TOKENS, {'tokens': Tokens(ruby=1)}))
+    assert game.player_turn == 0
+    game.apply((PlayerAction.DISCARD_TOKENS, {'tokens': Tokens(diamond=1)}))
+    assert game.player_turn == 1
+    assert player.tokens.get_total_count() == 10
+    assert game.zobrist_hash == game.zobrist_keys.hash_game(game)
+
+    with pytest.raises(IllegalTokenDiscard):
+        game.perform_player_turn(PlayerAction.DISCARD_TOKENS, tokens=Tokens(ruby=1))
+
+
+def test_game_ends_after_the_round():
+    game = GameState.from_ruleset(ClassicRuleset.from_players(2), 2)
+    game.player_turn = 1
+    game.players[1].prestige = 15
+    assert not game.is_over()
+
+    game.apply(game.legal_actions()[0])
+    assert game.is_over()
+    assert game.legal_actions() == []
+    with pytest.raises(GameOver):
+        game.apply((PlayerAction.SELECT_TOKENS, {'tokens': Tokens(ruby=1, emerald=1, diamond=1)}))
+
+
+def test_standings_tie_breaks():
+    game = GameState.from_ruleset(ClassicRuleset.from_players(3), 2)
+    game.players[0].prestige = 15
+    game.players[1].prestige = 15
+    game.players[2].prestige = 3
+    assert game.get_winners() == [0, 1]
+    assert [standing.rank for standing in game.get_standings()] == [1, 1, 3]
+
+    # fewer development cards win a tie on prestige
+    game.players[0].development_cards.add(CARD_CATALOG.cards[0])
+    assert game.get_winners() == [1]
+    assert [(standing.player, standing.rank) for standing in game.get_standings()] == [(1, 1), (0, 2), (2, 3)]
+
+
+def test_dispatch_follows_player_subclass():
+    class CountingPlayer(Player):
+        calls = 0
+
+        def action_select_tokens(self, *args, **kwargs):
+            CountingPlayer.calls += 1
+            return super().action_select_tokens(*args, **kwargs)
+
+    game = GameState.from_ruleset(ClassicRuleset.from_players(2), 1)
+    game.players[0].__class__ = CountingPlayer
+    game.apply((PlayerAction.SELECT_TOKENS, {'tokens': Tokens(ruby=1, emerald=1, diamond=1)}))
+    assert CountingPlayer.calls == 1
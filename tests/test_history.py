@@ -0,0 +1,48 @@
+from random import Random
+
+import pytest
+
+from splendor.encoding import GameStateCodec
+from splendor.game import GameState
+from splendor.history import GameHistory
+from splendor.ruleset import ClassicRuleset
+
+
+@pytest.mark.parametrize('checkpoint_interval', [1, 5, 16])
+def test_seek_matches_every_ply(checkpoint_interval):
+    ruleset = ClassicRuleset.from_players(3)
+    codec = GameStateCodec.for_ruleset(ruleset)
+    history = GameHistory(GameState.from_ruleset(ruleset, 7), checkpoint_interval)
+    rng = Random(checkpoint_interval)
+    snapshots = [(codec.encode(history.game), history.game.zobrist_hash)]
+    for _ in range(150):
+        legal = history.game.legal_actions()
+        if not legal:
+            break
+        history.apply(rng.choice(legal))
+        snapshots.append((codec.encode(history.game), history.game.zobrist_hash))
+
+    plies = len(history)
+    assert plies == len(snapshots) - 1
+    assert history.get_checkpoint_count() == plies // checkpoint_interval + 1
+    for ply in [rng.randrange(plies + 1) for _ in range(100)] + [0, plies]:
+        game = history.seek(ply)
+        assert (codec.encode(game), game.zobrist_hash) == snapshots[ply]
+        assert game.zobrist_hash == game.zobrist_keys.hash_game(game)
+
+
+def test_apply_after_seek_branches():
+    ruleset = ClassicRuleset.from_players(2)
+    codec = GameStateCodec.for_ruleset(ruleset)
+    history = GameHistory(GameState.from_ruleset(ruleset, 3), 4)
+    rng = Random(0)
+    snapshots = [codec.encode(history.game)]
+    for _ in range(40):
+        history.apply(rng.choice(history.game.legal_actions()))
+        snapshots.append(codec.encode(history.game))
+
+    history.seek(20)
+    history.apply(history.game.legal_actions()[-1])
+    assert len(history) == 21
+    assert history.get_checkpoint_count() == 21 // 4 + 1
+    assert codec.encode(history.seek(10)) == snapshots[10]
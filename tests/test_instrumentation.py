@@ -0,0 +1,52 @@
+from random import Random
+
+import pytest
+
+from splendor.exceptions import IllegalPlayerActionError
+from splendor.game import GameState
+from splendor.instrumentation import GameEvent, Instrumentation
+from splendor.player import PlayerAction
+from splendor.ruleset import ClassicRuleset
+from splendor.tokens import Tokens
+
+
+def test_hooks_and_metrics():
+    game = GameState.from_ruleset(ClassicRuleset.from_players(2), 1)
+    instrumentation = game.instrumentation = Instrumentation()
+    events = []
+    for event in GameEvent:
+        instrumentation.subscribe(event, lambda game, event=event, **payload: events.append((event, payload)))
+
+    rng = Random(0)
+    for _ in range(30):
+        game.apply(rng.choice(game.legal_actions()))
+    with pytest.raises(IllegalPlayerActionError):
+        game.perform_player_turn(PlayerAction.SELECT_TOKENS, tokens=Tokens(ruby=3))
+
+    names = {event for event, _ in events}
+    assert {GameEvent.BEFORE_ACTION, GameEvent.AFTER_ACTION, GameEvent.ACTION_REJECTED} <= names
+    assert sum(event is GameEvent.AFTER_ACTION for event, _ in events) == 30
+
+    snapshot = instrumentation.metrics.snapshot()
+    assert sum(action['count'] for action in snapshot['actions'].values()) == 30
+    rejected = snapshot['rejection_latency']['IllegalTokenSelection']['select_tokens']
+    assert sum(rejected['histogram_ns'].values()) == 1
+
+
+def test_unsubscribed_events_are_skipped():
+    game = GameState.from_ruleset(ClassicRuleset.from_players(2), 1)
+    instrumentation = game.instrumentation = Instrumentation(metrics=False)
+    transfers = []
+
+    def hook(game, **payload):
+        transfers.append(payload)
+
+    instrumentation.subscribe(GameEvent.TOKEN_TRANSFER, hook)
+    assert instrumentation.wants(GameEvent.TOKEN_TRANSFER)
+    assert not instrumentation.wants(GameEvent.CARD_REFILLED)
+
+    game.apply((PlayerAction.RESERVE_CARD, {'card_placement': (1, 0)}))
+    assert transfers == [{'source': 'community', 'target': 0, 'tokens': Tokens(gold=1)}]
+
+    instrumentation.unsubscribe(GameEvent.TOKEN_TRANSFER, hook)
+    assert not instrumentation.wants(GameEvent.TOKEN_TRANSFER)
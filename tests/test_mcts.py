@@ -0,0 +1,30 @@
+from splendor.game import GameState
+from splendor.mcts import MCTS
+from splendor.ruleset import ClassicRuleset
+
+
+def _get_last_turn_game() -> GameState:
+    # every action of player 1 ends the game
+    game = GameState.from_ruleset(ClassicRuleset.from_players(2), 2)
+    game.player_turn = 1
+    game.players[1].prestige = 15
+    return game
+
+
+def test_search_reaches_terminal_nodes():
+    game = _get_last_turn_game()
+    mcts = MCTS(seed=0)
+    action = mcts.search(game, iterations=200)
+    assert action in game.legal_actions()
+    assert mcts.last_stats.iterations == 200
+
+
+def test_search_on_finished_game():
+    game = _get_last_turn_game()
+    game.apply(game.legal_actions()[0])
+    assert game.is_over()
+
+    mcts = MCTS(seed=0)
+    assert mcts.search(game, iterations=10) is None
+    assert mcts.last_stats.iterations == 0
+    assert mcts.get_best_action(game) is None
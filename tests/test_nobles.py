@@ -0,0 +1,32 @@
+from random import Random
+
+from splendor.game import GameState
+from splendor.nobles import NOBLE_CATALOG
+from splendor.ruleset import ClassicRuleset
+from splendor.tokens import Gems
+
+
+def test_eligible_mask_matches_requirements():
+    rng = Random(0)
+    for _ in range(500):
+        bonuses = Gems.from_values(rng.randrange(7) for _ in Gems.TOKEN_TYPES)
+        expected = 0
+        for noble in NOBLE_CATALOG.nobles:
+            if all(bonuses[gem] >= count for gem, count in noble.cost.items()):
+                expected |= 1 << noble.id
+        assert NOBLE_CATALOG.get_eligible_mask(bonuses) == expected
+
+
+def test_visit_takes_the_lowest_eligible_noble():
+    game = GameState.from_ruleset(ClassicRuleset.from_players(4), 0)
+    player = game.get_current_player()
+    assert game.resolve_noble_visit() is None
+
+    player.bonuses = Gems(ruby=4, emerald=4, sapphire=4, diamond=4, onyx=4)
+    displayed = list(game.shop.nobles)
+    noble = game.resolve_noble_visit()
+    assert noble is min(displayed, key=lambda noble: noble.id)
+    assert player.nobles == [noble]
+    assert player.prestige == noble.prestige
+    assert noble not in game.shop.nobles
+    assert len(game.shop.nobles) == len(displayed) - 1
@@ -0,0 +1,83 @@
+from random import Random
+
+import pytest
+
+from splendor.cards import CARD_CATALOG
+from splendor.game import GameState
+from splendor.player import Player, PlayerAction
+from splendor.ruleset import ClassicRuleset
+from splendor.tokens import Gems, Tokens
+
+
+def _play_buying(game: GameState, seed: int, plies: int):
+    # favours purchases so bonuses and nobles come into play
+    rng = Random(seed)
+    for _ in range(plies):
+        legal = game.legal_actions()
+        if not legal:
+            return
+        buys = [action for action in legal if action[0] is PlayerAction.BUY_CARD]
+        game.apply(rng.choice(buys) if buys and rng.random() < 0.8 else rng.choice(legal))
+        yield
+
+
+@pytest.mark.parametrize('players', [2, 4])
+def test_bonuses_and_prestige_stay_current(players):
+    game = GameState.from_ruleset(ClassicRuleset.from_players(players), players)
+    for _ in _play_buying(game, players, 200):
+        for player in game.players:
+            bonuses = Gems()
+            for card in player.development_cards:
+                bonuses[card.gem] += 1
+            assert player.bonuses == bonuses
+            prestige = sum(card.prestige for card in player.development_cards)
+            assert player.prestige == prestige + sum(noble.prestige for noble in player.nobles)
+
+
+def test_affordability_queries_agree():
+    ruleset = ClassicRuleset.from_players(2)
+    rng = Random(0)
+    cards = list(CARD_CATALOG.cards)
+    for _ in range(200):
+        player = Player(ruleset, development_cards=rng.sample(cards, rng.randrange(8)))
+        player.tokens = Tokens.from_values(rng.randrange(4) for _ in Tokens.TOKEN_TYPES)
+        candidates = rng.sample(cards, 10) + [None]
+        payments = player.get_payments(candidates)
+        for card, affordable, payment in zip(candidates, player.affordable(candidates), payments):
+            assert affordable == (payment is not None)
+            if card is None:
+                continue
+
+            assert affordable == (player.shortfall(card) <= player.tokens['gold'])
+            if affordable:
+                assert payment == player.get_payment(card)
+                assert player.tokens >= payment
+
+
+@pytest.mark.parametrize('players', [2, 3, 4])
+def test_purchases_conserve_tokens(players):
+    game = GameState.from_ruleset(ClassicRuleset.from_players(players), players)
+
+    def get_token_total() -> tuple:
+        return sum((player.tokens for player in game.players), game.community_tokens.copy()).values()
+
+    total = get_token_total()
+    for _ in _play_buying(game, players, 200):
+        assert get_token_total() == total
+        assert all(player.tokens.is_positive() for player in game.players)
+    assert sum(len(player.development_cards) for player in game.players) > 0
+
+
+def test_purchase_plans_match_buy_actions():
+    game = GameState.from_ruleset(ClassicRuleset.from_players(3), 4)
+    for _ in _play_buying(game, 4, 150):
+        player = game.get_current_player()
+        if game.is_over() or player.tokens.get_total_count() > game.ruleset.MAX_PLAYER_TOKENS:
+            # nothing or only discards are legal
+            continue
+
+        plans = player.get_purchase_plans(game)
+        buys = [params for turn_action, params in game.legal_actions() if turn_action is PlayerAction.BUY_CARD]
+        assert sorted(map(repr, (plan.get_params() for plan in plans))) == sorted(map(repr, buys))
+        for plan in plans:
+            assert plan.payment == player.get_payment(plan.card)
@@ -0,0 +1,35 @@
+import pickle
+
+import pytest
+
+from splendor.cards import TIER_ONE_CARDS, DevelopmentCard
+from splendor.exceptions import InvalidGameConfiguration
+from splendor.game import GameState
+from splendor.ruleset import ClassicRuleset
+from splendor.tokens import Gem, Gems
+
+
+def test_pickle_keeps_shared_rulesets():
+    ruleset = ClassicRuleset.from_players(3).compile()
+    assert pickle.loads(pickle.dumps(ruleset)) is ruleset
+
+
+def test_pickle_keeps_customised_rulesets():
+    ruleset = ClassicRuleset.from_players(2).compile()._replace(MAX_PLAYER_TOKENS=12)
+    loaded = pickle.loads(pickle.dumps(ruleset))
+    assert loaded.MAX_PLAYER_TOKENS == 12
+    assert loaded == ruleset
+
+    game = GameState.from_ruleset(ruleset, 1)
+    assert game.ruleset is ruleset
+    assert pickle.loads(pickle.dumps(game)).ruleset.MAX_PLAYER_TOKENS == 12
+
+
+def test_card_pools_only_hold_catalog_cards():
+    ruleset = ClassicRuleset.from_players(2)
+    ruleset.TIER_ONE_DEVELOPMENT_CARDS_POOL = [
+        DevelopmentCard(gem=Gem.RUBY, prestige=0, cost=Gems(onyx=3), tier=1),
+        *TIER_ONE_CARDS[1:],
+    ]
+    with pytest.raises(InvalidGameConfiguration):
+        ruleset.compile()
@@ -0,0 +1,37 @@
+import pytest
+
+from splendor.agents import random_agent
+from splendor.selfplay import play_games, replay_game, run_tournament
+
+
+def test_tournament_seeds():
+    agents = [random_agent] * 2
+    results = list(run_tournament(agents, 2, seeds=[7, 3], workers=1))
+    assert sorted((result.game_index, result.seed) for result in results) == [(0, 7), (1, 3)]
+
+    with pytest.raises(ValueError):
+        next(run_tournament(agents, 3, seeds=[7, 3], workers=1))
+
+
+def test_tournament_is_deterministic():
+    agents = [random_agent] * 3
+    sequential = run_tournament(agents, 6, seed=5, workers=1, chunk_size=4)
+    parallel = run_tournament(agents, 6, seed=5, workers=2, chunk_size=4)
+    assert sorted(sequential, key=lambda result: result.game_index) == sorted(
+        parallel, key=lambda result: result.game_index,
+    )
+
+
+def test_tournament_matches_sequential_games():
+    agents = [random_agent] * 3
+    results = list(play_games(agents, 6, seed=5))
+    assert [result.game_index for result in results] == list(range(6))
+    assert all(result.over for result in results)
+
+    tournament = run_tournament(agents, 6, seed=5, workers=1, chunk_size=4)
+    assert sorted(tournament, key=lambda result: result.game_index) == results
+
+    for result in results:
+        game = replay_game(result)
+        assert game.is_over()
+        assert tuple(player.prestige for player in game.players) == result.scores
@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import pytest
+
+from splendor.server import GameServer
+
+
+def _request(server: GameServer, request) -> dict:
+    line = request if isinstance(request, bytes) else json.dumps(request).encode()
+    return asyncio.run(server.handle_request(None, line))
+
+
+@pytest.fixture
+def server():
+    server = GameServer()
+    yield server
+    server.store.close()
+
+
+@pytest.fixture
+def session(server):
+    return _request(server, {'op': 'create', 'seed': 1})['session']
+
+
+@pytest.mark.parametrize('request_line', [b'{', b'[1]', b'{"op": "bogus"}', b'{"op": ["x"]}', b'{"op": {}}'])
+def test_malformed_requests(server, request_line):
+    reply = _request(server, request_line)
+    assert not reply['ok']
+    assert reply['error'] == 'ProtocolError'
+
+
+@pytest.mark.parametrize('request_', [
+    {'op': 'create', 'seed': [1]},
+    {'op': 'create', 'seed': '1'},
+    {'op': 'create', 'players': True},
+])
+def test_create_rejects_non_int_parameters(server, request_):
+    reply = _request(server, request_)
+    assert reply['error'] == 'ProtocolError'
+
+
+@pytest.mark.parametrize('action', [
+    {'type': 'select_tokens', 'tokens': {'bogus': 1}},
+    {'type': 'select_tokens', 'tokens': {'ruby': '1'}},
+    {'type': 'select_tokens', 'tokens': [1, 2]},
+    {'type': 'reserve_card', 'card_placement': [1]},
+    {'type': 'reserve_card', 'card_placement': [1, 'a']},
+    {'type': 'reserve_card', 'card_placement': 1},
+    {'type': 'buy_card', 'reserved_index': '0'},
+    {'type': 'bogus'},
+    10 ** 6,
+    True,
+    'select_tokens',
+])
+def test_move_rejects_malformed_actions(server, session, action):
+    reply = _request(server, {'op': 'move', 'session': session, 'action': action})
+    assert reply['error'] == 'ProtocolError'
+    assert _request(server, {'op': 'state', 'session': session})['state']['ply'] == 0
+
+
+@pytest.mark.parametrize('session_id', [[1], {'a': 1}, 1, None])
+def test_malformed_session_ids(server, session_id):
+    for op in ['state', 'legal', 'move', 'subscribe', 'close']:
+        reply = _request(server, {'op': op, 'session': session_id, 'action': 0})
+        assert reply['error'] == 'ProtocolError'
+
+
+def test_move_errors(server, session):
+    reply = _request(server, {'op': 'move', 'session': 'missing', 'action': 0, 'id': 3})
+    assert reply['error'] == 'UnknownSession'
+    assert reply['id'] == 3
+
+    reply = _request(server, {'op': 'move', 'session': session, 'ply': 4, 'action': 0})
+    assert reply['error'] == 'OutOfTurnAction'
+
+    reply = _request(server, {'op': 'move', 'session': session, 'player': 1, 'action': 0})
+    assert reply['error'] == 'OutOfTurnAction'
+
+
+def test_move(server, session):
+    reply = _request(server, {'op': 'move', 'session': session, 'legal': True, 'action': {
+        'type': 'reserve_card', 'card_placement': [1, 0],
+    }})
+    assert reply['ok']
+    assert reply['ply'] == 1
+    assert reply['legal']
@@ -0,0 +1,75 @@
+from random import Random
+
+import pytest
+
+from splendor.game import GameState
+from splendor.player import PlayerAction
+from splendor.ruleset import ClassicRuleset
+from splendor.tokens import Tokens
+from splendor.zobrist import TranspositionTable, ZobristKeys
+
+
+def _play(game: GameState, seed: int, plies: int) -> None:
+    rng = Random(seed)
+    for _ in range(plies):
+        legal = game.legal_actions()
+        if not legal:
+            break
+        game.apply(rng.choice(legal))
+        assert game.zobrist_hash == game.zobrist_keys.hash_game(game)
+
+
+@pytest.mark.parametrize('players', [2, 3, 4])
+def test_incremental_hash(players):
+    game = GameState.from_ruleset(ClassicRuleset.from_players(players), players)
+    _play(game, players, 150)
+    assert game.clone().zobrist_hash == game.zobrist_hash
+
+
+def test_transpositions_hash_alike():
+    picks = [
+        (PlayerAction.SELECT_TOKENS, {'tokens': Tokens(ruby=1, emerald=1, onyx=1)}),
+        (PlayerAction.SELECT_TOKENS, {'tokens': Tokens(diamond=1, sapphire=1, onyx=1)}),
+        (PlayerAction.SELECT_TOKENS, {'tokens': Tokens(ruby=1, sapphire=1, diamond=1)}),
+        (PlayerAction.SELECT_TOKENS, {'tokens': Tokens(emerald=1, sapphire=1, onyx=1)}),
+    ]
+    game = GameState.from_ruleset(ClassicRuleset.from_players(2), 1)
+    first = game.clone()
+    second = game.clone()
+    for action in picks:
+        first.apply(action)
+    for action in [picks[2], picks[1], picks[0], picks[3]]:
+        second.apply(action)
+    assert first.zobrist_hash == second.zobrist_hash != game.zobrist_hash
+
+
+def test_customised_rulesets():
+    ruleset = ClassicRuleset.from_players(2)
+    standard = GameState.from_ruleset(ruleset, 1)
+
+    ruleset.COMMUNITY_GEMS_COUNT = 9
+    game = GameState.from_ruleset(ruleset, 1)
+    assert game.zobrist_keys is not standard.zobrist_keys
+    _play(game, 1, 100)
+
+    compiled = ClassicRuleset.from_players(2).compile()._replace(COMMUNITY_GOLD_COUNT=12)
+    assert ZobristKeys.for_ruleset(compiled) is ZobristKeys.for_ruleset(compiled)
+    _play(GameState.from_ruleset(compiled, 1), 1, 100)
+
+
+def test_transposition_table():
+    table = TranspositionTable(1000)
+    assert table.capacity == 1024
+
+    table.store(5, 'shallow', depth=1)
+    assert table.get(5) == 'shallow'
+    assert table.probe(5, min_depth=2) is None
+    assert table.get(6) is None
+
+    # a shallower result of another position does not replace a deeper one of the same search
+    assert table.store(5, 'deep', depth=3)
+    assert not table.store(5 + table.capacity, 'other', depth=1)
+    table.new_search()
+    assert table.store(5 + table.capacity, 'other', depth=1)
+    assert 5 not in table
+    assert len(table) == 1